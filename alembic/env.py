@@ -16,7 +16,7 @@ sys.path.insert(0, os.path.realpath(os.path.join(os.path.dirname(__file__), '..'
 
 from app.db.session import engine as app_engine
 from sqlmodel import SQLModel 
-from app.models import User, Book, Transaction
+from app.models import User, Book, Transaction, ActiveLoan, BookDailyStats, UserDailyStats, OutboxEvent
 
 target_metadata = SQLModel.metadata 
 
@@ -38,14 +38,16 @@ def run_migrations_offline() -> None:
         compare_type=True,
     )
 
+    with context.begin_transaction():
+        context.run_migrations()
+
 def run_migrations_online() -> None:
     """Run migrations in 'online' mode.
     # ... (rest of the function remains the same)
     """
     DB_URL = get_url() 
     
-    if not config.get_main_option("sqlalchemy.url"):
-        config.set_main_option("sqlalchemy.url", DB_URL)
+    config.set_main_option("sqlalchemy.url", DB_URL)
 
     connectable = engine_from_config(
         config.get_section(config.config_ini_section),
@@ -59,3 +61,12 @@ def run_migrations_online() -> None:
             target_metadata=target_metadata,
             compare_type=True,
         )
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
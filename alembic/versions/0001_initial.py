@@ -0,0 +1,72 @@
+"""Initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sqlmodel.sql.sqltypes.AutoString(length=50), nullable=False),
+        sa.Column('email', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('full_name', sqlmodel.sql.sqltypes.AutoString(length=100), nullable=True),
+        sa.Column('hashed_password', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_user_id'), 'user', ['id'], unique=False)
+    op.create_index(op.f('ix_user_username'), 'user', ['username'], unique=True)
+    op.create_index(op.f('ix_user_email'), 'user', ['email'], unique=True)
+
+    op.create_table(
+        'book',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sqlmodel.sql.sqltypes.AutoString(length=200), nullable=False),
+        sa.Column('author', sqlmodel.sql.sqltypes.AutoString(length=100), nullable=False),
+        sa.Column('isbn', sqlmodel.sql.sqltypes.AutoString(length=20), nullable=False),
+        sa.Column('total_quantity', sa.Integer(), nullable=False),
+        sa.Column('available_quantity', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_book_id'), 'book', ['id'], unique=False)
+    op.create_index(op.f('ix_book_title'), 'book', ['title'], unique=False)
+    op.create_index(op.f('ix_book_author'), 'book', ['author'], unique=False)
+    op.create_index(op.f('ix_book_isbn'), 'book', ['isbn'], unique=True)
+
+    op.create_table(
+        'transaction',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('transaction_type', sa.Enum('LEND', 'RETURN', name='transactiontype'), nullable=False),
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+        sa.Column('book_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['book_id'], ['book.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_transaction_id'), 'transaction', ['id'], unique=False)
+    op.create_index(op.f('ix_transaction_book_id'), 'transaction', ['book_id'], unique=False)
+    op.create_index(op.f('ix_transaction_user_id'), 'transaction', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_table('transaction')
+    sa.Enum(name='transactiontype').drop(op.get_bind(), checkfirst=True)
+    op.drop_table('book')
+    op.drop_table('user')
@@ -0,0 +1,26 @@
+"""Composite index for keyset pagination of transactions
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_transaction_timestamp_id', 'transaction', ['timestamp', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_transaction_timestamp_id', table_name='transaction')
@@ -0,0 +1,85 @@
+"""Active loans per user, backfilled from transaction history
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Users replayed per batch; each batch reads only those users' history.
+BACKFILL_USERS_PER_BATCH = 1000
+
+transaction = sa.table(
+    'transaction',
+    sa.column('id', sa.Integer),
+    sa.column('transaction_type', sa.String),
+    sa.column('timestamp', sa.DateTime),
+    sa.column('book_id', sa.Integer),
+    sa.column('user_id', sa.Integer),
+)
+user = sa.table('user', sa.column('id', sa.Integer))
+
+
+def _replay(rows):
+    """
+    Replays one batch of history ordered by (user_id, book_id, timestamp, id).
+    Returns made before this table existed were not checked, so a return with
+    nothing on loan is ignored rather than driving the count negative.
+    """
+    held = {}
+    for user_id, book_id, transaction_type, timestamp in rows:
+        quantity, since = held.get((user_id, book_id), (0, None))
+        if transaction_type == 'LEND':
+            held[(user_id, book_id)] = (quantity + 1, since if quantity else timestamp)
+        elif quantity:
+            held[(user_id, book_id)] = (quantity - 1, since if quantity > 1 else None)
+    return [
+        {'user_id': user_id, 'book_id': book_id, 'quantity': quantity, 'since': since}
+        for (user_id, book_id), (quantity, since) in held.items() if quantity > 0
+    ]
+
+
+def upgrade() -> None:
+    active_loan = op.create_table(
+        'active_loan',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('book_id', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('since', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['book_id'], ['book.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('user_id', 'book_id'),
+    )
+
+    bind = op.get_bind()
+    last_user_id = 0
+    while True:
+        user_ids = bind.execute(
+            sa.select(user.c.id).where(user.c.id > last_user_id).order_by(user.c.id).limit(BACKFILL_USERS_PER_BATCH)
+        ).scalars().all()
+        if not user_ids:
+            break
+        rows = bind.execute(
+            sa.select(transaction.c.user_id, transaction.c.book_id, transaction.c.transaction_type, transaction.c.timestamp)
+            .where(transaction.c.user_id.between(user_ids[0], user_ids[-1]))
+            .order_by(transaction.c.user_id, transaction.c.book_id, transaction.c.timestamp, transaction.c.id)
+        )
+        loans = _replay(rows)
+        if loans:
+            op.bulk_insert(active_loan, loans)
+        last_user_id = user_ids[-1]
+
+
+def downgrade() -> None:
+    op.drop_table('active_loan')
@@ -0,0 +1,51 @@
+"""Daily circulation rollups per book and per user, backfilled from transactions
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _create_rollup(name: str, owner: str, owner_table: str) -> None:
+    op.create_table(
+        name,
+        sa.Column(owner, sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('lends', sa.Integer(), nullable=False),
+        sa.Column('returns', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint([owner], [f'{owner_table}.id']),
+        sa.PrimaryKeyConstraint(owner, 'day'),
+    )
+    op.create_index(op.f(f'ix_{name}_day'), name, ['day'], unique=False)
+    # One aggregate pass over history; afterwards crud_stats keeps the rollup current.
+    op.execute(
+        f"INSERT INTO {name} ({owner}, day, lends, returns) "
+        f"SELECT {owner}, date(timestamp), "
+        f"SUM(CASE WHEN transaction_type = 'LEND' THEN 1 ELSE 0 END), "
+        f"SUM(CASE WHEN transaction_type = 'RETURN' THEN 1 ELSE 0 END) "
+        f"FROM \"transaction\" GROUP BY {owner}, date(timestamp)"
+    )
+
+
+def upgrade() -> None:
+    _create_rollup('book_daily_stats', 'book_id', 'book')
+    _create_rollup('user_daily_stats', 'user_id', 'user')
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_user_daily_stats_day'), table_name='user_daily_stats')
+    op.drop_table('user_daily_stats')
+    op.drop_index(op.f('ix_book_daily_stats_day'), table_name='book_daily_stats')
+    op.drop_table('book_daily_stats')
@@ -0,0 +1,102 @@
+"""Monthly range partitioning of transactions (PostgreSQL) and per-user/per-book time indexes
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.partitions import add_months, ensure_partitions, month_start
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Partitions created beyond the current month; keep topping up with app.commands.ensure_partitions.
+PARTITION_MONTHS_AHEAD = 12
+
+COLUMNS = 'id, transaction_type, timestamp, book_id, user_id'
+
+
+def _create_indexes() -> None:
+    op.create_index(op.f('ix_transaction_id'), 'transaction', ['id'], unique=False)
+    op.create_index('ix_transaction_timestamp_id', 'transaction', ['timestamp', 'id'], unique=False)
+    op.create_index('ix_transaction_user_id_timestamp', 'transaction', ['user_id', 'timestamp'], unique=False)
+    op.create_index('ix_transaction_book_id_timestamp', 'transaction', ['book_id', 'timestamp'], unique=False)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        # SQLite has no declarative partitioning: keep the plain table, swap in the composite indexes.
+        op.create_index('ix_transaction_user_id_timestamp', 'transaction', ['user_id', 'timestamp'], unique=False)
+        op.create_index('ix_transaction_book_id_timestamp', 'transaction', ['book_id', 'timestamp'], unique=False)
+        op.drop_index(op.f('ix_transaction_user_id'), table_name='transaction')
+        op.drop_index(op.f('ix_transaction_book_id'), table_name='transaction')
+        return
+
+    op.execute('ALTER TABLE "transaction" RENAME TO transaction_unpartitioned')
+    op.execute('ALTER TABLE transaction_unpartitioned RENAME CONSTRAINT transaction_pkey TO transaction_unpartitioned_pkey')
+    for name in ('ix_transaction_id', 'ix_transaction_book_id', 'ix_transaction_user_id', 'ix_transaction_timestamp_id'):
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+
+    # The partition key must be part of the primary key.
+    op.execute(
+        'CREATE TABLE "transaction" ('
+        "id INTEGER NOT NULL DEFAULT nextval('transaction_id_seq'), "
+        'transaction_type transactiontype NOT NULL, '
+        'timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL, '
+        'book_id INTEGER NOT NULL REFERENCES book (id), '
+        'user_id INTEGER NOT NULL REFERENCES "user" (id), '
+        'PRIMARY KEY (id, timestamp)'
+        ') PARTITION BY RANGE (timestamp)'
+    )
+    op.execute('ALTER SEQUENCE transaction_id_seq OWNED BY "transaction".id')
+
+    first = bind.execute(sa.text('SELECT min(timestamp) FROM transaction_unpartitioned')).scalar()
+    today = date.today()
+    ensure_partitions(bind, (first.date() if first else today), add_months(month_start(today), PARTITION_MONTHS_AHEAD))
+    op.execute('CREATE TABLE transaction_default PARTITION OF "transaction" DEFAULT')
+
+    op.execute(f'INSERT INTO "transaction" ({COLUMNS}) SELECT {COLUMNS} FROM transaction_unpartitioned')
+    op.execute('DROP TABLE transaction_unpartitioned')
+    _create_indexes()
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        op.create_index(op.f('ix_transaction_book_id'), 'transaction', ['book_id'], unique=False)
+        op.create_index(op.f('ix_transaction_user_id'), 'transaction', ['user_id'], unique=False)
+        op.drop_index('ix_transaction_book_id_timestamp', table_name='transaction')
+        op.drop_index('ix_transaction_user_id_timestamp', table_name='transaction')
+        return
+
+    op.execute('ALTER TABLE "transaction" RENAME TO transaction_partitioned')
+    for name in ('ix_transaction_id', 'ix_transaction_timestamp_id', 'ix_transaction_user_id_timestamp', 'ix_transaction_book_id_timestamp'):
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+    op.execute('ALTER TABLE transaction_partitioned RENAME CONSTRAINT transaction_pkey TO transaction_partitioned_pkey')
+    op.execute(
+        'CREATE TABLE "transaction" ('
+        "id INTEGER NOT NULL DEFAULT nextval('transaction_id_seq') PRIMARY KEY, "
+        'transaction_type transactiontype NOT NULL, '
+        'timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL, '
+        'book_id INTEGER NOT NULL REFERENCES book (id), '
+        'user_id INTEGER NOT NULL REFERENCES "user" (id)'
+        ')'
+    )
+    op.execute('ALTER SEQUENCE transaction_id_seq OWNED BY "transaction".id')
+    op.execute(f'INSERT INTO "transaction" ({COLUMNS}) SELECT {COLUMNS} FROM transaction_partitioned')
+    op.execute('DROP TABLE transaction_partitioned CASCADE')
+    op.create_index(op.f('ix_transaction_id'), 'transaction', ['id'], unique=False)
+    op.create_index('ix_transaction_timestamp_id', 'transaction', ['timestamp', 'id'], unique=False)
+    op.create_index(op.f('ix_transaction_book_id'), 'transaction', ['book_id'], unique=False)
+    op.create_index(op.f('ix_transaction_user_id'), 'transaction', ['user_id'], unique=False)
@@ -0,0 +1,40 @@
+"""Outbox of book and transaction changes, tailed by GET /events/stream
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'outbox_event',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event_type', sqlmodel.sql.sqltypes.AutoString(length=32), nullable=False),
+        sa.Column('book_id', sa.Integer(), nullable=True),
+        sa.Column('payload', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sqlite_autoincrement=True,
+    )
+    op.create_index(op.f('ix_outbox_event_book_id'), 'outbox_event', ['book_id'], unique=False)
+    op.create_index(op.f('ix_outbox_event_created_at'), 'outbox_event', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_outbox_event_created_at'), table_name='outbox_event')
+    op.drop_index(op.f('ix_outbox_event_book_id'), table_name='outbox_event')
+    op.drop_table('outbox_event')
@@ -1,43 +1,68 @@
-from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+import inspect
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncContextManager, AsyncIterator, Callable
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.concurrency import contextmanager_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
-from sqlmodel import Session
 
 from app.core import security
 from app.core.config import settings
-from app.db.session import get_db
+from app.db import session as db_session
+from app.db.session import AnySession, get_db, get_replica_db, run_db
 from app.models.user import User
-from app.schemas.token import TokenData
 from app.crud import crud_user
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login/token")
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
-) -> User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        username: Optional[str] = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
-    except JWTError:
-        raise credentials_exception
-    
-    user = crud_user.get_user_by_username(db, username=token_data.username) 
+
+async def get_current_user(
+    db: AnySession = Depends(get_db), token: str = Depends(oauth2_scheme)
+) -> User:
+    # Verified tokens and cached users are both checked on the event loop;
+    # only a user cache miss goes to the database.
+    username = security.verify_access_token(token)
+    if username is None:
+        raise _credentials_exception()
+    user = crud_user.get_cached_user(username)
+    if user is None:
+        user = await run_db(db, crud_user.load_user_into_cache, username=username)
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    db_session.bind_request_user(username)
     return user
 
-def get_current_active_user(
+def _open_session(dependency: Callable) -> AsyncContextManager[AnySession]:
+    if inspect.isasyncgenfunction(dependency):
+        return asynccontextmanager(dependency)()
+    return contextmanager_in_threadpool(contextmanager(dependency)())
+
+async def get_read_db(request: Request) -> AsyncIterator[AnySession]:
+    """
+    Session for public reads: the read replica when one is configured, except
+    for a user who committed a write within READ_YOUR_WRITES_SECONDS, whose
+    reads stay on the primary so they see their own changes.
+
+    The database is picked before a session is opened, so replica reads take
+    no primary session or pool slot. Dependency overrides are honoured.
+    """
+    overrides = request.app.dependency_overrides
+    dependency = overrides.get(get_replica_db, get_replica_db)
+    if dependency is db_session.no_replica:
+        dependency = overrides.get(get_db, get_db)
+    else:
+        username = security.subject_from_authorization(request.headers.get("authorization"))
+        if username is not None and db_session.wrote_recently(username):
+            dependency = overrides.get(get_db, get_db)
+    async with _open_session(dependency) as session:
+        yield session
+
+async def get_current_active_user(
     current_user: User = Depends(get_current_user),
 ) -> User:
     if not current_user.is_active:
@@ -1,8 +1,10 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, books, transactions
+from app.api.v1.endpoints import auth, books, events, stats, transactions
 
 api_router = APIRouter()
 
 api_router.include_router(auth.router, prefix="/auth", tags=["Authentication & Users"])
 api_router.include_router(books.router, prefix="/books", tags=["Book Management"])
-api_router.include_router(transactions.router, prefix="/transactions", tags=["Transactions"])
\ No newline at end of file
+api_router.include_router(transactions.router, prefix="/transactions", tags=["Transactions"])
+api_router.include_router(stats.router, prefix="/stats", tags=["Statistics"])
+api_router.include_router(events.router, prefix="/events", tags=["Change Feed"])
\ No newline at end of file
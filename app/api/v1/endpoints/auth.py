@@ -1,29 +1,38 @@
 from datetime import timedelta
+from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlmodel import Session
 
 from app.core import security
 from app.core.config import settings
+from app.core.metrics import TimedRoute
+from app.core.serialization import respond
 from app.schemas import token as token_schema
 from app.schemas import user as user_schema
+from app.schemas import loan as loan_schema
 from app.schemas import msg as msg_schema
-from app.crud import crud_user
+from app.crud import crud_loan, crud_user
 from app.api import deps
-from app.db.session import get_db 
+from app.db.session import AnySession, get_db, run_db
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 @router.post("/login/token", response_model=token_schema.Token)
-def login_for_access_token(
-    db: Session = Depends(get_db), 
+async def login_for_access_token(
+    db: AnySession = Depends(get_db), 
     form_data: OAuth2PasswordRequestForm = Depends()
 ):
     """
     OAuth2 compatible token login, get an access token for future requests.
     """
-    user = crud_user.get_user_by_username(db, username=form_data.username)
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    user = await run_db(db, crud_user.get_user_by_username, username=form_data.username)
+    # Give the connection back to the pool while bcrypt runs; the session reconnects if needed.
+    await run_db(db, Session.close)
+    verified, new_hash = False, None
+    if user:
+        verified, new_hash = await security.verify_and_update_password(form_data.password, user.hashed_password)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -31,6 +40,8 @@ def login_for_access_token(
         )
     if not user.is_active:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
+    if new_hash:
+        await run_db(db, crud_user.update_password_hash, db_user=user, hashed_password=new_hash)
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(
@@ -39,35 +50,59 @@ def login_for_access_token(
     return {"access_token": access_token, "token_type": "bearer"}
 
 
+@router.post("/logout", response_model=msg_schema.Msg)
+async def logout(
+    token: str = Depends(deps.oauth2_scheme),
+    current_user: user_schema.UserRead = Depends(deps.get_current_active_user),
+):
+    """
+    Revoke the access token used for this request. (Protected)
+    """
+    security.revoke_access_token(token)
+    return {"message": "Logged out"}
+
+
 @router.post("/users/", response_model=user_schema.UserRead, status_code=status.HTTP_201_CREATED)
-def create_new_user(
+async def create_new_user(
     *,
-    db: Session = Depends(get_db),
+    db: AnySession = Depends(get_db),
     user_in: user_schema.UserCreate,
 ):
     """
     Create new user. Public endpoint.
     """
-    user = crud_user.get_user_by_username(db, username=user_in.username)
+    user = await run_db(db, crud_user.get_user_by_username, username=user_in.username)
     if user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="The user with this username already exists in the system.",
         )
-    user_email = crud_user.get_user_by_email(db, email=user_in.email)
+    user_email = await run_db(db, crud_user.get_user_by_email, email=user_in.email)
     if user_email:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="The user with this email already exists in the system.",
         )
-    user = crud_user.create_user(db=db, user_in=user_in)
-    return user
+    hashed_password = await security.get_password_hash_async(user_in.password)
+    user = await run_db(db, crud_user.create_user, user_in=user_in, hashed_password=hashed_password)
+    return respond(user_schema.UserRead, user, status_code=status.HTTP_201_CREATED)
 
 @router.get("/users/me", response_model=user_schema.UserRead)
-def read_users_me(
+async def read_users_me(
     current_user: user_schema.UserRead = Depends(deps.get_current_active_user),
 ):
     """
     Get current user.
     """
-    return current_user
\ No newline at end of file
+    return respond(user_schema.UserRead, current_user)
+
+@router.get("/users/me/loans", response_model=List[loan_schema.LoanRead])
+async def read_users_me_loans(
+    db: AnySession = Depends(get_db),
+    current_user: user_schema.UserRead = Depends(deps.get_current_active_user),
+):
+    """
+    Get the books the current user holds, oldest loan first.
+    """
+    loans = await run_db(db, crud_loan.get_active_loans, user_id=current_user.id)
+    return respond(loan_schema.LoanRead, loans, many=True)
@@ -1,85 +1,191 @@
+import logging
+from datetime import datetime
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlmodel import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from pydantic import ValidationError
 
 from app.api import deps
+from app.core.conditional import cache_headers, is_not_modified
+from app.core import singleflight
+from app.core.config import settings
+from app.core.ingest import CSV_CONTENT_TYPES, NDJSON_CONTENT_TYPES, iter_records
+from app.core.metrics import TimedRoute
+from app.core.pagination import decode_cursor, encode_cursor
+from app.core.serialization import respond
 from app.crud import crud_book
+from app.db.session import AnySession, run_db
 from app.models.user import User
 from app.models.book import Book as ModelBook
 from app.schemas import book as book_schema
 from app.schemas import msg as msg_schema
 
 
-router = APIRouter()
+logger = logging.getLogger(__name__)
+
+router = APIRouter(route_class=TimedRoute)
+
+MAX_REPORTED_IMPORT_ERRORS = 1000
+
+# Identical concurrent reads share one query (see SINGLE_FLIGHT_ROUTES). Keys
+# include the database, so reads kept on the primary never join replica reads,
+# and no read joins one that started before this process's last book write, so
+# a client that writes and then reads sees its write.
+list_books_flight = singleflight.group(f"GET {settings.API_V1_STR}/books/")
+read_book_flight = singleflight.group(f"GET {settings.API_V1_STR}/books/{{book_id}}")
 
 @router.post("/", response_model=book_schema.BookRead, status_code=status.HTTP_201_CREATED)
-def create_book(
+async def create_book(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AnySession = Depends(deps.get_db),
     book_in: book_schema.BookCreate,
     current_user: User = Depends(deps.get_current_active_user) # Protected
 ):
     """
     Add a new book. (Protected)
     """    
-    return crud_book.create_book(db=db, book_in=book_in)
+    book = await run_db(db, crud_book.create_book, book_in=book_in)
+    return respond(book_schema.BookRead, book, status_code=status.HTTP_201_CREATED)
+
+def _describe_import_error(error: ValueError) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors()
+        )
+    return str(error)
+
+@router.post("/bulk", response_model=book_schema.BookImportResult)
+async def import_books(
+    request: Request,
+    db: AnySession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_user) # Protected
+):
+    """
+    Bulk import books from a streamed CSV (text/csv, with a header row) or
+    NDJSON (application/x-ndjson) body. Books with an existing ISBN are updated.
+    Invalid rows are skipped and reported by line number. (Protected)
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type not in CSV_CONTENT_TYPES | NDJSON_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send text/csv or application/x-ndjson",
+        )
+
+    processed = imported = failed = 0
+    errors: List[book_schema.BookImportError] = []
+    chunk: List[book_schema.BookCreate] = []
+    async for line, record in iter_records(request.stream(), content_type, settings.BOOK_IMPORT_MAX_LINE_BYTES):
+        processed += 1
+        try:
+            if isinstance(record, ValueError):
+                raise record
+            chunk.append(book_schema.BookCreate.model_validate(record))
+        except ValueError as e:
+            failed += 1
+            if len(errors) < MAX_REPORTED_IMPORT_ERRORS:
+                errors.append(book_schema.BookImportError(line=line, error=_describe_import_error(e)))
+            continue
+        if len(chunk) >= settings.BOOK_IMPORT_CHUNK_SIZE:
+            imported += await run_db(db, crud_book.upsert_books, books_in=chunk)
+            chunk = []
+            logger.info("Book import: %d rows processed, %d imported, %d failed", processed, imported, failed)
+    if chunk:
+        imported += await run_db(db, crud_book.upsert_books, books_in=chunk)
+    logger.info("Book import finished: %d rows processed, %d imported, %d failed", processed, imported, failed)
+    return {"processed": processed, "imported": imported, "failed": failed, "errors": errors}
 
 @router.get("/", response_model=List[book_schema.BookRead])
-def list_books(
-    db: Session = Depends(deps.get_db),
+async def list_books(
+    request: Request,
+    db: AnySession = Depends(deps.get_read_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     title: Optional[str] = Query(None, min_length=1, max_length=50),
-    author: Optional[str] = Query(None, min_length=1, max_length=50)
+    author: Optional[str] = Query(None, min_length=1, max_length=50),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous X-Next-Cursor header")
 ):
     """
     List all books with pagination and filtering. (Public)
+    Title/author searches are ranked by relevance and paginated with skip/limit;
+    otherwise, when a page is full, the X-Next-Cursor header holds the cursor for the next one.
+    The body is assembled from cached BookRead JSON, so it bypasses response_model serialisation;
+    a matching If-None-Match gets 304 with no body.
     """
-    books = crud_book.get_books(db=db, skip=skip, limit=limit, title=title, author=author)
-    return books
+    searching = bool(title or author)
+    if searching and cursor:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="cursor cannot be combined with title/author search")
+    after_id = None
+    if cursor:
+        try:
+            (book_id,) = decode_cursor(cursor)
+            after_id = int(book_id)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    page = await list_books_flight.do(
+        (id(db.get_bind()), skip, limit, title, author, after_id),
+        lambda: run_db(
+            db, crud_book.get_books_cached, skip=skip, limit=limit, title=title, author=author, after_id=after_id
+        ),
+        not_before=crud_book.last_write_committed_at(),
+    )
+    headers = cache_headers(page.etag)
+    if not searching and len(page.ids) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(page.ids[-1])
+    if is_not_modified(request, page.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=page.body, media_type="application/json", headers=headers)
 
 @router.get("/{book_id}", response_model=book_schema.BookRead)
-def read_book(
+async def read_book(
     *,
-    db: Session = Depends(deps.get_db),
+    request: Request,
+    db: AnySession = Depends(deps.get_read_db),
     book_id: int,
 ):
     """
     Get a specific book by ID. (Public - not specified but good to have)
     """
-    db_book = crud_book.get_book(db=db, book_id=book_id)
-    if not db_book:
+    cached = await read_book_flight.do(
+        (id(db.get_bind()), book_id),
+        lambda: run_db(db, crud_book.get_book_cached, book_id=book_id),
+        not_before=crud_book.last_write_committed_at(),
+    )
+    if cached is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
-    return db_book
+    last_modified = datetime.fromisoformat(cached.updated_at)
+    headers = cache_headers(cached.etag, last_modified)
+    if is_not_modified(request, cached.etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
 
 
 @router.delete("/{book_id}", response_model=msg_schema.Msg)
-def remove_book(
+async def remove_book(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AnySession = Depends(deps.get_db),
     book_id: int,
     current_user: User = Depends(deps.get_current_active_user) # Protected
 ):
     """
     Remove a book. (Protected)
     """
-    book_to_delete = crud_book.get_book(db=db, book_id=book_id)
+    book_to_delete = await run_db(db, crud_book.get_book, book_id=book_id)
     if not book_to_delete:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
     
-    crud_book.delete_book(db=db, book_id=book_id)
+    await run_db(db, crud_book.delete_book, book_id=book_id)
     return {"message": f"Book with ID {book_id} removed successfully"}
 
 @router.put("/{book_id}", response_model=book_schema.BookRead)
-def update_book_details(
+async def update_book_details(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AnySession = Depends(deps.get_db),
     book_id: int,
     book_in: book_schema.BookUpdate,
     current_user: User = Depends(deps.get_current_active_user)
 ):
-    db_book = crud_book.get_book(db=db, book_id=book_id)
+    db_book = await run_db(db, crud_book.get_book, book_id=book_id)
     if not db_book:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
-    updated_book = crud_book.update_book(db=db, db_book=db_book, book_in=book_in)
-    return updated_book
\ No newline at end of file
+    updated_book = await run_db(db, crud_book.update_book, db_book=db_book, book_in=book_in)
+    return respond(book_schema.BookRead, updated_book)
\ No newline at end of file
@@ -0,0 +1,84 @@
+from typing import AsyncIterator, Dict, List, Optional
+from fastapi import APIRouter, Depends, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.events import FeedEvent, OutboxBroker, render_event
+from app.core.metrics import TimedRoute
+from app.crud import crud_outbox
+from app.db import session as db_session
+
+router = APIRouter(route_class=TimedRoute)
+
+EVENT_STREAM_MEDIA_TYPE = "text/event-stream"
+# Tells EventSource clients how long to wait before reconnecting.
+RECONNECT_MILLISECONDS = 3000
+
+_brokers: Dict[Engine, OutboxBroker] = {}
+
+def broker_for(engine: Engine) -> OutboxBroker:
+    """The process-wide change feed of the database behind `engine`."""
+    broker = _brokers.get(engine)
+    if broker is None:
+        def latest() -> int:
+            with Session(engine) as db:
+                return crud_outbox.get_latest_sequence(db)
+
+        def fetch(after: int, limit: int, until: Optional[int]) -> List[FeedEvent]:
+            with Session(engine) as db:
+                return [
+                    render_event(event.id, event.event_type, event.book_id, event.created_at, event.payload)
+                    for event in crud_outbox.get_events_after(db, after, limit, until)
+                ]
+
+        broker = _brokers[engine] = OutboxBroker(
+            latest,
+            fetch,
+            poll_interval=settings.OUTBOX_POLL_INTERVAL_SECONDS,
+            buffer_size=settings.EVENT_BUFFER_SIZE,
+            gap_seconds=settings.OUTBOX_GAP_SECONDS,
+        )
+        crud_outbox.commit_listeners.append(broker.notify)
+    return broker
+
+async def get_broker() -> OutboxBroker:
+    # Subscribers may stay connected for hours, so they hold no session or pool slot.
+    return broker_for(db_session.engine)
+
+async def _event_stream(broker: OutboxBroker, after: Optional[int], limit: int) -> AsyncIterator[bytes]:
+    async with broker.subscribe():
+        yield f"retry: {RECONNECT_MILLISECONDS}\n\n".encode()
+        while True:
+            events, after = await broker.read(after, settings.EVENT_STREAM_HEARTBEAT_SECONDS, limit)
+            yield b"".join(event.frame for event in events) if events else b": keep-alive\n\n"
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    broker: OutboxBroker = Depends(get_broker),
+    after: Optional[int] = Query(None, ge=0, description="Resume after this sequence number; by default only new events are sent"),
+    wait: float = Query(25, ge=0, le=60, description="Long-poll only: seconds to wait for an event"),
+    limit: int = Query(100, ge=1, le=1000),
+    last_event_id: Optional[int] = Header(None, ge=0),
+):
+    """
+    Feed of book and transaction changes, in commit order. (Public)
+    With `Accept: text/event-stream` this is a Server-Sent Events stream whose
+    event ids are sequence numbers, so EventSource resumes with Last-Event-ID
+    after a reconnect. Otherwise it long-polls: it returns
+    `{"events": [...], "next": cursor}` as soon as there are events after the
+    cursor, or an empty list after `wait` seconds; pass `next` as `after` to continue.
+    """
+    cursor = last_event_id if last_event_id is not None else after
+    if EVENT_STREAM_MEDIA_TYPE in request.headers.get("accept", ""):
+        return StreamingResponse(
+            _event_stream(broker, cursor, limit),
+            media_type=EVENT_STREAM_MEDIA_TYPE,
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    async with broker.subscribe():
+        events, cursor = await broker.read(cursor, wait, limit)
+    body = '{"events":[' + ",".join(event.data for event in events) + f'],"next":{cursor}}}'
+    return Response(content=body, media_type="application/json")
@@ -0,0 +1,42 @@
+from datetime import date
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app.api import deps
+from app.core.metrics import TimedRoute
+from app.crud import crud_stats
+from app.db.session import AnySession, run_db
+from app.schemas import stats as stats_schema
+
+router = APIRouter(route_class=TimedRoute)
+
+@router.get("/books/top", response_model=List[stats_schema.BookStatsRead])
+async def top_books(
+    db: AnySession = Depends(deps.get_db),
+    since: Optional[date] = Query(None, description="First day included (UTC)"),
+    until: Optional[date] = Query(None, description="First day excluded (UTC)"),
+    limit: int = Query(10, ge=1, le=100),
+    by: Literal["lends", "returns"] = Query("lends", description="Rank by lends or returns")
+):
+    """
+    Most circulated books over a date range. (Public)
+    Read from the per book per day rollup, never from raw transactions.
+    """
+    return await run_db(db, crud_stats.get_top_books, since=since, until=until, limit=limit, by=by)
+
+
+@router.get("/daily", response_model=List[stats_schema.DailyStatsRead])
+async def daily_counts(
+    db: AnySession = Depends(deps.get_db),
+    since: Optional[date] = Query(None, description="First day included (UTC)"),
+    until: Optional[date] = Query(None, description="First day excluded (UTC)"),
+    book_id: Optional[int] = Query(None, description="Only this book"),
+    user_id: Optional[int] = Query(None, description="Only this user")
+):
+    """
+    Lends and returns per day over a date range, for everything, one book or one user. (Public)
+    """
+    try:
+        return await run_db(db, crud_stats.get_daily_counts, since=since, until=until, book_id=book_id, user_id=user_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -1,89 +1,195 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from datetime import datetime
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session
 
 from app.api import deps
-from app.crud import crud_transaction, crud_book
+from app.core.conditional import cache_headers, is_not_modified, make_etag
+from app.core.config import settings
+from app.core.export import CSV_MEDIA_TYPE, NDJSON_MEDIA_TYPE, iter_csv, iter_ndjson
+from app.core.metrics import TimedRoute
+from app.core.pagination import decode_cursor, encode_cursor
+from app.core.serialization import dump_json, respond
+from app.crud import crud_transaction
+from app.db.session import AnySession, run_db, sync_engine_for
 from app.models.user import User
 from app.models.transaction import TransactionType
 from app.schemas import transaction as transaction_schema
 from app.schemas import msg as msg_schema
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 @router.post("/give", response_model=transaction_schema.TransactionRead, status_code=status.HTTP_201_CREATED)
-def lend_book_to_user(
+async def lend_book_to_user(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AnySession = Depends(deps.get_db),
     transaction_in: transaction_schema.TransactionCreateGive,
     current_user: User = Depends(deps.get_current_active_user) # Protected
 ):
     """
     Lend a book to the current authenticated user. (Protected)
     """
-    book = crud_book.get_book(db=db, book_id=transaction_in.book_id)
-    if not book:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
-    
-    if book.available_quantity <= 0:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Book is not available for lending")
-
     try:
-        transaction = crud_transaction.create_transaction(
-            db=db,
-            book=book,
+        transaction = await run_db(
+            db,
+            crud_transaction.create_transaction,
+            book_id=transaction_in.book_id,
             user=current_user,
             transaction_type=TransactionType.LEND
         )
-        db.refresh(transaction, attribute_names=['book', 'user'])
-        return transaction
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if not transaction:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
+    return respond(transaction_schema.TransactionRead, transaction, status_code=status.HTTP_201_CREATED)
 
 
 @router.post("/take", response_model=transaction_schema.TransactionRead, status_code=status.HTTP_201_CREATED)
-def return_book_from_user(
+async def return_book_from_user(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AnySession = Depends(deps.get_db),
     transaction_in: transaction_schema.TransactionCreateTake,
     current_user: User = Depends(deps.get_current_active_user) # Protected
 ):
     """
     Return a book from the current authenticated user. (Protected)
     """
-    book = crud_book.get_book(db=db, book_id=transaction_in.book_id)
-    if not book:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
-
-    if book.available_quantity >= book.total_quantity:
-         pass
-
     try:
-        transaction = crud_transaction.create_transaction(
-            db=db,
-            book=book,
+        transaction = await run_db(
+            db,
+            crud_transaction.create_transaction,
+            book_id=transaction_in.book_id,
             user=current_user,
             transaction_type=TransactionType.RETURN
         )
-        db.refresh(transaction, attribute_names=['book', 'user'])
-        return transaction
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if not transaction:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
+    return respond(transaction_schema.TransactionRead, transaction, status_code=status.HTTP_201_CREATED)
+
+
+@router.post("/batch", response_model=List[transaction_schema.TransactionBatchItemResult], status_code=status.HTTP_201_CREATED)
+async def batch_lend_and_return(
+    *,
+    db: AnySession = Depends(deps.get_db),
+    batch_in: transaction_schema.TransactionBatchCreate,
+    current_user: User = Depends(deps.get_current_active_user) # Protected
+):
+    """
+    Lend and/or return several books for the current authenticated user in one database transaction. (Protected)
+    With `atomic` (the default) any failing item fails the whole batch with 400 and per-item errors;
+    otherwise each item reports its own transaction or error.
+    """
+    outcomes = await run_db(
+        db,
+        crud_transaction.create_transactions_batch,
+        items=[(item.book_id, item.type) for item in batch_in.items],
+        user=current_user,
+        atomic=batch_in.atomic
+    )
+    results = [
+        transaction_schema.TransactionBatchItemResult(
+            book_id=item.book_id, type=item.type, transaction=transaction, error=error
+        )
+        for item, (transaction, error) in zip(batch_in.items, outcomes)
+    ]
+    if batch_in.atomic and any(result.error for result in results):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=[
+                {"index": index, "book_id": result.book_id, "error": result.error}
+                for index, result in enumerate(results) if result.error
+            ]
+        )
+    return respond(
+        transaction_schema.TransactionBatchItemResult, results, many=True, status_code=status.HTTP_201_CREATED
+    )
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_transactions(
+    db: AnySession = Depends(deps.get_db),
+    format: Literal["ndjson", "csv"] = Query("ndjson", description="Output format"),
+    user_id: Optional[int] = Query(None, description="Filter by user ID"),
+    book_id: Optional[int] = Query(None, description="Filter by book ID"),
+    since: Optional[datetime] = Query(None, description="Only transactions at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only transactions before this time"),
+    current_user: User = Depends(deps.get_current_active_user) # Protected
+):
+    """
+    Stream all matching transactions, oldest first, as NDJSON or CSV. (Protected)
+    Rows are flat (no nested book or user) and memory use is constant in the result size.
+    Archived months (TRANSACTION_ARCHIVE_DIR) are included ahead of the live rows.
+    """
+    # Archived and live rows must be filtered by the same instant.
+    since, until = crud_transaction.naive_utc(since), crud_transaction.naive_utc(until)
+    # The request's session is closed before the body is sent, so the stream opens its own.
+    bind = sync_engine_for(db)
+
+    def batches():
+        yield from crud_transaction.iter_archived_transaction_batches(
+            settings.TRANSACTION_ARCHIVE_DIR,
+            user_id=user_id,
+            book_id=book_id,
+            since=since,
+            until=until,
+            batch_size=settings.TRANSACTION_EXPORT_BATCH_SIZE
+        )
+        with Session(bind) as stream_db:
+            yield from crud_transaction.iter_transaction_batches(
+                stream_db,
+                user_id=user_id,
+                book_id=book_id,
+                since=since,
+                until=until,
+                batch_size=settings.TRANSACTION_EXPORT_BATCH_SIZE
+            )
+
+    columns = crud_transaction.EXPORT_COLUMNS
+    if format == "csv":
+        return StreamingResponse(
+            iter_csv(columns, batches()),
+            media_type=CSV_MEDIA_TYPE,
+            headers={"Content-Disposition": 'attachment; filename="transactions.csv"'}
+        )
+    return StreamingResponse(iter_ndjson(columns, batches()), media_type=NDJSON_MEDIA_TYPE)
 
 
 @router.get("/", response_model=List[transaction_schema.TransactionRead])
-def list_transactions(
-    db: Session = Depends(deps.get_db),
+async def list_transactions(
+    request: Request,
+    db: AnySession = Depends(deps.get_read_db),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     user_id: Optional[int] = Query(None, description="Filter by user ID"),
-    book_id: Optional[int] = Query(None, description="Filter by book ID")
+    book_id: Optional[int] = Query(None, description="Filter by book ID"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous X-Next-Cursor header")
 ):
     """
     List all transactions. (Public)
     Allows filtering by user_id or book_id.
+    When a page is full, the X-Next-Cursor header holds the cursor for the next one.
+    The ETag hashes the body (nested books and users can change), so a matching
+    If-None-Match gets 304 with no body.
     """
-    transactions = crud_transaction.get_transactions(db=db, skip=skip, limit=limit, user_id=user_id, book_id=book_id)
-    for t in transactions:
-        db.refresh(t, attribute_names=['book', 'user'])
-    return transactions
\ No newline at end of file
+    before = None
+    if cursor:
+        try:
+            timestamp, transaction_id = decode_cursor(cursor)
+            before = (datetime.fromisoformat(timestamp), int(transaction_id))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    transactions = await run_db(
+        db, crud_transaction.get_transactions, skip=skip, limit=limit, user_id=user_id, book_id=book_id, before=before
+    )
+    body = dump_json(transaction_schema.TransactionRead, transactions, many=True)
+    etag = make_etag(body)
+    headers = cache_headers(etag)
+    if len(transactions) == limit:
+        last = transactions[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last.timestamp.isoformat(), last.id)
+    if is_not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
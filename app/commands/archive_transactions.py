@@ -0,0 +1,90 @@
+"""
+Moves whole months of transactions out of the database into compressed
+archive files, which GET /transactions/export keeps serving.
+
+    python -m app.commands.archive_transactions --before 2024-01 [--format ndjson|parquet] [--dir archive/]
+
+Each month older than --before is written to `<dir>/transactions-YYYY-MM.<ext>`,
+the row count is checked against the database, and only then are the rows
+removed: the monthly partition is detached and dropped on PostgreSQL, the
+range is deleted elsewhere. Parquet output needs the optional `pyarrow` package.
+The circulation rollups (/stats) are left as they are.
+"""
+import argparse
+import os
+import sys
+from datetime import date, datetime
+from typing import List, Tuple
+
+from sqlalchemy import delete, func
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from app.core import archive
+from app.core.config import settings
+from app.crud import crud_transaction
+from app.db import partitions
+from app.db.session import engine
+from app.models.transaction import Transaction
+
+
+def _month(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+def _bounds(month: date) -> Tuple[datetime, datetime]:
+    return datetime.combine(month, datetime.min.time()), datetime.combine(partitions.add_months(month, 1), datetime.min.time())
+
+
+def archive_before(bind: Engine, before: date, directory: str, format: str = archive.NDJSON) -> List[Tuple[date, int]]:
+    """Archives and removes every month before `before`; returns `(month, rows)` per archived month."""
+    os.makedirs(directory, exist_ok=True)
+    archived = []
+    with Session(bind) as db:
+        first = db.exec(select(func.min(Transaction.timestamp))).one()
+        if first is None:
+            return archived
+        month = partitions.month_start(first.date())
+        while month < before:
+            since, until = _bounds(month)
+            expected = db.exec(
+                select(func.count()).where(Transaction.timestamp >= since, Transaction.timestamp < until)
+            ).one()
+            if expected:
+                path = archive.archive_path(directory, month, format)
+                with Session(bind) as stream_db:
+                    written = archive.write_archive(
+                        path,
+                        crud_transaction.EXPORT_COLUMNS,
+                        crud_transaction.iter_transaction_batches(
+                            stream_db, since=since, until=until, batch_size=settings.TRANSACTION_EXPORT_BATCH_SIZE
+                        ),
+                    )
+                if written != expected:
+                    os.remove(path)
+                    raise RuntimeError(f"{month:%Y-%m}: wrote {written} rows, expected {expected}; nothing removed")
+                archived.append((month, written))
+            connection = db.connection()
+            if not (partitions.is_partitioned(connection) and partitions.drop_partition(connection, month)):
+                db.exec(delete(Transaction).where(Transaction.timestamp >= since, Transaction.timestamp < until))
+            db.commit()
+            month = partitions.add_months(month, 1)
+    return archived
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--before", type=_month, required=True, help="First month kept in the database (YYYY-MM)")
+    parser.add_argument("--format", choices=sorted(archive.EXTENSIONS), default=archive.NDJSON)
+    parser.add_argument("--dir", default=settings.TRANSACTION_ARCHIVE_DIR, help="Archive directory (default: TRANSACTION_ARCHIVE_DIR)")
+    args = parser.parse_args()
+    if not args.dir:
+        parser.error("--dir is required when TRANSACTION_ARCHIVE_DIR is not set")
+
+    for month, rows in archive_before(engine, args.before, args.dir, args.format):
+        print(f"{month:%Y-%m}: archived {rows} transactions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""
+Compares the circulation rollups with counts recomputed from raw transactions.
+
+    python -m app.commands.check_stats [--since 2024-01-01] [--until 2024-02-01] [--repair]
+
+Exits 1 if any mismatch is found (after repairing it, with --repair). Days
+before the oldest transaction still in the database (e.g. archived months) are
+neither checked nor rebuilt.
+"""
+import argparse
+import sys
+from datetime import date
+
+from sqlmodel import Session
+
+from app.crud import crud_stats
+from app.db.session import engine
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--since", type=date.fromisoformat, help="First day checked (default and earliest: first transaction in the database)")
+    parser.add_argument("--until", type=date.fromisoformat, help="First day not checked (default: after the last transaction)")
+    parser.add_argument("--repair", action="store_true", help="Rebuild the checked range from raw transactions")
+    args = parser.parse_args()
+
+    with Session(engine) as db:
+        mismatches = crud_stats.find_rollup_mismatches(db, since=args.since, until=args.until)
+        for mismatch in mismatches:
+            print(mismatch)
+        print(f"{len(mismatches)} mismatched rollup rows")
+        if mismatches and args.repair:
+            crud_stats.rebuild_rollups(db, since=args.since, until=args.until)
+            print("rebuilt")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+"""
+Creates the monthly `transaction` partitions ahead of time on PostgreSQL.
+Run it from cron, e.g. monthly:
+
+    python -m app.commands.ensure_partitions [--months-ahead 12]
+"""
+import argparse
+import sys
+from datetime import date
+
+from app.db import partitions
+from app.db.session import engine
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--months-ahead", type=int, default=12)
+    args = parser.parse_args()
+
+    with engine.begin() as conn:
+        if not partitions.is_partitioned(conn):
+            print("transaction is not a partitioned table; nothing to do")
+            return 0
+        this_month = partitions.month_start(date.today())
+        created = partitions.ensure_partitions(conn, this_month, partitions.add_months(this_month, args.months_ahead))
+    for name in created:
+        print(f"created {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
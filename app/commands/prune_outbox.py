@@ -0,0 +1,30 @@
+"""
+Deletes change-feed events older than the given age from the outbox table.
+Feed clients can only resume from a cursor that is still in the table, so
+keep more than the longest disconnect you want to survive. Run it from cron:
+
+    python -m app.commands.prune_outbox [--days 7]
+"""
+import argparse
+import sys
+from datetime import datetime, timedelta
+
+from sqlmodel import Session
+
+from app.crud import crud_outbox
+from app.db.session import engine
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=float, default=7)
+    args = parser.parse_args()
+
+    with Session(engine) as db:
+        deleted = crud_outbox.delete_events_before(db, datetime.utcnow() - timedelta(days=args.days))
+    print(f"deleted {deleted} outbox events")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
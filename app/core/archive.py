@@ -0,0 +1,92 @@
+import gzip
+import json
+import os
+import re
+from datetime import date
+from typing import Any, Callable, Iterable, Iterator, List, Sequence, Tuple
+
+from app.core.export import iter_ndjson, plain_value
+
+NDJSON = "ndjson"
+PARQUET = "parquet"
+EXTENSIONS = {NDJSON: ".ndjson.gz", PARQUET: ".parquet"}
+
+_ARCHIVE_NAME = re.compile(r"^transactions-(\d{4})-(\d{2})(\.ndjson\.gz|\.parquet)$")
+
+
+def archive_path(directory: str, month: date, format: str) -> str:
+    return os.path.join(directory, f"transactions-{month:%Y-%m}{EXTENSIONS[format]}")
+
+
+def archived_months(directory: str) -> List[Tuple[date, str]]:
+    """`(month, path)` for every archive file in `directory`, oldest first."""
+    if not directory or not os.path.isdir(directory):
+        return []
+    found = []
+    for name in os.listdir(directory):
+        match = _ARCHIVE_NAME.match(name)
+        if match:
+            found.append((date(int(match.group(1)), int(match.group(2)), 1), os.path.join(directory, name)))
+    return sorted(found)
+
+
+def write_archive(path: str, columns: Sequence[str], batches: Iterable[Sequence[Sequence[Any]]]) -> int:
+    """
+    Writes rows to a gzip-compressed NDJSON or (with pyarrow installed) a
+    zstd-compressed Parquet file, batch by batch. The file only appears at
+    `path` once it is complete. Returns the number of rows written.
+    """
+    partial = path + ".partial"
+    written = 0
+    if path.endswith(EXTENSIONS[PARQUET]):
+        import pyarrow
+        import pyarrow.parquet
+
+        writer = None
+        try:
+            for rows in batches:
+                table = pyarrow.Table.from_pylist([dict(zip(columns, map(plain_value, row))) for row in rows])
+                if writer is None:
+                    writer = pyarrow.parquet.ParquetWriter(partial, table.schema, compression="zstd")
+                writer.write_table(table)
+                written += len(rows)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            return 0
+    else:
+        def counted():
+            nonlocal written
+            for rows in batches:
+                written += len(rows)
+                yield rows
+
+        with gzip.open(partial, "wt", encoding="utf-8") as stream:
+            stream.writelines(iter_ndjson(columns, counted()))
+    os.replace(partial, path)
+    return written
+
+
+def iter_archive(
+    path: str,
+    columns: Sequence[str],
+    convert: Callable[[dict], Sequence[Any]],
+    batch_size: int = 1000
+) -> Iterator[List[Sequence[Any]]]:
+    """Reads an archive written by `write_archive` back as batches of `convert(record)` rows."""
+    if path.endswith(EXTENSIONS[PARQUET]):
+        import pyarrow.parquet
+
+        for record_batch in pyarrow.parquet.ParquetFile(path).iter_batches(batch_size=batch_size, columns=list(columns)):
+            yield [convert(record) for record in record_batch.to_pylist()]
+        return
+    batch = []
+    with gzip.open(path, "rt", encoding="utf-8") as stream:
+        for line in stream:
+            batch.append(convert(json.loads(line)))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,136 @@
+import json
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire `ttl` seconds after being set.
+    A `ttl` or `maxsize` of 0 disables the cache.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else min(ttl, self.ttl))
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": _hit_ratio(self.hits, self.misses),
+                "size": len(self._data),
+            }
+
+
+class SharedCache:
+    """
+    TTLCache-compatible cache on a Redis-style client (`get`, `set(..., ex=)`,
+    `delete`, `scan_iter`), so every worker process sees the same entries and
+    invalidations. Values must be JSON-serialisable.
+    """
+
+    def __init__(self, client: Any, ttl: float, prefix: str):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _key(self, key: Hashable) -> str:
+        parts = list(key) if isinstance(key, tuple) else [key]
+        return self.prefix + json.dumps(parts, separators=(",", ":"))
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        raw = self.client.get(self._key(key))
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        if not self.enabled:
+            return
+        seconds = self.ttl if ttl is None else min(ttl, self.ttl)
+        self.client.set(self._key(key), json.dumps(value), ex=max(1, int(seconds)))
+
+    def delete(self, key: Hashable) -> None:
+        self.client.delete(self._key(key))
+
+    def clear(self) -> None:
+        for name in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(name)
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "hit_ratio": _hit_ratio(self.hits, self.misses)}
+
+
+def _hit_ratio(hits: int, misses: int) -> float:
+    lookups = hits + misses
+    return hits / lookups if lookups else 0.0
+
+
+def make_cache(url: Optional[str], maxsize: int, ttl: float, prefix: str):
+    """
+    Returns a SharedCache on the Redis server at `url`, or an in-process
+    TTLCache when no url is configured. The `redis` package is only needed
+    for the shared backend.
+    """
+    if not url:
+        return TTLCache(maxsize=maxsize, ttl=ttl)
+    import redis
+
+    return SharedCache(redis.Redis.from_url(url), ttl=ttl, prefix=prefix)
@@ -1,9 +1,15 @@
 import secrets
-from typing import Optional
+from typing import Dict, List, Optional
 
 from pydantic_settings import BaseSettings
 from pydantic import PostgresDsn, validator
 
+def _asyncpg_url(url: Optional[object]) -> Optional[str]:
+    url = str(url or "")
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return None
+
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Inventory Management System API"
     PROJECT_VERSION: str = "1.0.0"
@@ -26,15 +32,131 @@ class Settings(BaseSettings):
             path=f"/{values.get('POSTGRES_DB') or ''}",
         ))
 
+    # Connection pool and engine settings, shared by the sync and async engines
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+    DB_ECHO: bool = False
+
+    # Opt-in query profiler: slow-query log with EXPLAIN plans and per-request N+1 warnings
+    DB_PROFILE: bool = False
+    DB_SLOW_QUERY_MS: float = 200
+    DB_EXPLAIN_SLOW_QUERIES: bool = True
+    DB_REPEATED_STATEMENT_THRESHOLD: int = 5
+
+    # Serve requests from an AsyncSession (asyncpg/aiosqlite) instead of the threadpool
+    DB_ASYNC: bool = False
+    ASYNC_DATABASE_URL: Optional[str] = None
+
+    @validator("ASYNC_DATABASE_URL", pre=True, always=True)
+    def assemble_async_db_connection(cls, v: Optional[str], values: dict) -> Optional[str]:
+        if isinstance(v, str):
+            return v
+        return _asyncpg_url(values.get("DATABASE_URL"))
+
+    # Optional read replica for public reads (books, transactions listing). A user's
+    # reads stay on the primary for READ_YOUR_WRITES_SECONDS after they commit a write.
+    READ_DATABASE_URL: Optional[str] = None
+    ASYNC_READ_DATABASE_URL: Optional[str] = None
+    READ_YOUR_WRITES_SECONDS: float = 5
+
+    @validator("ASYNC_READ_DATABASE_URL", pre=True, always=True)
+    def assemble_async_read_db_connection(cls, v: Optional[str], values: dict) -> Optional[str]:
+        if isinstance(v, str):
+            return v
+        return _asyncpg_url(values.get("READ_DATABASE_URL"))
+
     SECRET_KEY: str = secrets.token_urlsafe(32)
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
-    # API V1 prefix
+    # Verified-token cache used by deps.get_current_user; entries also expire with the token
+    TOKEN_CACHE_TTL_SECONDS: int = 1800
+    TOKEN_CACHE_MAX_SIZE: int = 10_000
+
+    # Password hashing: bcrypt cost and the bounded pool it runs on
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_SIZE: int = 8
+
+    # API V1 prefix; the route defaults below are built from it
     API_V1_STR: str = "/api/v1"
 
+    # Token-bucket limits per client (user, else IP), by "METHOD /route/template"; RATE_LIMIT_URL (redis://...) shares buckets between workers
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_URL: Optional[str] = None
+    RATE_LIMITS: Optional[Dict[str, str]] = None
+    RATE_LIMIT_DEFAULT: Optional[str] = None
+    # Behind a proxy, the header it sets to the client address (e.g. "X-Forwarded-For"); the last
+    # address in it, the one the proxy appended, keys anonymous clients instead of the proxy's IP
+    RATE_LIMIT_FORWARDED_HEADER: Optional[str] = None
+
+    @validator("RATE_LIMITS", pre=True, always=True)
+    def default_rate_limits(cls, v: Optional[Dict[str, str]], values: dict) -> Dict[str, str]:
+        if v is not None:
+            return v
+        prefix = values.get("API_V1_STR", "")
+        return {
+            f"POST {prefix}/auth/login/token": "10/minute",
+            f"POST {prefix}/auth/users/": "5/minute",
+            f"GET {prefix}/books/": "30/second",
+        }
+
     LOCAL_DATABASE_URL: Optional[PostgresDsn] = None
 
+    # Authenticated-user cache used by deps.get_current_user; 0 disables it
+    USER_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_MAX_SIZE: int = 10_000
+
+    # Book read cache; set CACHE_URL (redis://...) to share it between worker processes
+    CACHE_URL: Optional[str] = None
+    BOOK_CACHE_TTL_SECONDS: int = 30
+    BOOK_CACHE_MAX_SIZE: int = 50_000
+
+    # Routes whose identical concurrent reads share one query ("METHOD /route/template")
+    SINGLE_FLIGHT_ROUTES: Optional[List[str]] = None
+
+    @validator("SINGLE_FLIGHT_ROUTES", pre=True, always=True)
+    def default_single_flight_routes(cls, v: Optional[List[str]], values: dict) -> List[str]:
+        if v is not None:
+            return v
+        prefix = values.get("API_V1_STR", "")
+        return [f"GET {prefix}/books/", f"GET {prefix}/books/{{book_id}}"]
+
+    # max-age sent with ETags on public reads; 0 makes clients revalidate every time
+    HTTP_CACHE_MAX_AGE_SECONDS: int = 0
+
+    # Rows per multi-row INSERT in POST /books/bulk
+    BOOK_IMPORT_CHUNK_SIZE: int = 1000
+    # Longest line (or multi-line CSV record) accepted by POST /books/bulk; longer ones are reported and skipped
+    BOOK_IMPORT_MAX_LINE_BYTES: int = 1024 * 1024
+
+    # Rows fetched per server-side cursor batch in GET /transactions/export
+    TRANSACTION_EXPORT_BATCH_SIZE: int = 1000
+
+    # Directory of monthly transaction archives (app.commands.archive_transactions), read back by the export
+    TRANSACTION_ARCHIVE_DIR: Optional[str] = None
+
+    # Change feed (GET /events/stream) tailing the outbox: poll interval, how long a
+    # missing sequence number is waited for, replay buffer size and SSE heartbeat
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 0.5
+    OUTBOX_GAP_SECONDS: float = 5
+    EVENT_BUFFER_SIZE: int = 10_000
+    EVENT_STREAM_HEARTBEAT_SECONDS: float = 15
+
+    # Per-route request metrics at GET /metrics (Prometheus text format) and a Server-Timing header
+    METRICS_ENABLED: bool = True
+    METRICS_SERVER_TIMING: bool = True
+
+    # Serialise trusted ORM rows straight to JSON with orjson (optional package), skipping response-model validation
+    FAST_JSON: bool = False
+
+    # Book search: "auto" uses pg_trgm on PostgreSQL and the in-process n-gram index elsewhere
+    SEARCH_BACKEND: str = "auto"
+
     class Config:
         env_file = ".env"
         env_file_encoding = 'utf-8'
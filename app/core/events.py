@@ -0,0 +1,207 @@
+"""
+Change feed fan-out. One OutboxBroker per database tails the outbox table on
+a single background task and hands each new event, rendered once as JSON and
+as a Server-Sent Events frame, to every subscriber in the process. Keeping up
+costs subscribers no queries; only a resume from before the in-memory buffer
+reads the backlog from the table.
+
+New events are picked up on the next poll, or straight away after a commit
+in this process (see `notify`).
+
+Sequence numbers are handed out before commit, so a lower one can become
+visible after a higher one. The tailer stops at a missing number and only
+skips it once it has been missing for `gap_seconds` since the tailer first
+saw the gap, taking it to belong to a rolled-back transaction.
+"""
+import asyncio
+import bisect
+import contextvars
+import json
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, Callable, List, NamedTuple, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+class FeedEvent(NamedTuple):
+    sequence: int
+    data: str
+    frame: bytes
+
+
+def render_event(sequence: int, event_type: str, book_id: Optional[int], created_at: datetime, payload: str) -> FeedEvent:
+    """The event as a JSON object (`payload` is already JSON) and as an SSE frame."""
+    data = (
+        f'{{"sequence":{sequence},"type":{json.dumps(event_type)},"book_id":{json.dumps(book_id)},'
+        f'"created_at":"{created_at.isoformat()}","data":{payload}}}'
+    )
+    return FeedEvent(sequence, data, f"id: {sequence}\nevent: {event_type}\ndata: {data}\n\n".encode())
+
+
+class OutboxBroker:
+    """
+    `latest()` returns the newest sequence number and `fetch(after, limit,
+    until)` up to `limit` events after a sequence number (and up to `until`,
+    if given), in order; both are blocking and run in the threadpool. The
+    tailer runs while anyone is subscribed and starts over (from the newest
+    event) after an idle period.
+    """
+
+    def __init__(
+        self,
+        latest: Callable[[], int],
+        fetch: Callable[[int, int, Optional[int]], List[FeedEvent]],
+        *,
+        poll_interval: float,
+        buffer_size: int,
+        gap_seconds: float,
+        batch_size: int = 1000,
+    ):
+        self.latest = latest
+        self.fetch = fetch
+        self.poll_interval = poll_interval
+        self.gap_seconds = gap_seconds
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        self.subscribers = 0
+        self.last_sequence = 0
+        self._sequences: List[int] = []
+        self._events: List[FeedEvent] = []
+        # The buffer holds every event after this sequence number.
+        self._floor = 0
+        # (first missing sequence number, loop time the tailer first saw it missing)
+        self._gap: Optional[Tuple[int, float]] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._ready = self._changed = self._wake = None
+
+    def _start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is not None and self._loop is loop and not self._task.done():
+            return
+        self._loop = loop
+        self._ready, self._changed, self._wake = asyncio.Event(), asyncio.Event(), asyncio.Event()
+        # A fresh context, so the tailer's queries are not counted against the request that started it.
+        self._task = contextvars.Context().run(loop.create_task, self._tail(loop))
+
+    async def _tail(self, loop: asyncio.AbstractEventLoop) -> None:
+        # A tailer started on another event loop (e.g. a test's) takes over;
+        # this one stops at its next step rather than share the buffer.
+        while True:
+            try:
+                latest = await run_in_threadpool(self.latest)
+                break
+            except Exception:
+                logger.exception("change feed: could not read the latest outbox sequence")
+                await asyncio.sleep(self.poll_interval)
+        if self._loop is not loop:
+            return
+        self.last_sequence = self._floor = latest
+        self._sequences, self._events = [], []
+        self._gap = None
+        self._ready.set()
+        while True:
+            try:
+                fetched = await run_in_threadpool(self.fetch, self.last_sequence, self.batch_size, None)
+            except Exception:
+                logger.exception("change feed: polling the outbox failed")
+                fetched = []
+            if self._loop is not loop:
+                return
+            events = self._settled(fetched)
+            if events:
+                self._publish(events)
+            if self.subscribers == 0:
+                self._task = None
+                return
+            if len(events) < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+
+    def _settled(self, events: List[FeedEvent]) -> List[FeedEvent]:
+        """The events up to the first gap that may still fill, timing each gap from when it is first seen."""
+        now = asyncio.get_running_loop().time()
+        expected = self.last_sequence + 1
+        for i, event in enumerate(events):
+            if event.sequence != expected:
+                if self._gap is None or self._gap[0] != expected:
+                    self._gap = (expected, now)
+                if now - self._gap[1] < self.gap_seconds:
+                    return events[:i]
+                logger.info("change feed: skipping sequence numbers %d-%d", expected, event.sequence - 1)
+            expected = event.sequence + 1
+        return events
+
+    def _publish(self, events: List[FeedEvent]) -> None:
+        self._events.extend(events)
+        self._sequences.extend(event.sequence for event in events)
+        self.last_sequence = events[-1].sequence
+        # Trim in chunks rather than on every event.
+        excess = len(self._events) - self.buffer_size
+        if excess > self.buffer_size // 4:
+            self._floor = self._sequences[excess - 1]
+            del self._events[:excess], self._sequences[:excess]
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def notify(self) -> None:
+        """Wakes the tailer now. Safe to call from any thread."""
+        loop, wake = self._loop, self._wake
+        if loop is None or wake is None:
+            return
+        try:
+            loop.call_soon_threadsafe(wake.set)
+        except RuntimeError:
+            # The loop has closed; the next subscriber starts a new tailer.
+            pass
+
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator["OutboxBroker"]:
+        self.subscribers += 1
+        try:
+            self._start()
+            await self._ready.wait()
+            yield self
+        finally:
+            self.subscribers -= 1
+
+    async def read(self, after: Optional[int], timeout: float, limit: int) -> Tuple[List[FeedEvent], int]:
+        """
+        Up to `limit` events after sequence number `after` (None: from now on),
+        waiting up to `timeout` seconds for the first one. Returns the events and
+        the cursor to resume from. Call inside `subscribe()`.
+        """
+        if after is None:
+            after = self.last_sequence
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            if after < self.last_sequence:
+                if after >= self._floor:
+                    start = bisect.bisect_right(self._sequences, after)
+                    events = self._events[start:start + limit]
+                else:
+                    # Older than the buffer: read the table, but no further than the tailer has settled.
+                    events = await run_in_threadpool(self.fetch, after, limit, self._floor)
+                    if not events:
+                        after = self._floor
+                        continue
+                if events:
+                    return events, events[-1].sequence
+            changed = self._changed
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return [], after
+            try:
+                # asyncio.timeout rather than wait_for: no task per waiter per event.
+                async with asyncio.timeout(remaining):
+                    await changed.wait()
+            except TimeoutError:
+                return [], after
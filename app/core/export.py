@@ -0,0 +1,42 @@
+import csv
+import io
+import json
+from enum import Enum
+from datetime import datetime
+from typing import Any, Iterable, Iterator, Sequence
+
+CSV_MEDIA_TYPE = "text/csv"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def plain_value(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+# str-valued enums encode as their value; `default` only sees datetimes.
+_json_encoder = json.JSONEncoder(separators=(",", ":"), default=plain_value)
+
+
+def iter_ndjson(columns: Sequence[str], batches: Iterable[Sequence[Sequence[Any]]]) -> Iterator[str]:
+    """Encodes each batch of rows as one chunk of newline-delimited JSON objects."""
+    encode = _json_encoder.encode
+    for rows in batches:
+        yield "".join([encode(dict(zip(columns, row))) + "\n" for row in rows])
+
+
+def iter_csv(columns: Sequence[str], batches: Iterable[Sequence[Sequence[Any]]]) -> Iterator[str]:
+    """Encodes a header row, then each batch of rows as one chunk of CSV."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows([plain_value(value) for value in row] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
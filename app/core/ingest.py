@@ -0,0 +1,103 @@
+import csv
+import json
+from typing import Any, AsyncIterator, Dict, Tuple, Union
+
+Record = Union[Dict[str, Any], ValueError]
+
+CSV_CONTENT_TYPES = {"text/csv"}
+NDJSON_CONTENT_TYPES = {"application/x-ndjson", "application/jsonl", "application/ndjson"}
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Union[str, ValueError]]:
+    """
+    Splits a streamed UTF-8 body into lines without buffering the whole body.
+    A line longer than `max_line_bytes` is yielded as a ValueError, and the
+    rest of it is dropped up to the next newline.
+    """
+    pending = b""
+    # Inside an over-long line that has already been reported.
+    skipping = False
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if skipping:
+                skipping = False
+            elif len(line) > max_line_bytes:
+                yield ValueError(f"Line longer than {max_line_bytes} bytes")
+            else:
+                yield line.rstrip(b"\r").decode("utf-8", errors="replace")
+        if len(pending) > max_line_bytes:
+            if not skipping:
+                yield ValueError(f"Line longer than {max_line_bytes} bytes")
+                skipping = True
+            pending = b""
+    if pending and not skipping:
+        yield pending.rstrip(b"\r").decode("utf-8", errors="replace")
+
+
+async def iter_records(
+    chunks: AsyncIterator[bytes], content_type: str, max_line_bytes: int = 1024 * 1024
+) -> AsyncIterator[Tuple[int, Record]]:
+    """
+    Yields `(line_number, record)` pairs from a streamed CSV (with a header row)
+    or NDJSON body. Lines that cannot be parsed, or that are longer than
+    `max_line_bytes`, yield a ValueError as the record so the caller can report
+    them and carry on. A CSV record spanning lines is held to the same limit.
+    """
+    if content_type in NDJSON_CONTENT_TYPES:
+        line_number = 0
+        async for line in iter_lines(chunks, max_line_bytes):
+            line_number += 1
+            if isinstance(line, ValueError):
+                yield line_number, line
+                continue
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, ValueError(f"Invalid JSON: {e}")
+                continue
+            if not isinstance(record, dict):
+                yield line_number, ValueError("Expected a JSON object")
+                continue
+            yield line_number, record
+        return
+
+    if content_type not in CSV_CONTENT_TYPES:
+        raise ValueError(f"Unsupported content type: {content_type}")
+
+    header = None
+    line_number = 0
+    record_start = 0
+    buffered = ""
+    async for line in iter_lines(chunks, max_line_bytes):
+        line_number += 1
+        if not buffered:
+            record_start = line_number
+        if isinstance(line, ValueError):
+            buffered = ""
+            yield record_start, line
+            continue
+        buffered = f"{buffered}\n{line}" if buffered else line
+        if len(buffered) > max_line_bytes:
+            buffered = ""
+            yield record_start, ValueError(f"Record longer than {max_line_bytes} bytes")
+            continue
+        # A quoted field may span lines; wait until the quotes are balanced.
+        if buffered.count('"') % 2:
+            continue
+        text, buffered = buffered, ""
+        if not text.strip():
+            continue
+        row = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in row]
+            continue
+        if len(row) != len(header):
+            yield record_start, ValueError(f"Expected {len(header)} columns, got {len(row)}")
+            continue
+        yield record_start, dict(zip(header, row))
+    if buffered:
+        yield record_start, ValueError("Unterminated quoted field")
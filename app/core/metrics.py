@@ -0,0 +1,233 @@
+"""
+Per-request performance instrumentation: wall time, database time, statement
+count and response serialisation time, aggregated per route template and
+exposed in the Prometheus text format (GET /metrics) and as a Server-Timing
+response header.
+
+Numbers are per worker process; Prometheus should scrape each worker.
+"""
+import asyncio
+import functools
+import time
+from contextvars import ContextVar
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+UNMATCHED_ROUTE = "unmatched"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestTimings:
+    """Accumulates one request's timings. Shared (not copied) with the threadpool workers it hands off to."""
+
+    __slots__ = ("started", "route", "db_seconds", "statements", "endpoint_done", "serialize_seconds")
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.route: Optional[str] = None
+        self.db_seconds = 0.0
+        self.statements = 0
+        self.endpoint_done: Optional[float] = None
+        self.serialize_seconds = 0.0
+
+    def server_timing(self, now: float) -> str:
+        return (
+            f'app;dur={(now - self.started) * 1000:.2f}, '
+            f'db;dur={self.db_seconds * 1000:.2f};desc="statements: {self.statements}", '
+            f'serialize;dur={self.serialize_seconds * 1000:.2f}'
+        )
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current.get() is not None:
+        context._metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = _current.get()
+    started = getattr(context, "_metrics_started", None)
+    if timings is None or started is None:
+        return
+    timings.db_seconds += time.perf_counter() - started
+    timings.statements += 1
+
+
+class _RouteStats:
+    __slots__ = ("buckets", "count", "seconds", "db_seconds", "statements", "serialize_seconds", "statuses")
+
+    def __init__(self, size: int) -> None:
+        self.buckets = [0] * size
+        self.count = 0
+        self.seconds = 0.0
+        self.db_seconds = 0.0
+        self.statements = 0
+        self.serialize_seconds = 0.0
+        self.statuses: Dict[int, int] = {}
+
+
+class MetricsRegistry:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = Lock()
+        self._routes: Dict[Tuple[str, str], _RouteStats] = {}
+
+    def observe(self, method: str, route: str, status_code: int, seconds: float, timings: RequestTimings) -> None:
+        with self._lock:
+            stats = self._routes.get((method, route))
+            if stats is None:
+                stats = self._routes[(method, route)] = _RouteStats(len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    stats.buckets[i] += 1
+                    break
+            stats.count += 1
+            stats.seconds += seconds
+            stats.db_seconds += timings.db_seconds
+            stats.statements += timings.statements
+            stats.serialize_seconds += timings.serialize_seconds
+            stats.statuses[status_code] = stats.statuses.get(status_code, 0) + 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+    def render(self) -> str:
+        """The collected metrics in the Prometheus text exposition format."""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines: List[str] = [
+                "# HELP http_request_duration_seconds Request wall time, by route template.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route), stats in routes:
+                labels = f'method="{method}",route="{_escape(route)}"'
+                cumulative = 0
+                for bound, count in zip(self.buckets, stats.buckets):
+                    cumulative += count
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.count}')
+                lines.append(f"http_request_duration_seconds_sum{{{labels}}} {stats.seconds:.6f}")
+                lines.append(f"http_request_duration_seconds_count{{{labels}}} {stats.count}")
+            for name, help_text, attribute in (
+                ("http_request_db_seconds_total", "Time spent executing SQL statements.", "db_seconds"),
+                ("http_request_db_statements_total", "SQL statements executed.", "statements"),
+                ("http_request_serialize_seconds_total", "Time spent validating and rendering response models.", "serialize_seconds"),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for (method, route), stats in routes:
+                    value = getattr(stats, attribute)
+                    value = f"{value:.6f}" if isinstance(value, float) else value
+                    lines.append(f'{name}{{method="{method}",route="{_escape(route)}"}} {value}')
+            lines += ["# HELP http_requests_total Requests, by status code.", "# TYPE http_requests_total counter"]
+            for (method, route), stats in routes:
+                for status_code, count in sorted(stats.statuses.items()):
+                    lines.append(
+                        f'http_requests_total{{method="{method}",route="{_escape(route)}",status="{status_code}"}} {count}'
+                    )
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware timing each HTTP request into `registry`. Unmatched
+    paths share one label so scanners cannot grow the metric set.
+    """
+
+    def __init__(self, app: Callable, registry: MetricsRegistry = registry, server_timing: bool = True):
+        self.app = app
+        self.registry = registry
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings = RequestTimings()
+        token = _current.set(timings)
+        status_code = 500
+
+        async def send_with_timing(message: Dict[str, Any]) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    header = timings.server_timing(time.perf_counter()).encode("latin-1")
+                    message["headers"] = [*message.get("headers", ()), (b"server-timing", header)]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            self.registry.observe(
+                scope["method"],
+                timings.route or UNMATCHED_ROUTE,
+                status_code,
+                time.perf_counter() - timings.started,
+                timings,
+            )
+
+
+class TimedRoute(APIRoute):
+    """Labels the request with its route template and marks when the endpoint returned."""
+
+    def get_route_handler(self) -> Callable:
+        call = self.dependant.call
+        if asyncio.iscoroutinefunction(call):
+            @functools.wraps(call)
+            async def endpoint(*args: Any, **kwargs: Any) -> Any:
+                try:
+                    return await call(*args, **kwargs)
+                finally:
+                    _mark_endpoint_done()
+        else:
+            @functools.wraps(call)
+            def endpoint(*args: Any, **kwargs: Any) -> Any:
+                try:
+                    return call(*args, **kwargs)
+                finally:
+                    _mark_endpoint_done()
+        self.dependant.call = endpoint
+        handler = super().get_route_handler()
+        route = self.path_format
+
+        async def timed_handler(request):
+            timings = _current.get()
+            if timings is not None:
+                timings.route = route
+            return await handler(request)
+
+        return timed_handler
+
+
+def _mark_endpoint_done() -> None:
+    timings = _current.get()
+    if timings is not None:
+        timings.endpoint_done = time.perf_counter()
+
+
+def record_serialization(started: float) -> None:
+    """Adds the time since `started` to the current request's serialisation time."""
+    timings = _current.get()
+    if timings is not None:
+        timings.serialize_seconds += time.perf_counter() - started
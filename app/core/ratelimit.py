@@ -0,0 +1,229 @@
+"""
+Token-bucket rate limiting per client: authenticated requests are keyed by
+the token's user, anonymous ones by client IP (or, behind a proxy, the
+address in RATE_LIMIT_FORWARDED_HEADER). Limits are set per route
+template in `RATE_LIMITS` ("POST /api/v1/auth/login/token": "10/minute"),
+with an optional `RATE_LIMIT_DEFAULT` shared by all other routes. A limit of
+"N/period" allows bursts of N requests, refilled at N per period.
+
+Buckets live in the worker process by default. Set RATE_LIMIT_URL to a
+`redis://` URL (requires the `redis` package) to share them between workers.
+"""
+import math
+import re
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Pattern, Tuple
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import BaseRoute
+
+from app.core import metrics, security
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_LIMIT_RE = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*$")
+
+
+class RateLimit:
+    """`capacity` requests in a burst, refilled at `rate` tokens per second."""
+
+    __slots__ = ("capacity", "rate")
+
+    def __init__(self, capacity: int, period: float):
+        if capacity < 1 or period <= 0:
+            raise ValueError("a rate limit needs at least one request per positive period")
+        self.capacity = capacity
+        self.rate = capacity / period
+
+    @classmethod
+    def parse(cls, value: str) -> "RateLimit":
+        """Parses "10/minute", "5/second" or "100/15minutes"."""
+        match = _LIMIT_RE.match(value)
+        if match is None:
+            raise ValueError(f"invalid rate limit {value!r}, expected e.g. '10/minute'")
+        count, multiplier, unit = match.groups()
+        return cls(int(count), int(multiplier or 1) * _PERIODS[unit])
+
+
+class TokenBucketStore:
+    """
+    In-process buckets. Only called from the event loop and never awaits
+    mid-update, so it needs no lock. Buckets that have refilled completely are
+    indistinguishable from new ones and are dropped first when `max_keys` is reached.
+    """
+
+    blocking = False
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        # key -> [tokens, updated_at, full_at]
+        self._buckets: Dict[Hashable, List[float]] = {}
+
+    def take(self, key: Hashable, limit: RateLimit, now: Optional[float] = None) -> float:
+        """Takes one token; returns 0 if allowed, else the seconds until one is available."""
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._evict(now)
+            tokens = float(limit.capacity)
+            bucket = self._buckets[key] = [tokens, now, now]
+        else:
+            tokens = min(limit.capacity, bucket[0] + (now - bucket[1]) * limit.rate)
+        if tokens < 1:
+            bucket[0], bucket[1] = tokens, now
+            return (1 - tokens) / limit.rate
+        tokens -= 1
+        bucket[0], bucket[1], bucket[2] = tokens, now, now + (limit.capacity - tokens) / limit.rate
+        return 0.0
+
+    def _evict(self, now: float) -> None:
+        full = [key for key, bucket in self._buckets.items() if bucket[2] <= now]
+        for key in full:
+            del self._buckets[key]
+        # Still full of active clients: drop the oldest-created half.
+        if len(self._buckets) >= self.max_keys:
+            for key in list(self._buckets)[: len(self._buckets) // 2]:
+                del self._buckets[key]
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+# GCRA, the token bucket stored as one "theoretical arrival time" per key.
+# Uses the server clock so workers with skewed clocks agree. Returns the
+# milliseconds to wait, or 0 when the request is allowed.
+_GCRA_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) * 1000 + tonumber(now[2]) / 1000
+local interval = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+if tat - tolerance > now then
+    return math.ceil(tat - tolerance - now)
+end
+tat = tat + interval
+redis.call('SET', KEYS[1], tostring(tat), 'PX', math.ceil(tat - now))
+return 0
+"""
+
+
+class SharedBucketStore:
+    """Buckets on a Redis-style client, checked and updated atomically by one script call per request."""
+
+    blocking = True
+
+    def __init__(self, client: Any, prefix: str = "ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(_GCRA_SCRIPT)
+
+    def take(self, key: Hashable, limit: RateLimit, now: Optional[float] = None) -> float:
+        interval = 1000 / limit.rate
+        name = self.prefix + ":".join(str(part) for part in (key if isinstance(key, tuple) else (key,)))
+        wait_ms = self._script(keys=[name], args=[interval, interval * (limit.capacity - 1)])
+        return int(wait_ms) / 1000
+
+    def clear(self) -> None:
+        for name in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(name)
+
+
+def make_bucket_store(url: Optional[str]):
+    """A SharedBucketStore on the Redis server at `url`, or in-process buckets when no url is set."""
+    if not url:
+        return TokenBucketStore()
+    import redis
+
+    return SharedBucketStore(redis.Redis.from_url(url))
+
+
+class RateLimiter:
+    """Resolves a request's route limit and client key, and takes a token from its bucket."""
+
+    def __init__(
+        self, store, limits: Dict[str, str], default: Optional[str] = None, forwarded_header: Optional[str] = None
+    ):
+        self.store = store
+        # Only trusted when set: the header is client-controlled unless a proxy overwrites it.
+        self.forwarded_header = forwarded_header.lower().encode("latin-1") if forwarded_header else None
+        self.limits = {route: RateLimit.parse(value) for route, value in limits.items()}
+        self.default = RateLimit.parse(default) if default else None
+        self._routes: Optional[List[Tuple[str, Pattern, str, RateLimit]]] = None
+
+    def compile(self, routes: List[BaseRoute]) -> None:
+        """Matches the configured "METHOD /path/template" keys against the app's routes."""
+        compiled = []
+        for route in routes:
+            for method in getattr(route, "methods", None) or ():
+                label = f"{method} {route.path_format}"
+                if label in self.limits:
+                    compiled.append((method, route.path_regex, route.path_format, self.limits[label]))
+        self._routes = compiled
+
+    def resolve(self, method: str, path: str) -> Tuple[Optional[str], Optional[RateLimit]]:
+        """The matching route template (None for the default bucket) and its limit."""
+        for route_method, regex, template, limit in self._routes or ():
+            if route_method == method and regex.match(path):
+                return template, limit
+        return None, self.default
+
+    def client_key(self, scope: Dict[str, Any]) -> str:
+        forwarded = None
+        for name, value in scope.get("headers", ()):
+            if name == b"authorization":
+                subject = security.subject_from_authorization(value.decode("latin-1"))
+                if subject is not None:
+                    return f"user:{subject}"
+            elif name == self.forwarded_header:
+                forwarded = value
+        if forwarded is not None:
+            # Earlier entries came from the client; the last one was appended by the trusted proxy.
+            address = forwarded.decode("latin-1").rsplit(",", 1)[-1].strip()
+            if address:
+                return f"ip:{address}"
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    async def check(self, scope: Dict[str, Any]) -> Tuple[Optional[str], float]:
+        """The matched route template and the seconds to wait (0 when the request may proceed)."""
+        template, limit = self.resolve(scope["method"], scope["path"])
+        if limit is None:
+            return template, 0.0
+        key = (self.client_key(scope), template or "*")
+        if self.store.blocking:
+            return template, await run_in_threadpool(self.store.take, key, limit)
+        return template, self.store.take(key, limit)
+
+
+class RateLimitMiddleware:
+    """Pure ASGI middleware answering over-limit requests with 429 and Retry-After."""
+
+    def __init__(self, app: Callable, limiter: RateLimiter, routes: List[BaseRoute]):
+        self.app = app
+        self.limiter = limiter
+        # Middleware is built on the first request, after every router is included.
+        limiter.compile(routes)
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        template, wait = await self.limiter.check(scope)
+        if wait <= 0:
+            await self.app(scope, receive, send)
+            return
+        timings = metrics.current_timings()
+        if timings is not None and template is not None:
+            timings.route = template
+        response = JSONResponse(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            content={"detail": "Rate limit exceeded, retry later"},
+            headers={"Retry-After": str(max(1, math.ceil(wait)))},
+        )
+        await response(scope, receive, send)
@@ -1,17 +1,64 @@
+import asyncio
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
-from jose import jwt
+from threading import BoundedSemaphore, Lock
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+from jose import JWTError, jwt
 from passlib.context import CryptContext
 
+from app.core.cache import TTLCache
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+T = TypeVar("T")
+
+# Hashes made with a different cost are reported by needs_update and rehashed on login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
 
 ALGORITHM = settings.ALGORITHM
 SECRET_KEY = settings.SECRET_KEY
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 
 
+class PasswordHashingBusy(Exception):
+    """Raised when the password hashing pool and its queue are full."""
+
+
+class PasswordHasherPool:
+    """
+    Runs bcrypt on a dedicated, size-limited thread pool so a login burst cannot
+    take over the request threadpool. At most `workers + queue_size` calls may
+    be pending; beyond that callers get PasswordHashingBusy immediately.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = BoundedSemaphore(workers + queue_size)
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHashingBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return await asyncio.wrap_future(future)
+
+
+password_hasher = PasswordHasherPool(
+    workers=settings.PASSWORD_HASH_WORKERS, queue_size=settings.PASSWORD_HASH_QUEUE_SIZE
+)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -23,9 +70,104 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+class TokenDenyList:
+    """
+    Digests of revoked tokens, held in memory until the token would have
+    expired anyway. Replace `token_deny_list` with an object offering the same
+    two methods to share revocations between processes.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._revoked: Dict[bytes, float] = {}
+
+    def revoke(self, digest: bytes, expires_at: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._revoked = {d: exp for d, exp in self._revoked.items() if exp > now}
+            self._revoked[digest] = expires_at
+
+    def is_revoked(self, digest: bytes) -> bool:
+        expires_at = self._revoked.get(digest)
+        return expires_at is not None and expires_at > time.time()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._revoked.clear()
+
+
+token_deny_list = TokenDenyList()
+
+# Verified tokens by digest: (subject, exp). Entries never outlive the token's exp.
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_MAX_SIZE, ttl=settings.TOKEN_CACHE_TTL_SECONDS)
+
+
+def token_digest(token: str) -> bytes:
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+
+def verify_access_token(token: str) -> Optional[str]:
+    """
+    Returns the subject of a correctly signed, unexpired and unrevoked access
+    token, or None. A token that has been verified once is served from
+    `token_cache` until its `exp`, skipping the signature check and claims parsing.
+    """
+    digest = token_digest(token)
+    if token_deny_list.is_revoked(digest):
+        return None
+    cached = token_cache.get(digest)
+    if cached is not None:
+        subject, expires_at = cached
+        return subject if expires_at > time.time() else None
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    subject = payload.get("sub")
+    if not isinstance(subject, str):
+        return None
+    expires_at = payload.get("exp")
+    if isinstance(expires_at, (int, float)) and expires_at > time.time():
+        token_cache.set(digest, (subject, expires_at), ttl=expires_at - time.time())
+    return subject
+
+
+def subject_from_authorization(value: Optional[str]) -> Optional[str]:
+    """The verified subject of an `Authorization: Bearer <token>` header value, or None."""
+    scheme, _, token = (value or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return verify_access_token(token)
+
+
+def revoke_access_token(token: str) -> None:
+    """Rejects `token` from now on, in this process (see TokenDenyList)."""
+    digest = token_digest(token)
+    try:
+        expires_at = jwt.get_unverified_claims(token).get("exp")
+    except JWTError:
+        expires_at = None
+    if not isinstance(expires_at, (int, float)):
+        expires_at = time.time() + ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    token_deny_list.revoke(digest, expires_at)
+    token_cache.delete(digest)
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
\ No newline at end of file
+    return pwd_context.hash(password)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifies a password on the hashing pool. The second item is a replacement
+    hash when the stored one is stale, otherwise None.
+    """
+    return await password_hasher.run(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hasher.run(pwd_context.hash, password)
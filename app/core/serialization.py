@@ -0,0 +1,113 @@
+"""
+Response serialisation. By default ORM rows are validated through their read
+schema by pydantic, as FastAPI's `response_model` does. With FAST_JSON (and
+the optional `orjson` package) rows from our own database are trusted: they
+are copied into plain dicts by a serializer built once per schema, skipping
+validation (including EmailStr re-checks), and encoded with orjson. Both
+paths produce the same bytes for the schemas in app/schemas.
+"""
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union, get_args, get_origin
+
+from fastapi import Response, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+from app.core import metrics
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def fast_json_enabled() -> bool:
+    return settings.FAST_JSON and orjson is not None
+
+
+def _nested_model(annotation: Any) -> Tuple[Optional[Type[BaseModel]], bool]:
+    """The schema nested in `annotation` (through Optional and List), and whether it is a list."""
+    origin = get_origin(annotation)
+    if origin is Union:
+        for arg in get_args(annotation):
+            model, many = _nested_model(arg)
+            if model is not None:
+                return model, many
+        return None, False
+    if origin in (list, List):
+        model, _ = _nested_model(get_args(annotation)[0])
+        return model, model is not None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, False
+    return None, False
+
+
+@lru_cache(maxsize=None)
+def row_serializer(schema: Type[BaseModel]) -> Callable[[Any], Dict[str, Any]]:
+    """Reads `schema`'s fields off an ORM row (or model) into a dict, recursing into nested schemas."""
+    fields = []
+    for name, field in schema.model_fields.items():
+        model, many = _nested_model(field.annotation)
+        fields.append((name, row_serializer(model) if model is not None else None, many))
+
+    def serialize(row: Any) -> Dict[str, Any]:
+        data = {}
+        for name, nested, many in fields:
+            value = getattr(row, name)
+            if nested is not None and value is not None:
+                value = [nested(item) for item in value] if many else nested(value)
+            data[name] = value
+        return data
+
+    return serialize
+
+
+@lru_cache(maxsize=None)
+def _adapter(schema: Type[BaseModel], many: bool) -> TypeAdapter:
+    return TypeAdapter(List[schema] if many else schema)
+
+
+def dump_json(schema: Type[BaseModel], value: Any, many: bool = False) -> bytes:
+    """`value` (a row, or a list of rows with `many`) serialised as `schema` JSON."""
+    started = time.perf_counter()
+    if fast_json_enabled():
+        serialize = row_serializer(schema)
+        body = orjson.dumps([serialize(row) for row in value] if many else serialize(value))
+    else:
+        adapter = _adapter(schema, many)
+        body = adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+    metrics.record_serialization(started)
+    return body
+
+
+def respond(
+    schema: Type[BaseModel],
+    value: Any,
+    *,
+    many: bool = False,
+    status_code: int = status.HTTP_200_OK
+) -> Any:
+    """
+    For endpoints returning ORM rows: a pre-serialised JSON Response in fast
+    mode, otherwise `value` unchanged for FastAPI's response_model to handle.
+    """
+    if not fast_json_enabled():
+        return value
+    return Response(content=dump_json(schema, value, many), status_code=status_code, media_type="application/json")
+
+
+class AppJSONResponse(JSONResponse):
+    """
+    The app's default response class: renders with orjson in fast mode, and
+    records response-model validation plus rendering (from when the endpoint
+    returned) as the request's serialisation time.
+    """
+
+    def render(self, content: Any) -> bytes:
+        body = orjson.dumps(content) if fast_json_enabled() else super().render(content)
+        timings = metrics.current_timings()
+        if timings is not None and timings.endpoint_done is not None:
+            metrics.record_serialization(timings.endpoint_done)
+        return body
@@ -0,0 +1,114 @@
+"""
+Request coalescing ("single-flight") for identical concurrent reads: the
+first request for a key runs the read, and requests for the same key that
+arrive while it is in flight wait for its result instead of running their
+own. Nothing is kept once the read completes; caching stays with crud_book.
+
+Groups are per route template and enabled by SINGLE_FLIGHT_ROUTES. Counts
+are per worker process and exported at GET /metrics.
+"""
+import asyncio
+import time
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent `do(key, fn)` calls on the event loop. Waiters share
+    the result or exception of the first call. If that call is cancelled (its
+    client went away), the next waiter runs `fn` itself.
+
+    A call passing `not_before` (a `time.monotonic()` value, such as when the
+    last write committed) does not join a call that started earlier, since
+    that call may have read the data from before the write; it runs `fn`
+    itself, and later calls join it instead.
+    """
+
+    def __init__(self, route: str, enabled: bool = True):
+        self.route = route
+        self.enabled = enabled
+        self.executions = 0
+        self.shared = 0
+        # key -> (future, time.monotonic() when the call started)
+        self._in_flight: Dict[Hashable, Tuple[asyncio.Future, float]] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]], not_before: Optional[float] = None) -> T:
+        if not self.enabled:
+            return await fn()
+        while True:
+            flight = self._in_flight.get(key)
+            if flight is None or (not_before is not None and flight[1] < not_before):
+                break
+            future = flight[0]
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if future.cancelled():
+                    continue
+                raise
+            finally:
+                # Shared results and shared errors both saved a query.
+                if future.done() and not future.cancelled():
+                    self.shared += 1
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = (future, time.monotonic())
+        self.executions += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Only retrieved when someone was waiting; avoids "exception was never retrieved".
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            # A later call may have replaced a flight that started too early.
+            if self._in_flight.get(key, (None,))[0] is future:
+                del self._in_flight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "executions": self.executions, "shared": self.shared}
+
+    def reset(self) -> None:
+        self.executions = 0
+        self.shared = 0
+
+
+_groups: Dict[str, SingleFlight] = {}
+_groups_lock = Lock()
+
+
+def group(route: str) -> SingleFlight:
+    """The process-wide group for a "METHOD /route/template", enabled if listed in SINGLE_FLIGHT_ROUTES."""
+    with _groups_lock:
+        flight = _groups.get(route)
+        if flight is None:
+            flight = _groups[route] = SingleFlight(route, enabled=route in settings.SINGLE_FLIGHT_ROUTES)
+        return flight
+
+
+def render() -> str:
+    """Coalescing counts per route, in the Prometheus text exposition format."""
+    with _groups_lock:
+        groups = sorted(_groups.items())
+    lines: List[str] = []
+    for name, help_text, attribute in (
+        ("singleflight_executions_total", "Coalesced reads that ran.", "executions"),
+        ("singleflight_shared_total", "Requests served by another request's read (queries saved).", "shared"),
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for route, flight in groups:
+            method, _, path = route.partition(" ")
+            lines.append(f'{name}{{method="{method}",route="{path}"}} {getattr(flight, attribute)}')
+    return "\n".join(lines) + "\n"
@@ -1,71 +1,386 @@
-from sqlmodel import Session, select
-from typing import List, Optional
+import time
+from datetime import datetime
+from uuid import uuid4
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, case, select, update
+from typing import Dict, Hashable, Iterable, List, NamedTuple, Optional, Set, Tuple
 
+from app.core.cache import make_cache
+from app.core.conditional import make_etag
+from app.core.config import settings
+from app.core.serialization import dump_json, row_serializer
+from app.crud import crud_outbox, search
+from app.db.session import is_replica
 from app.models.book import Book
-from app.schemas.book import BookCreate, BookUpdate
+from app.schemas.book import BookCreate, BookRead, BookUpdate
+
+book_cache = make_cache(
+    settings.CACHE_URL,
+    maxsize=settings.BOOK_CACHE_MAX_SIZE,
+    ttl=settings.BOOK_CACHE_TTL_SECONDS,
+    prefix="book:",
+)
+
+# Version committed by the latest write to each book. A read that selected an
+# older version before the write committed must not cache it afterwards; kept
+# for as long as a cached entry would live.
+written_versions = make_cache(
+    settings.CACHE_URL,
+    maxsize=settings.BOOK_CACHE_MAX_SIZE,
+    ttl=max(settings.BOOK_CACHE_TTL_SECONDS, settings.READ_YOUR_WRITES_SECONDS),
+    prefix="book-version:",
+)
+
+# Keys evicted by writes committed within READ_YOUR_WRITES_SECONDS. Reads on a
+# lagging replica do not re-cache them, or they could put the old row back.
+recently_written = make_cache(
+    settings.CACHE_URL,
+    maxsize=settings.BOOK_CACHE_MAX_SIZE,
+    ttl=settings.READ_YOUR_WRITES_SECONDS,
+    prefix="book-written:",
+)
+
+# Cached list pages hold only book ids and are keyed by this generation token,
+# so changing one book's stock evicts that book alone while adding or removing
+# books (or renaming them, which reorders search results) retires every page.
+_LIST_GENERATION_KEY = ("generation",)
+_PENDING_EVICTIONS = "book_cache_evictions"
+_PENDING_VERSIONS = "book_cache_versions"
+# time.monotonic() when this process last committed a book write.
+_last_write_at = 0.0
+
+def _invalidate(db: Session, versions: Optional[Dict[int, int]] = None, lists: bool = False) -> None:
+    """
+    Evicts the given books (`{book_id: version being committed}`) and all list
+    pages if `lists`, now and again once `db` commits. The committed versions
+    are recorded before the second eviction; `_cache_books` refuses to cache
+    anything older, so a read that selected the old row before the commit
+    cannot put it back afterwards.
+    """
+    keys = db.info.setdefault(_PENDING_EVICTIONS, set())
+    pending_versions = db.info.setdefault(_PENDING_VERSIONS, {})
+    for book_id, version in (versions or {}).items():
+        key = ("book", book_id)
+        keys.add(key)
+        pending_versions[key] = max(version, pending_versions.get(key, version))
+    if lists:
+        keys.add(_LIST_GENERATION_KEY)
+    _evict(keys)
+
+def _evict(keys: Iterable[Hashable]) -> None:
+    for key in keys:
+        book_cache.delete(key)
+
+@event.listens_for(Session, "after_commit")
+def _evict_after_commit(db: Session) -> None:
+    global _last_write_at
+    versions = db.info.pop(_PENDING_VERSIONS, None)
+    keys = db.info.pop(_PENDING_EVICTIONS, None)
+    if keys:
+        _last_write_at = time.monotonic()
+        # Versions first: a fill that checked before this point is evicted below.
+        for key, version in (versions or {}).items():
+            written_versions.set(key, version)
+        _evict(keys)
+        if settings.READ_DATABASE_URL:
+            for key in keys:
+                recently_written.set(key, True)
+
+def last_write_committed_at() -> float:
+    """When this process last committed a book write, as a `time.monotonic()` value."""
+    return _last_write_at
+
+def _replica_may_cache(db: Session, key: Hashable) -> bool:
+    return not is_replica(db) or recently_written.get(key) is None
+
+def _is_current(key: Hashable, version: int) -> bool:
+    written = written_versions.get(key)
+    return written is None or version >= written
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_evictions(db: Session) -> None:
+    db.info.pop(_PENDING_EVICTIONS, None)
+    db.info.pop(_PENDING_VERSIONS, None)
+
+def _list_generation() -> str:
+    generation = book_cache.get(_LIST_GENERATION_KEY)
+    if generation is None:
+        generation = uuid4().hex
+        book_cache.set(_LIST_GENERATION_KEY, generation)
+    return generation
+
+def _add_book_event(db: Session, event_type: str, book) -> None:
+    """Stages a change event carrying the book (an ORM row or a Core row) as BookRead plus its version."""
+    crud_outbox.add_event(
+        db, event_type, {**row_serializer(BookRead)(book), "version": book.version}, book_id=book.id
+    )
+
+class CachedBook(NamedTuple):
+    etag: str
+    updated_at: str
+    body: str
+
+class BookPage(NamedTuple):
+    ids: List[int]
+    etag: str
+    body: str
+
+def _cache_books(db: Session, books: Iterable[Book]) -> List[CachedBook]:
+    """Caches and returns each book (read through `db`) serialised as BookRead JSON, with its ETag."""
+    entries = []
+    for book in books:
+        entry = CachedBook(
+            etag=make_etag("book", book.id, book.version, book.updated_at.isoformat()),
+            updated_at=book.updated_at.isoformat(),
+            body=dump_json(BookRead, book).decode(),
+        )
+        key = ("book", book.id)
+        if _replica_may_cache(db, key) and _is_current(key, book.version):
+            book_cache.set(key, list(entry))
+            # A write that committed after the check recorded its version
+            # before evicting, so either its eviction or this re-check removes the entry.
+            if not _is_current(key, book.version):
+                book_cache.delete(key)
+        entries.append(entry)
+    return entries
+
+def _cached_book(book_id: int) -> Optional[CachedBook]:
+    entry = book_cache.get(("book", book_id))
+    return CachedBook(*entry) if entry is not None else None
 
 def get_book(db: Session, book_id: int) -> Optional[Book]:
     return db.get(Book, book_id)
 
+def get_book_cached(db: Session, book_id: int) -> Optional[CachedBook]:
+    """
+    Returns the book serialised as BookRead JSON with its ETag, served from
+    `book_cache` when possible, or None if it does not exist.
+    """
+    entry = _cached_book(book_id)
+    if entry is None:
+        book = get_book(db, book_id)
+        if book is None:
+            return None
+        entry, = _cache_books(db, [book])
+    return entry
+
 def get_books(
     db: Session, 
     skip: int = 0, 
     limit: int = 100, 
     title: Optional[str] = None, 
-    author: Optional[str] = None
+    author: Optional[str] = None,
+    after_id: Optional[int] = None
 ) -> List[Book]:
-    statement = select(Book)
-    if title:
-        statement = statement.where(Book.title.ilike(f"%{title}%"))
-    if author:
-        statement = statement.where(Book.author.ilike(f"%{author}%"))
+    """
+    Returns books ordered by id, or by relevance when searching by title/author.
+    `after_id` is ignored when searching.
+    """
+    if title or author:
+        return search.get_search_backend(db).search(db, title=title, author=author, skip=skip, limit=limit)
+    statement = select(Book).order_by(Book.id)
+    if after_id is not None:
+        statement = statement.where(Book.id > after_id)
     statement = statement.offset(skip).limit(limit)
     return db.exec(statement).all()
 
+def get_books_cached(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    title: Optional[str] = None,
+    author: Optional[str] = None,
+    after_id: Optional[int] = None
+) -> BookPage:
+    """
+    Like `get_books`, but returns the page's ids, ETag and BookRead JSON array.
+    Pages are cached as lists of ids and the books themselves are read
+    through the single-book cache.
+    """
+    page_key = ("page", _list_generation(), skip, limit, title, author, after_id)
+    ids = book_cache.get(page_key)
+    if ids is None:
+        books = get_books(db, skip=skip, limit=limit, title=title, author=author, after_id=after_id)
+        ids = [book.id for book in books]
+        if _replica_may_cache(db, _LIST_GENERATION_KEY):
+            book_cache.set(page_key, ids)
+        entries = _cache_books(db, books)
+    else:
+        found = {}
+        for book_id in ids:
+            entry = _cached_book(book_id)
+            if entry is not None:
+                found[book_id] = entry
+        missing = [book_id for book_id in ids if book_id not in found]
+        if missing:
+            books = db.exec(select(Book).where(Book.id.in_(missing))).all()
+            found.update(zip((book.id for book in books), _cache_books(db, books)))
+        ids = [book_id for book_id in ids if book_id in found]
+        entries = [found[book_id] for book_id in ids]
+    return BookPage(
+        ids=ids,
+        etag=make_etag("books", *(entry.etag for entry in entries)),
+        body="[" + ",".join(entry.body for entry in entries) + "]",
+    )
+
 def create_book(db: Session, book_in: BookCreate) -> Book:
     db_book = Book(
         **book_in.model_dump(),
         available_quantity=book_in.total_quantity
     )
     db.add(db_book)
+    # The INSERT the commit would run anyway, early, so the event has the id.
+    db.flush()
+    _add_book_event(db, "book.created", db_book)
+    _invalidate(db, lists=True)
     db.commit()
     db.refresh(db_book)
+    search.get_search_backend(db).index_book(db_book)
     return db_book
 
+def upsert_books(db: Session, books_in: List[BookCreate]) -> int:
+    """
+    Inserts books in one batched executemany, updating existing rows on `isbn`.
+    Available stock moves by the change in total quantity, never below zero.
+    Returns the number of distinct books written.
+    """
+    rows = {
+        book_in.isbn: {**book_in.model_dump(), "available_quantity": book_in.total_quantity}
+        for book_in in books_in
+    }
+    if not rows:
+        return 0
+    dialect = db.get_bind().dialect.name
+    insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+    book_table = Book.__table__
+    statement = insert(book_table)
+    available = book_table.c.available_quantity + statement.excluded.total_quantity - book_table.c.total_quantity
+    statement = statement.on_conflict_do_update(
+        index_elements=[book_table.c.isbn],
+        set_={
+            "title": statement.excluded.title,
+            "author": statement.excluded.author,
+            "total_quantity": statement.excluded.total_quantity,
+            "available_quantity": case((available < 0, 0), else_=available),
+            "version": book_table.c.version + 1,
+            "updated_at": statement.excluded.updated_at,
+        },
+    )
+    # Core executemany: psycopg2 pages rows into multi-row VALUES, sqlite uses executemany.
+    db.connection().execute(statement, list(rows.values()))
+    written = db.connection().execute(select(book_table).where(book_table.c.isbn.in_(list(rows)))).all()
+    for row in written:
+        _add_book_event(db, "book.upserted", row)
+    _invalidate(db, {row.id: row.version for row in written}, lists=True)
+    db.commit()
+    search.get_search_backend(db).index_books(written)
+    return len(rows)
+
 def update_book(db: Session, db_book: Book, book_in: BookUpdate) -> Book:
     book_data = book_in.model_dump(exclude_unset=True)
     for key, value in book_data.items():
         setattr(db_book, key, value)
+    db_book.version += 1
+    db_book.updated_at = datetime.utcnow()
     db.add(db_book)
+    _add_book_event(db, "book.updated", db_book)
+    _invalidate(db, {db_book.id: db_book.version}, lists="title" in book_data or "author" in book_data)
     db.commit()
     db.refresh(db_book)
+    search.get_search_backend(db).index_book(db_book)
     return db_book
     
 def delete_book(db: Session, book_id: int) -> Optional[Book]:
     db_book = db.get(Book, book_id)
     if db_book:
         db.delete(db_book)
+        crud_outbox.add_event(db, "book.deleted", {"id": book_id}, book_id=book_id)
+        # Newer than any row a racing read could have selected.
+        _invalidate(db, {book_id: db_book.version + 1}, lists=True)
         db.commit()
+        search.get_search_backend(db).remove_book(book_id)
     return db_book
 
 def update_book_availability(db: Session, book_id: int, change: int) -> Optional[Book]:
     """
     Updates the available quantity of a book.
     `change` can be positive (returning a book) or negative (lending a book).
+
+    The check and the write happen in a single conditional UPDATE so concurrent
+    lends cannot oversell a book. The caller is responsible for committing.
     """
-    db_book = db.get(Book, book_id)
-    if not db_book:
+    new_available_quantity = Book.available_quantity + change
+    statement = (
+        update(Book)
+        .where(Book.id == book_id)
+        .values(version=Book.version + 1, updated_at=datetime.utcnow())
+    )
+    if change < 0:
+        statement = statement.where(new_available_quantity >= 0).values(
+            available_quantity=new_available_quantity
+        )
+    else:
+        statement = statement.values(
+            available_quantity=case(
+                (new_available_quantity > Book.total_quantity, Book.total_quantity),
+                else_=new_available_quantity,
+            )
+        )
+    db_book = db.exec(statement.returning(Book)).scalars().first()
+    if db_book:
+        _add_book_event(db, "book.stock", db_book)
+        _invalidate(db, {book_id: db_book.version})
+        return db_book
+
+    if db.get(Book, book_id) is None:
         return None
+    raise ValueError("Available quantity cannot be negative.")
 
-    new_available_quantity = db_book.available_quantity + change
-    
-    if new_available_quantity < 0:
-        raise ValueError("Available quantity cannot be negative.")
-    if new_available_quantity > db_book.total_quantity:
-        new_available_quantity = db_book.total_quantity
-        
-    db_book.available_quantity = new_available_quantity
-    db.add(db_book)
-    db.commit()
-    db.refresh(db_book)
-    return db_book
\ No newline at end of file
+
+def lock_books_stock(db: Session, book_ids: Iterable[int]) -> Dict[int, Tuple[int, int]]:
+    """
+    Returns `{book_id: (available, total)}` for the given books that exist.
+    On PostgreSQL the rows are locked (SELECT ... FOR UPDATE, in id order so
+    concurrent batches cannot deadlock) until the caller commits; SQLite has no
+    row locks, so writers must not rely on the values still holding.
+    """
+    statement = (
+        select(Book.id, Book.available_quantity, Book.total_quantity)
+        .where(Book.id.in_(list(book_ids)))
+        .order_by(Book.id)
+        .with_for_update()
+    )
+    return {book_id: (available, total) for book_id, available, total in db.exec(statement)}
+
+def change_books_availability(db: Session, changes: Dict[int, int]) -> Set[int]:
+    """
+    Moves the available quantity of several books by `{book_id: change}` in a
+    single UPDATE, relative to the committed value and never below zero;
+    returns are capped at the total quantity, as in `update_book_availability`.
+    Returns the ids of books left unchanged because the change would have
+    taken their stock below zero. The caller is responsible for committing.
+    """
+    if not changes:
+        return set()
+    new_available_quantity = Book.available_quantity + case(changes, value=Book.id)
+    statement = (
+        update(Book.__table__)
+        .where(Book.id.in_(list(changes)), new_available_quantity >= 0)
+        .values(
+            available_quantity=case(
+                (new_available_quantity > Book.total_quantity, Book.total_quantity),
+                else_=new_available_quantity,
+            ),
+            version=Book.version + 1,
+            updated_at=datetime.utcnow(),
+        )
+        .returning(Book.__table__)
+    )
+    versions = {}
+    for row in db.connection().execute(statement):
+        _add_book_event(db, "book.stock", row)
+        versions[row.id] = row.version
+    _invalidate(db, versions)
+    return set(changes) - set(versions)
@@ -0,0 +1,104 @@
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import joinedload
+from sqlmodel import Session, case, delete, select, update
+from typing import Dict, Iterable, List, Set
+
+from app.models.loan import ActiveLoan
+
+
+_LOAN_KEY = [ActiveLoan.user_id, ActiveLoan.book_id]
+
+def _insert(db: Session):
+    return postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+
+def get_active_loans(db: Session, user_id: int) -> List[ActiveLoan]:
+    """Books the user currently holds, oldest loan first. Served by the (user_id, book_id) primary key."""
+    statement = (
+        select(ActiveLoan)
+        .options(joinedload(ActiveLoan.book))
+        .where(ActiveLoan.user_id == user_id)
+        .order_by(ActiveLoan.since, ActiveLoan.book_id)
+    )
+    return db.exec(statement).all()
+
+def add_loan(db: Session, *, user_id: int, book_id: int) -> None:
+    """Records one more copy held by the user. The caller is responsible for committing."""
+    row = {"user_id": user_id, "book_id": book_id, "quantity": 1, "since": datetime.utcnow()}
+    statement = _insert(db)(ActiveLoan).values(row)
+    db.exec(statement.on_conflict_do_update(index_elements=_LOAN_KEY, set_={"quantity": ActiveLoan.quantity + 1}))
+
+def remove_loan(db: Session, *, user_id: int, book_id: int) -> bool:
+    """
+    Records one copy handed back. Returns False, changing nothing, if the user
+    does not hold the book. The caller is responsible for committing.
+    """
+    held = (ActiveLoan.user_id == user_id) & (ActiveLoan.book_id == book_id)
+    statement = (
+        update(ActiveLoan)
+        .where(held, ActiveLoan.quantity > 0)
+        .values(quantity=ActiveLoan.quantity - 1)
+        .returning(ActiveLoan.quantity)
+        .execution_options(synchronize_session=False)
+    )
+    remaining = db.exec(statement).scalar()
+    if remaining is None:
+        return False
+    if remaining == 0:
+        db.exec(delete(ActiveLoan).where(held).execution_options(synchronize_session=False))
+    return True
+
+def lock_loans(db: Session, user_id: int, book_ids: Iterable[int]) -> Dict[int, int]:
+    """
+    Returns the user's `{book_id: quantity}` for the given books, locking the
+    rows on PostgreSQL (see `crud_book.lock_books_stock`).
+    """
+    statement = (
+        select(ActiveLoan.book_id, ActiveLoan.quantity)
+        .where(ActiveLoan.user_id == user_id, ActiveLoan.book_id.in_(list(book_ids)))
+        .order_by(ActiveLoan.book_id)
+        .with_for_update()
+    )
+    return dict(db.exec(statement).all())
+
+def change_loans(db: Session, user_id: int, changes: Dict[int, int]) -> Set[int]:
+    """
+    Moves the quantities the user holds by `{book_id: change}`, relative to the
+    committed rows; a row reaching zero is removed. Returns the ids of books
+    left unchanged because the user does not hold enough copies to hand back.
+    The caller is responsible for committing.
+    """
+    failed = set()
+    returned = {book_id: change for book_id, change in changes.items() if change < 0}
+    if returned:
+        held = (ActiveLoan.user_id == user_id) & ActiveLoan.book_id.in_(list(returned))
+        new_quantity = ActiveLoan.quantity + case(returned, value=ActiveLoan.book_id)
+        # Rows handed back in full are deleted; only the rest need an UPDATE.
+        emptied = db.exec(
+            delete(ActiveLoan)
+            .where(held, new_quantity == 0)
+            .returning(ActiveLoan.book_id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        remaining = set(returned) - set(emptied)
+        if remaining:
+            updated = db.exec(
+                update(ActiveLoan)
+                .where(held, ActiveLoan.book_id.in_(list(remaining)), new_quantity > 0)
+                .values(quantity=new_quantity)
+                .returning(ActiveLoan.book_id)
+                .execution_options(synchronize_session=False)
+            ).scalars().all()
+            failed = remaining - set(updated)
+    now = datetime.utcnow()
+    rows = [
+        {"user_id": user_id, "book_id": book_id, "quantity": change, "since": now}
+        for book_id, change in changes.items() if change > 0
+    ]
+    if rows:
+        statement = _insert(db)(ActiveLoan).values(rows)
+        db.exec(statement.on_conflict_do_update(
+            index_elements=_LOAN_KEY, set_={"quantity": ActiveLoan.quantity + statement.excluded.quantity}
+        ))
+    return failed
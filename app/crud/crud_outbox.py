@@ -0,0 +1,65 @@
+import json
+from datetime import datetime
+from sqlalchemy import delete, event, func, insert
+from sqlmodel import Session, select
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.export import plain_value
+from app.models.outbox import OutboxEvent
+
+_PENDING_EVENTS = "outbox_events"
+
+# Called (from the committing thread) after a commit that wrote events, so
+# in-process feeds can pick them up without waiting for their next poll.
+commit_listeners: List[Callable[[], None]] = []
+
+_json_encoder = json.JSONEncoder(separators=(",", ":"), default=plain_value)
+
+def add_event(db: Session, event_type: str, payload: Dict[str, Any], book_id: Optional[int] = None) -> None:
+    """
+    Stages an event to be written in the same commit as the caller's change,
+    all of a commit's events in one INSERT. A rollback discards them.
+    """
+    db.info.setdefault(_PENDING_EVENTS, []).append({
+        "event_type": event_type,
+        "book_id": book_id,
+        "payload": _json_encoder.encode(payload),
+    })
+
+@event.listens_for(Session, "before_commit")
+def _write_pending_events(db: Session) -> None:
+    rows = db.info.get(_PENDING_EVENTS)
+    if rows:
+        # Stamped at INSERT, not when staged, which can be long before under lock contention.
+        created_at = datetime.utcnow()
+        db.execute(insert(OutboxEvent), [{**row, "created_at": created_at} for row in rows])
+
+@event.listens_for(Session, "after_commit")
+def _notify_committed_events(db: Session) -> None:
+    if db.info.pop(_PENDING_EVENTS, None):
+        for listener in commit_listeners:
+            listener()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_events(db: Session) -> None:
+    db.info.pop(_PENDING_EVENTS, None)
+
+def get_latest_sequence(db: Session) -> int:
+    return db.exec(select(func.max(OutboxEvent.id))).one() or 0
+
+def get_events_after(db: Session, after: int, limit: int, until: Optional[int] = None) -> List[OutboxEvent]:
+    """
+    Committed events with a sequence number above `after` (and at most
+    `until`), in order. Numbers are handed out before commit, so the result
+    can have gaps that a slower transaction fills later; see app.core.events.
+    """
+    statement = select(OutboxEvent).where(OutboxEvent.id > after)
+    if until is not None:
+        statement = statement.where(OutboxEvent.id <= until)
+    return db.exec(statement.order_by(OutboxEvent.id).limit(limit)).all()
+
+def delete_events_before(db: Session, before: datetime) -> int:
+    """Deletes events created before `before`; returns how many. Commits."""
+    result = db.exec(delete(OutboxEvent).where(OutboxEvent.created_at < before))
+    db.commit()
+    return result.rowcount
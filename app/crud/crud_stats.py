@@ -0,0 +1,176 @@
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import Date, case, func
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, delete, select
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.models.book import Book
+from app.models.stats import BookDailyStats, UserDailyStats
+from app.models.transaction import Transaction, TransactionType
+
+# Days compared per query by `find_rollup_mismatches`.
+CHECK_WINDOW_DAYS = 7
+
+
+def _insert(db: Session):
+    return postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+
+def _day_range(column, since: Optional[date], until: Optional[date]) -> list:
+    conditions = []
+    if since is not None:
+        conditions.append(column >= since)
+    if until is not None:
+        conditions.append(column < until)
+    return conditions
+
+def record_transactions(db: Session, transactions: Iterable[Tuple[int, int, TransactionType, datetime]]) -> None:
+    """
+    Adds `(book_id, user_id, transaction_type, timestamp)` rows to the daily
+    rollups with one upsert per table. Rows are written in key order so
+    concurrent writers lock them in the same order. The caller is responsible
+    for committing, in the same transaction as the `transaction` rows.
+    """
+    by_book: Dict[Tuple[int, date], List[int]] = {}
+    by_user: Dict[Tuple[int, date], List[int]] = {}
+    for book_id, user_id, transaction_type, timestamp in transactions:
+        slot = 0 if transaction_type == TransactionType.LEND else 1
+        by_book.setdefault((book_id, timestamp.date()), [0, 0])[slot] += 1
+        by_user.setdefault((user_id, timestamp.date()), [0, 0])[slot] += 1
+    for model, key, counts in ((BookDailyStats, "book_id", by_book), (UserDailyStats, "user_id", by_user)):
+        if not counts:
+            continue
+        statement = _insert(db)(model).values([
+            {key: owner_id, "day": day, "lends": lends, "returns": returns}
+            for (owner_id, day), (lends, returns) in sorted(counts.items())
+        ])
+        db.exec(statement.on_conflict_do_update(
+            index_elements=[getattr(model, key), model.day],
+            set_={
+                "lends": model.lends + statement.excluded.lends,
+                "returns": model.returns + statement.excluded.returns,
+            },
+        ))
+
+def get_top_books(
+    db: Session,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    limit: int = 10,
+    by: str = "lends"
+) -> List[dict]:
+    """Most lent (or returned) books over `[since, until)`, read from the book rollup only."""
+    lends = func.sum(BookDailyStats.lends).label("lends")
+    returns = func.sum(BookDailyStats.returns).label("returns")
+    totals = (
+        select(BookDailyStats.book_id, lends, returns)
+        .where(*_day_range(BookDailyStats.day, since, until))
+        .group_by(BookDailyStats.book_id)
+        .order_by((lends if by == "lends" else returns).desc(), BookDailyStats.book_id)
+        .limit(limit)
+        .subquery()
+    )
+    statement = (
+        select(totals.c.book_id, Book.title, Book.author, totals.c.lends, totals.c.returns)
+        .join(Book, Book.id == totals.c.book_id)
+        .order_by(getattr(totals.c, by).desc(), totals.c.book_id)
+    )
+    return [row._asdict() for row in db.exec(statement)]
+
+def get_daily_counts(
+    db: Session,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    book_id: Optional[int] = None,
+    user_id: Optional[int] = None
+) -> List[dict]:
+    """Lends and returns per day over `[since, until)`, optionally for one book or one user."""
+    if book_id is not None and user_id is not None:
+        raise ValueError("Filter by book_id or user_id, not both")
+    model = UserDailyStats if user_id is not None else BookDailyStats
+    statement = (
+        select(model.day, func.sum(model.lends).label("lends"), func.sum(model.returns).label("returns"))
+        .where(*_day_range(model.day, since, until))
+        .group_by(model.day)
+        .order_by(model.day)
+    )
+    if user_id is not None:
+        statement = statement.where(UserDailyStats.user_id == user_id)
+    if book_id is not None:
+        statement = statement.where(BookDailyStats.book_id == book_id)
+    return [row._asdict() for row in db.exec(statement)]
+
+_ROLLUPS = ((BookDailyStats, "book_id"), (UserDailyStats, "user_id"))
+
+def _raw_counts(key: str, since: date, until: date):
+    """Per `key` per day counts recomputed from `transaction` for `[since, until)`; served by the timestamp index."""
+    day = func.date(Transaction.timestamp, type_=Date)
+    return (
+        select(
+            getattr(Transaction, key),
+            day,
+            func.sum(case((Transaction.transaction_type == TransactionType.LEND, 1), else_=0)),
+            func.sum(case((Transaction.transaction_type == TransactionType.RETURN, 1), else_=0)),
+        )
+        .where(
+            Transaction.timestamp >= datetime.combine(since, time.min),
+            Transaction.timestamp < datetime.combine(until, time.min),
+        )
+        .group_by(getattr(Transaction, key), day)
+    )
+
+def _history_bounds(db: Session, since: Optional[date], until: Optional[date]) -> Tuple[Optional[date], Optional[date]]:
+    """
+    `[since, until)` limited to the days still in `transaction`. Months moved out
+    by archive_transactions are older than every remaining row, and their
+    rollups are the only counts left, so they are never checked or rebuilt.
+    """
+    first, last = db.exec(select(func.min(Transaction.timestamp), func.max(Transaction.timestamp))).one()
+    if first is None:
+        return None, None
+    since = max(since, first.date()) if since else first.date()
+    return since, until or last.date() + timedelta(days=1)
+
+def find_rollup_mismatches(db: Session, since: Optional[date] = None, until: Optional[date] = None) -> List[dict]:
+    """
+    Recomputes both rollups from raw transactions, `CHECK_WINDOW_DAYS` at a
+    time, and returns every row whose `(lends, returns)` differ.
+    """
+    since, until = _history_bounds(db, since, until)
+    mismatches = []
+    window_start = since
+    while since is not None and window_start < until:
+        window_end = min(window_start + timedelta(days=CHECK_WINDOW_DAYS), until)
+        for model, key in _ROLLUPS:
+            expected = {
+                (owner_id, day): (lends, returns)
+                for owner_id, day, lends, returns in db.exec(_raw_counts(key, window_start, window_end))
+            }
+            actual = {
+                (owner_id, day): (lends, returns)
+                for owner_id, day, lends, returns in db.exec(
+                    select(getattr(model, key), model.day, model.lends, model.returns)
+                    .where(*_day_range(model.day, window_start, window_end))
+                )
+            }
+            for owner_id, day in sorted(expected.keys() | actual.keys()):
+                want = expected.get((owner_id, day), (0, 0))
+                have = actual.get((owner_id, day), (0, 0))
+                if want != have:
+                    mismatches.append({"table": model.__tablename__, key: owner_id, "day": day, "expected": want, "actual": have})
+        window_start = window_end
+    return mismatches
+
+def rebuild_rollups(db: Session, since: Optional[date] = None, until: Optional[date] = None) -> None:
+    """
+    Replaces both rollups over `[since, until)` with counts recomputed from raw
+    transactions, then commits. Days before the oldest remaining transaction are kept.
+    """
+    since, until = _history_bounds(db, since, until)
+    if since is None or since >= until:
+        return
+    for model, key in _ROLLUPS:
+        db.exec(delete(model).where(*_day_range(model.day, since, until)))
+        columns = [getattr(model, key), model.day, model.lends, model.returns]
+        db.exec(_insert(db)(model).from_select(columns, _raw_counts(key, since, until)))
+    db.commit()
@@ -1,27 +1,58 @@
+from datetime import datetime, timezone
+from collections import defaultdict
+from sqlalchemy import Row, insert, tuple_
+from sqlalchemy.orm import joinedload
 from sqlmodel import Session, select
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
+from app.core import archive
+from app.db.partitions import add_months
 from app.models.transaction import Transaction, TransactionType
 from app.models.user import User
 from app.models.book import Book
-from app.crud import crud_book
+from app.crud import crud_book, crud_loan, crud_outbox, crud_stats
+
+def _add_transaction_event(
+    db: Session, transaction_id: int, book_id: int, user_id: int, transaction_type: TransactionType, timestamp: datetime
+) -> None:
+    crud_outbox.add_event(
+        db,
+        "transaction.created",
+        {
+            "id": transaction_id,
+            "book_id": book_id,
+            "user_id": user_id,
+            "transaction_type": transaction_type,
+            "timestamp": timestamp,
+        },
+        book_id=book_id,
+    )
 
 def create_transaction(
     db: Session, 
     *, 
-    book: Book, 
+    book_id: int, 
     user: User, 
     transaction_type: TransactionType
-) -> Transaction:
-    
+) -> Optional[Transaction]:
+    """
+    Lends or returns a book in a single database transaction, keeping the
+    user's active loans in step. Returns None if the book does not exist and
+    raises ValueError if it cannot be lent or the user does not hold it.
+    The daily circulation rollups are updated in the same commit.
+    """
+    change = -1 if transaction_type == TransactionType.LEND else 1
+    try:
+        book = crud_book.update_book_availability(db=db, book_id=book_id, change=change)
+    except ValueError:
+        raise ValueError("Book is not available for lending")
+    if not book:
+        return None
     if transaction_type == TransactionType.LEND:
-        if book.available_quantity <= 0:
-            raise ValueError("Book not available for lending")
-        crud_book.update_book_availability(db=db, book_id=book.id, change=-1)
-    elif transaction_type == TransactionType.RETURN:
-        crud_book.update_book_availability(db=db, book_id=book.id, change=1)
-    
-    db.refresh(book)
+        crud_loan.add_loan(db, user_id=user.id, book_id=book_id)
+    elif not crud_loan.remove_loan(db, user_id=user.id, book_id=book_id):
+        db.rollback()
+        raise ValueError("Book is not on loan to this user")
 
     db_transaction = Transaction(
         book_id=book.id,
@@ -29,13 +60,140 @@ def create_transaction(
         transaction_type=transaction_type
     )
     db.add(db_transaction)
+    # The INSERT the commit would run anyway, early, so the event has the id.
+    db.flush()
+    _add_transaction_event(db, db_transaction.id, book.id, user.id, transaction_type, db_transaction.timestamp)
+    crud_stats.record_transactions(db, [(book.id, user.id, transaction_type, db_transaction.timestamp)])
     db.commit()
-    db.refresh(db_transaction)
-    return db_transaction
+    return get_transaction(db, transaction_id=db_transaction.id)
+
+
+# Batches planned against stock that changed before their UPDATE (possible on
+# SQLite, which cannot lock rows) are re-planned this many times.
+_BATCH_ATTEMPTS = 5
+_BATCH_CONFLICT = "Stock changed concurrently; retry the batch"
+
+def _plan_batch(
+    items: List[Tuple[int, TransactionType]], stock: Dict[int, Tuple[int, int]], loans: Dict[int, int]
+) -> Tuple[List[Optional[str]], Dict[int, int], Dict[int, int]]:
+    """Applies the items in order to the read stock and loans: per-item errors and the net change per book."""
+    available = {book_id: quantities[0] for book_id, quantities in stock.items()}
+    held = dict(loans)
+    errors: List[Optional[str]] = []
+    for book_id, transaction_type in items:
+        error = None
+        if book_id not in stock:
+            error = "Book not found"
+        elif transaction_type == TransactionType.LEND:
+            if available[book_id] > 0:
+                available[book_id] -= 1
+                held[book_id] = held.get(book_id, 0) + 1
+            else:
+                error = "Book is not available for lending"
+        elif held.get(book_id, 0) > 0:
+            available[book_id] = min(available[book_id] + 1, stock[book_id][1])
+            held[book_id] -= 1
+        else:
+            error = "Book is not on loan to this user"
+        errors.append(error)
+    stock_changes = {book_id: count - stock[book_id][0] for book_id, count in available.items() if count != stock[book_id][0]}
+    loan_changes = {book_id: count - loans.get(book_id, 0) for book_id, count in held.items() if count != loans.get(book_id, 0)}
+    return errors, stock_changes, loan_changes
+
+
+def create_transactions_batch(
+    db: Session,
+    *,
+    items: List[Tuple[int, TransactionType]],
+    user: User,
+    atomic: bool = True
+) -> List[Tuple[Optional[Transaction], Optional[str]]]:
+    """
+    Lends and returns several books in one database transaction: the book and
+    loan rows are read (and locked, on PostgreSQL) once, stock and loans are
+    moved with one guarded relative UPDATE each and the transactions are
+    written with one multi-row INSERT. Items are applied in order.
 
+    If stock or loans changed between the read and the UPDATE, so that a
+    guard fails, the batch is rolled back and planned again from fresh rows.
 
-def get_transactions(db: Session, skip: int = 0, limit: int = 100, user_id: Optional[int] = None, book_id: Optional[int] = None) -> List[Transaction]:
-    statement = select(Transaction).order_by(Transaction.timestamp.desc())
+    Returns a `(transaction, error)` pair per item. With `atomic`, nothing is
+    written if any item fails.
+    """
+    user_id = user.id
+    book_ids = {book_id for book_id, _ in items}
+    for _ in range(_BATCH_ATTEMPTS):
+        stock = crud_book.lock_books_stock(db, book_ids)
+        loans = crud_loan.lock_loans(db, user_id, book_ids)
+        errors, stock_changes, loan_changes = _plan_batch(items, stock, loans)
+        applied = [item for item, error in zip(items, errors) if error is None]
+        if not applied or (atomic and len(applied) < len(items)):
+            db.rollback()
+            return [(None, error) for error in errors]
+        conflicts = crud_book.change_books_availability(db, stock_changes)
+        conflicts |= crud_loan.change_loans(db, user_id, loan_changes)
+        if not conflicts:
+            break
+        db.rollback()
+    else:
+        return [(None, _BATCH_CONFLICT) for _ in items]
+
+    # One multi-row INSERT on every dialect. Rows for the same book and type are
+    # identical, so RETURNING order does not matter when handing out the ids.
+    timestamp = datetime.utcnow()
+    statement = (
+        insert(Transaction)
+        .values([
+            {"book_id": book_id, "user_id": user_id, "transaction_type": transaction_type, "timestamp": timestamp}
+            for book_id, transaction_type in applied
+        ])
+        .returning(Transaction.id, Transaction.book_id, Transaction.transaction_type)
+    )
+    ids: Dict[Tuple[int, TransactionType], List[int]] = defaultdict(list)
+    for transaction_id, book_id, transaction_type in db.execute(statement):
+        ids[(book_id, transaction_type)].append(transaction_id)
+    for transaction_id, (book_id, transaction_type) in sorted(
+        (transaction_id, key) for key, group in ids.items() for transaction_id in group
+    ):
+        _add_transaction_event(db, transaction_id, book_id, user_id, transaction_type, timestamp)
+    crud_stats.record_transactions(
+        db, [(book_id, user_id, transaction_type, timestamp) for book_id, transaction_type in applied]
+    )
+    db.commit()
+
+    loaded = {
+        transaction.id: transaction
+        for transaction in db.exec(
+            select(Transaction)
+            .options(joinedload(Transaction.book), joinedload(Transaction.user))
+            .where(Transaction.id.in_([i for group in ids.values() for i in group]))
+        )
+    }
+    return [
+        (loaded[ids[item].pop(0)], None) if error is None else (None, error)
+        for item, error in zip(items, errors)
+    ]
+
+
+def get_transactions(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    user_id: Optional[int] = None,
+    book_id: Optional[int] = None,
+    before: Optional[Tuple[datetime, int]] = None
+) -> List[Transaction]:
+    """
+    Returns transactions newest first. `before` is a `(timestamp, id)` keyset
+    position; only rows strictly after it in that order are returned.
+    """
+    statement = (
+        select(Transaction)
+        .options(joinedload(Transaction.book), joinedload(Transaction.user))
+        .order_by(Transaction.timestamp.desc(), Transaction.id.desc())
+    )
+    if before is not None:
+        statement = statement.where(tuple_(Transaction.timestamp, Transaction.id) < tuple_(*before))
     if user_id:
         statement = statement.where(Transaction.user_id == user_id)
     if book_id:
@@ -46,4 +204,91 @@ def get_transactions(db: Session, skip: int = 0, limit: int = 100, user_id: Opti
     return transactions
 
 def get_transaction(db: Session, transaction_id: int) -> Optional[Transaction]:
-    return db.get(Transaction, transaction_id)
\ No newline at end of file
+    statement = (
+        select(Transaction)
+        .options(joinedload(Transaction.book), joinedload(Transaction.user))
+        .where(Transaction.id == transaction_id)
+    )
+    return db.exec(statement).first()
+
+
+EXPORT_COLUMNS = ("id", "transaction_type", "timestamp", "book_id", "user_id")
+
+def iter_transaction_batches(
+    db: Session,
+    *,
+    user_id: Optional[int] = None,
+    book_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    batch_size: int = 1000
+) -> Iterator[Sequence[Row]]:
+    """
+    Yields flat `EXPORT_COLUMNS` rows oldest first, `batch_size` at a time.
+    Rows are fetched through a server-side cursor (`yield_per`), so memory use
+    does not grow with the size of the result. `since` is inclusive, `until` exclusive.
+    """
+    statement = select(*(getattr(Transaction, column) for column in EXPORT_COLUMNS))
+    if user_id:
+        statement = statement.where(Transaction.user_id == user_id)
+    if book_id:
+        statement = statement.where(Transaction.book_id == book_id)
+    if since is not None:
+        statement = statement.where(Transaction.timestamp >= since)
+    if until is not None:
+        statement = statement.where(Transaction.timestamp < until)
+    statement = (
+        statement
+        .order_by(Transaction.timestamp, Transaction.id)
+        .execution_options(yield_per=batch_size)
+    )
+    yield from db.exec(statement).partitions()
+
+
+def _archived_row(record: dict) -> tuple:
+    return (
+        record["id"],
+        TransactionType(record["transaction_type"]),
+        datetime.fromisoformat(record["timestamp"]),
+        record["book_id"],
+        record["user_id"],
+    )
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Timestamps are stored as naive UTC; convert an aware bound to match."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def iter_archived_transaction_batches(
+    directory: Optional[str],
+    *,
+    user_id: Optional[int] = None,
+    book_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    batch_size: int = 1000
+) -> Iterator[List[tuple]]:
+    """
+    Same rows and filters as `iter_transaction_batches`, read from the monthly
+    archive files in `directory` instead of the database. Months outside
+    `[since, until)` are skipped without being opened.
+    """
+    since, until = naive_utc(since), naive_utc(until)
+    for month, path in archive.archived_months(directory):
+        if until is not None and datetime(month.year, month.month, 1) >= until:
+            break
+        if since is not None and datetime.combine(add_months(month, 1), datetime.min.time()) <= since:
+            continue
+        for rows in archive.iter_archive(path, EXPORT_COLUMNS, _archived_row, batch_size):
+            rows = [
+                row for row in rows
+                if (not user_id or row[4] == user_id)
+                and (not book_id or row[3] == book_id)
+                and (since is None or row[2] >= since)
+                and (until is None or row[2] < until)
+            ]
+            if rows:
+                yield rows
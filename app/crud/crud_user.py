@@ -2,19 +2,44 @@ from sqlmodel import Session, select
 from typing import Optional
 
 from app.models.user import User
-from app.schemas.user import UserCreate
+from app.schemas.user import UserCreate, UserUpdate
+from app.core.cache import TTLCache
+from app.core.config import settings
 from app.core.security import get_password_hash
 
+user_cache = TTLCache(maxsize=settings.USER_CACHE_MAX_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+
 def get_user_by_username(db: Session, username: str) -> Optional[User]:
     statement = select(User).where(User.username == username)
     return db.exec(statement).first()
 
+def get_cached_user(username: str) -> Optional[User]:
+    """
+    The user from `user_cache`, without touching the database. Cached users
+    are detached, read-only copies built without re-validation (the data was
+    dumped from a loaded row) and must not be added to a session.
+    """
+    data = user_cache.get(username)
+    return User.model_construct(**data) if data is not None else None
+
+def load_user_into_cache(db: Session, username: str) -> Optional[User]:
+    user = get_user_by_username(db, username=username)
+    if user is not None:
+        user_cache.set(username, user.model_dump())
+    return user
+
+def get_user_by_username_cached(db: Session, username: str) -> Optional[User]:
+    """Like `get_user_by_username`, but served from `user_cache` when possible."""
+    user = get_cached_user(username)
+    return user if user is not None else load_user_into_cache(db, username)
+
 def get_user_by_email(db: Session, email: str) -> Optional[User]:
     statement = select(User).where(User.email == email)
     return db.exec(statement).first()
 
-def create_user(db: Session, user_in: UserCreate) -> User:
-    hashed_password = get_password_hash(user_in.password)
+def create_user(db: Session, user_in: UserCreate, hashed_password: Optional[str] = None) -> User:
+    if hashed_password is None:
+        hashed_password = get_password_hash(user_in.password)
     db_user = User(
         username=user_in.username,
         email=user_in.email,
@@ -25,4 +50,25 @@ def create_user(db: Session, user_in: UserCreate) -> User:
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
-    return db_user
\ No newline at end of file
+    return db_user
+
+def update_user(db: Session, db_user: User, user_in: UserUpdate) -> User:
+    user_data = user_in.model_dump(exclude_unset=True)
+    password = user_data.pop("password", None)
+    if password:
+        user_data["hashed_password"] = get_password_hash(password)
+    old_username = db_user.username
+    for key, value in user_data.items():
+        setattr(db_user, key, value)
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+    user_cache.delete(old_username)
+    return db_user
+
+def update_password_hash(db: Session, db_user: User, hashed_password: str) -> User:
+    db_user.hashed_password = hashed_password
+    db.add(db_user)
+    db.commit()
+    user_cache.delete(db_user.username)
+    return db_user
@@ -0,0 +1,199 @@
+import heapq
+from collections import defaultdict
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models.book import Book
+
+
+def _rank(value: str, query: str) -> float:
+    position = value.find(query)
+    score = len(query) / len(value)
+    if position == 0:
+        score += 1.0
+    elif value[position - 1] == " ":
+        score += 0.5
+    return score
+
+
+class PostgresSearchBackend:
+    """
+    Substring search served by the pg_trgm GIN indexes (see migration 0003),
+    ranked by trigram similarity.
+    """
+
+    def search(
+        self,
+        db: Session,
+        *,
+        title: Optional[str] = None,
+        author: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[Book]:
+        statement = select(Book)
+        score = None
+        for column, query in ((Book.title, title), (Book.author, author)):
+            if not query:
+                continue
+            statement = statement.where(column.ilike(f"%{query}%"))
+            similarity = func.similarity(column, query)
+            score = similarity if score is None else score + similarity
+        if score is not None:
+            statement = statement.order_by(score.desc())
+        statement = statement.order_by(Book.id).offset(skip).limit(limit)
+        return db.exec(statement).all()
+
+    def index_book(self, book: Book) -> None:
+        pass
+
+    def index_books(self, books: Iterable[Book]) -> None:
+        pass
+
+    def remove_book(self, book_id: int) -> None:
+        pass
+
+    def reset(self) -> None:
+        pass
+
+
+class NgramSearchBackend:
+    """
+    In-process inverted n-gram index over book titles and authors, for SQLite
+    and tests. It is built from the database on first search and kept current
+    by `crud_book`; writes made by other processes are not seen.
+    """
+
+    def __init__(self, n: int = 3):
+        self.n = n
+        self._lock = Lock()
+        self._docs: Optional[Dict[int, Tuple[str, str]]] = None
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+
+    def _grams(self, value: str) -> set:
+        return {value[i:i + self.n] for i in range(len(value) - self.n + 1)}
+
+    def _doc_grams(self, doc: Tuple[str, str]) -> set:
+        return self._grams(doc[0]) | self._grams(doc[1])
+
+    def _unpost(self, book_id: int, grams: set) -> None:
+        for gram in grams:
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(book_id)
+                if not postings:
+                    del self._postings[gram]
+
+    def _add(self, book_id: int, title: str, author: str) -> None:
+        doc = (title.lower(), author.lower())
+        grams = self._doc_grams(doc)
+        old = self._docs.get(book_id)
+        if old is not None:
+            # Re-indexed: drop the grams the book no longer has, so postings stay the size of the catalogue.
+            self._unpost(book_id, self._doc_grams(old) - grams)
+        self._docs[book_id] = doc
+        for gram in grams:
+            self._postings[gram].add(book_id)
+
+    def _build(self, db: Session) -> None:
+        # Called with the lock held.
+        self._docs = {}
+        for book_id, title, author in db.exec(select(Book.id, Book.title, Book.author)):
+            self._add(book_id, title, author)
+
+    def _candidates(self, db: Session, grams: set) -> List[Tuple[int, Tuple[str, str]]]:
+        """
+        The candidate documents, copied under the lock: writers and `reset()`
+        mutate the index from other threads while searches rank.
+        """
+        with self._lock:
+            if self._docs is None:
+                self._build(db)
+            docs = self._docs
+            if not grams:
+                return list(docs.items())
+            postings = min((self._postings.get(g, ()) for g in grams), key=len)
+            return [(book_id, docs[book_id]) for book_id in set(postings) if book_id in docs]
+
+    def index_book(self, book: Book) -> None:
+        self.index_books([book])
+
+    def index_books(self, books: Iterable[Book]) -> None:
+        """Adds or re-indexes books (ORM rows or Core rows) under one lock acquisition."""
+        with self._lock:
+            if self._docs is not None:
+                for book in books:
+                    self._add(book.id, book.title, book.author)
+
+    def remove_book(self, book_id: int) -> None:
+        with self._lock:
+            if self._docs is not None:
+                doc = self._docs.pop(book_id, None)
+                if doc is not None:
+                    self._unpost(book_id, self._doc_grams(doc))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._docs = None
+            self._postings = defaultdict(set)
+
+    def search_ids(
+        self,
+        db: Session,
+        *,
+        title: Optional[str] = None,
+        author: Optional[str] = None,
+        top: Optional[int] = None
+    ) -> List[int]:
+        title_q = title.lower() if title else None
+        author_q = author.lower() if author else None
+
+        grams = set()
+        for query in (title_q, author_q):
+            if query:
+                grams |= self._grams(query)
+
+        ranked = []
+        for book_id, doc in self._candidates(db, grams):
+            score = 0.0
+            for value, query in zip(doc, (title_q, author_q)):
+                if not query:
+                    continue
+                if query not in value:
+                    break
+                score += _rank(value, query)
+            else:
+                ranked.append((-score, book_id))
+        ranked = heapq.nsmallest(top, ranked) if top is not None else sorted(ranked)
+        return [book_id for _, book_id in ranked]
+
+    def search(
+        self,
+        db: Session,
+        *,
+        title: Optional[str] = None,
+        author: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[Book]:
+        ids = self.search_ids(db, title=title, author=author, top=skip + limit)[skip:]
+        if not ids:
+            return []
+        books = {book.id: book for book in db.exec(select(Book).where(Book.id.in_(ids)))}
+        return [books[book_id] for book_id in ids if book_id in books]
+
+
+postgres_backend = PostgresSearchBackend()
+ngram_backend = NgramSearchBackend()
+
+
+def get_search_backend(db: Session):
+    if settings.SEARCH_BACKEND == "ngram":
+        return ngram_backend
+    if settings.SEARCH_BACKEND == "postgres" or db.get_bind().dialect.name == "postgresql":
+        return postgres_backend
+    return ngram_backend
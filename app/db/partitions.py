@@ -0,0 +1,72 @@
+from datetime import date
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+TABLE = "transaction"
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_{month:%Y_%m}"
+
+
+def is_partitioned(conn: Connection) -> bool:
+    """True when `transaction` is a PostgreSQL partitioned table (see migration 0007)."""
+    if conn.dialect.name != "postgresql":
+        return False
+    return conn.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"),
+        {"table": f'"{TABLE}"'},
+    ).first() is not None
+
+
+def list_partitions(conn: Connection) -> List[str]:
+    return list(conn.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = to_regclass(:table) ORDER BY child.relname"
+        ),
+        {"table": f'"{TABLE}"'},
+    ).scalars())
+
+
+def ensure_partitions(conn: Connection, first: date, last: date) -> List[str]:
+    """
+    Creates any missing monthly partitions covering `first` through `last`
+    and returns the names created. Run ahead of time: rows for a month with
+    no partition land in the default partition, which then blocks creating it.
+    """
+    existing = set(list_partitions(conn))
+    created = []
+    month = month_start(first)
+    while month <= last:
+        name = partition_name(month)
+        if name not in existing:
+            conn.execute(text(
+                f'CREATE TABLE "{name}" PARTITION OF "{TABLE}" '
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+            ))
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+def drop_partition(conn: Connection, month: date) -> bool:
+    """Detaches and drops the partition for `month`, if it exists."""
+    name = partition_name(month)
+    if name not in list_partitions(conn):
+        return False
+    conn.execute(text(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"'))
+    conn.execute(text(f'DROP TABLE "{name}"'))
+    return True
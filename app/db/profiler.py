@@ -0,0 +1,123 @@
+"""
+Opt-in query profiler (DB_PROFILE): logs statements slower than a threshold
+together with their EXPLAIN plan, and flags requests that run the same
+statement shape many times (the N+1 pattern).
+"""
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+_EXPLAINABLE = ("SELECT", "WITH")
+
+
+class RequestProfile:
+    """Statements run while handling one request, in order."""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.statements: List[Tuple[str, float]] = []
+
+    def shapes(self) -> Counter:
+        # Statements are already parameterised, so identical text means identical shape.
+        return Counter(statement for statement, _ in self.statements)
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        return [(statement, count) for statement, count in self.shapes().most_common() if count >= threshold]
+
+
+class QueryProfiler:
+    def __init__(self, slow_ms: float = 200, explain: bool = True, repeat_threshold: int = 5):
+        self.slow_ms = slow_ms
+        self.explain = explain
+        self.repeat_threshold = repeat_threshold
+        self.listeners: List[Callable[[RequestProfile], None]] = []
+        self._current: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+    def attach(self, engine: Engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def detach(self, engine: Engine) -> None:
+        event.remove(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.remove(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    @contextmanager
+    def request(self, label: str) -> Iterator[RequestProfile]:
+        """Collects the statements run inside the block into one RequestProfile."""
+        profile = RequestProfile(label)
+        token = self._current.set(profile)
+        try:
+            yield profile
+        finally:
+            self._current.reset(token)
+            for statement, count in profile.repeated(self.repeat_threshold):
+                logger.warning("possible N+1 in %s: statement ran %d times: %s", profile.label, count, statement)
+            for listener in self.listeners:
+                listener(profile)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._profiler_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_profiler_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        profile = self._current.get()
+        if profile is not None:
+            profile.statements.append((statement, elapsed))
+        if elapsed * 1000 < self.slow_ms:
+            return
+        plan = None
+        if self.explain and not executemany and statement.lstrip()[:6].upper().startswith(_EXPLAINABLE):
+            plan = self._explain(conn, statement, parameters)
+        logger.warning(
+            "slow query (%.1f ms)%s: %s%s",
+            elapsed * 1000,
+            f" in {profile.label}" if profile is not None else "",
+            statement,
+            f"\n{plan}" if plan else "",
+        )
+
+    def _explain(self, conn, statement: str, parameters: Any) -> Optional[str]:
+        prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+        # A separate DBAPI cursor, so the original statement's pending rows are untouched.
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters)
+            return "\n".join(" ".join(str(column) for column in row) for row in cursor.fetchall())
+        except Exception as exc:
+            return f"(EXPLAIN failed: {exc})"
+        finally:
+            cursor.close()
+
+
+class QueryProfilerMiddleware:
+    """Pure ASGI middleware profiling each HTTP request, labelled by method and route template."""
+
+    def __init__(self, app: Callable, profiler: QueryProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with self.profiler.request(f"{scope['method']} {scope['path']}") as profile:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                timings = metrics.current_timings()
+                if timings is not None and timings.route:
+                    profile.label = f"{scope['method']} {timings.route}"
@@ -1,8 +1,236 @@
+import asyncio
+import time
+from contextvars import ContextVar
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, TypeVar, Union
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlmodel import create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.cache import make_cache
 from app.core.config import settings
+from app.db.profiler import QueryProfiler
+
+T = TypeVar("T")
+AnySession = Union[Session, AsyncSession]
+
+
+class _WaitTimingMixin:
+    """Records how long callers wait for a connection to be checked out."""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._wait_lock = Lock()
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            with self._wait_lock:
+                self.checkouts += 1
+                self.wait_seconds_total += waited
+                self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+
+class MonitoredQueuePool(_WaitTimingMixin, QueuePool):
+    pass
+
+
+class MonitoredAsyncQueuePool(_WaitTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _engine_options(url: str) -> Dict[str, Any]:
+    options: Dict[str, Any] = {"echo": settings.DB_ECHO, "pool_pre_ping": settings.DB_POOL_PRE_PING}
+    driver = make_url(url).drivername
+    if driver.startswith("sqlite"):
+        return options
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    if settings.DB_STATEMENT_TIMEOUT_MS and driver.startswith("postgresql"):
+        if driver.endswith("asyncpg"):
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+
+def create_db_engine(url: str) -> Engine:
+    options = _engine_options(url)
+    if "pool_size" in options:
+        options["poolclass"] = MonitoredQueuePool
+    return create_engine(url, **options)
+
+
+def create_async_db_engine(url: str):
+    options = _engine_options(url)
+    if "pool_size" in options:
+        options["poolclass"] = MonitoredAsyncQueuePool
+    return create_async_engine(url, **options)
+
+
+def pool_stats(engine: Engine) -> Dict[str, Any]:
+    pool = engine.pool
+    stats: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+        )
+    if isinstance(pool, _WaitTimingMixin):
+        stats.update(
+            checkouts=pool.checkouts,
+            wait_seconds_total=round(pool.wait_seconds_total, 6),
+            wait_seconds_max=round(pool.wait_seconds_max, 6),
+        )
+    return stats
+
+
+engine = create_db_engine(str(settings.DATABASE_URL))
+
+async_engine = create_async_db_engine(settings.ASYNC_DATABASE_URL) if settings.DB_ASYNC else None
+
+read_engine = create_db_engine(settings.READ_DATABASE_URL) if settings.READ_DATABASE_URL else None
+async_read_engine = (
+    create_async_db_engine(settings.ASYNC_READ_DATABASE_URL)
+    if settings.DB_ASYNC and settings.ASYNC_READ_DATABASE_URL
+    else None
+)
+
+profiler = QueryProfiler(
+    slow_ms=settings.DB_SLOW_QUERY_MS,
+    explain=settings.DB_EXPLAIN_SLOW_QUERIES,
+    repeat_threshold=settings.DB_REPEATED_STATEMENT_THRESHOLD,
+) if settings.DB_PROFILE else None
+if profiler is not None:
+    for profiled in (engine, async_engine, read_engine, async_read_engine):
+        if profiled is not None:
+            profiler.attach(getattr(profiled, "sync_engine", profiled))
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+# Marks sessions on the read replica, whose rows may lag behind the primary.
+REPLICA_INFO_KEY = "replica"
+
+def is_replica(db: Session) -> bool:
+    return bool(db.info.get(REPLICA_INFO_KEY))
+
+def _pool_capacity(engine: Engine) -> Optional[int]:
+    pool = engine.pool
+    if isinstance(pool, QueuePool) and pool._max_overflow >= 0:
+        return pool.size() + pool._max_overflow
+    return None
+
+
+def sync_session_dependency(engine: Engine, replica: bool = False):
+    """
+    Builds a get_db dependency for a sync engine. Sessions wait for a free pool
+    slot on the event loop before starting, so requests parked between
+    threadpool hops can never occupy every thread with blocked checkouts while
+    the connection holders wait for a thread to finish.
+    """
+    capacity = _pool_capacity(engine)
+    slots: "WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = WeakKeyDictionary()
+
+    async def get_sync_db():
+        session = Session(engine, info={REPLICA_INFO_KEY: True} if replica else None)
+        try:
+            if capacity is None:
+                yield session
+            else:
+                loop = asyncio.get_running_loop()
+                if loop not in slots:
+                    slots[loop] = asyncio.Semaphore(capacity)
+                async with slots[loop]:
+                    yield session
+        finally:
+            await run_in_threadpool(session.close)
+
+    return get_sync_db
+
+
+get_sync_db = sync_session_dependency(engine)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as session:
+        yield session
+
+get_db = get_async_db if settings.DB_ASYNC else get_sync_db
+
+
+async def no_replica() -> None:
+    return None
+
+if settings.DB_ASYNC and async_read_engine is not None:
+    AsyncReadSessionLocal = async_sessionmaker(
+        async_read_engine, class_=AsyncSession, expire_on_commit=False, info={REPLICA_INFO_KEY: True}
+    )
+
+    async def get_replica_db():
+        async with AsyncReadSessionLocal() as session:
+            yield session
+elif not settings.DB_ASYNC and read_engine is not None:
+    get_replica_db = sync_session_dependency(read_engine, replica=True)
+else:
+    # Without a replica, deps.get_read_db falls back to get_db.
+    get_replica_db = no_replica
+
+
+# Read-your-writes: users who committed a write recently, shared between
+# workers through CACHE_URL when it is set.
+recent_writers = make_cache(
+    settings.CACHE_URL, maxsize=100_000, ttl=settings.READ_YOUR_WRITES_SECONDS, prefix="writer:"
+)
+_request_user: ContextVar[Optional[str]] = ContextVar("request_user", default=None)
+
+def bind_request_user(username: str) -> None:
+    """Attributes this request's commits to `username` (see wrote_recently)."""
+    _request_user.set(username)
+
+def wrote_recently(username: str) -> bool:
+    return recent_writers.enabled and recent_writers.get(username) is not None
+
+@event.listens_for(Session, "after_commit")
+def _remember_writer(db: Session) -> None:
+    # Only replica routing reads it; skips a cache (or Redis) write per commit otherwise.
+    if not settings.READ_DATABASE_URL:
+        return
+    username = _request_user.get()
+    if username is not None and not is_replica(db):
+        recent_writers.set(username, True)
+
+async def run_db(db: AnySession, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Runs a synchronous CRUD function without blocking the event loop.
+    With an AsyncSession it runs on the session's greenlet (no thread is held
+    while waiting on the database); with a Session it runs in the threadpool.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
 
-engine = create_engine(str(settings.DATABASE_URL), echo=True)
 
-def get_db():
-    with Session(engine) as session:
-        yield session
\ No newline at end of file
+def sync_engine_for(db: AnySession) -> Engine:
+    """
+    Returns a synchronous engine on the same database as `db`, for work that
+    must outlive the request's session, such as a streamed response body.
+    """
+    if isinstance(db, AsyncSession):
+        return engine
+    return db.get_bind()
@@ -1,15 +1,69 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.core import metrics, ratelimit, singleflight
 from app.core.config import settings
+from app.core.serialization import AppJSONResponse
+from app.core.security import PasswordHashingBusy
 from app.api.v1.api import api_router
+from app.crud import crud_book, crud_user
+from app.db import session
+from app.db.profiler import QueryProfilerMiddleware
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
-    version=settings.PROJECT_VERSION
+    version=settings.PROJECT_VERSION,
+    default_response_class=AppJSONResponse
 )
+app.router.route_class = metrics.TimedRoute
+
+rate_limiter = (
+    ratelimit.RateLimiter(
+        ratelimit.make_bucket_store(settings.RATE_LIMIT_URL),
+        settings.RATE_LIMITS,
+        settings.RATE_LIMIT_DEFAULT,
+        forwarded_header=settings.RATE_LIMIT_FORWARDED_HEADER,
+    )
+    if settings.RATE_LIMIT_ENABLED
+    else None
+)
+
+# Added last, the metrics middleware runs outermost, so the profiler can label requests with its route.
+# The rate limiter runs innermost, so rejected requests are still counted.
+if rate_limiter is not None:
+    app.add_middleware(ratelimit.RateLimitMiddleware, limiter=rate_limiter, routes=app.routes)
+if session.profiler is not None:
+    app.add_middleware(QueryProfilerMiddleware, profiler=session.profiler)
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware, server_timing=settings.METRICS_SERVER_TIMING)
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+@app.exception_handler(PasswordHashingBusy)
+async def password_hashing_busy_handler(request: Request, exc: PasswordHashingBusy):
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": "Too many concurrent authentication requests, retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
 @app.get("/", tags=["Root"])
 async def root():
     return {"message": f"Welcome to {settings.PROJECT_NAME} v{settings.PROJECT_VERSION}"}
+
+@app.get("/health/db", tags=["Root"])
+async def database_pool_health():
+    stats = {"sync": session.pool_stats(session.engine)}
+    if session.async_engine is not None:
+        stats["async"] = session.pool_stats(session.async_engine.sync_engine)
+    return stats
+
+
+@app.get("/health/cache", tags=["Root"])
+async def cache_health():
+    return {"books": crud_book.book_cache.stats(), "users": crud_user.user_cache.stats()}
+
+
+@app.get("/metrics", tags=["Root"], response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.registry.render() + singleflight.render(), media_type="text/plain; version=0.0.4")
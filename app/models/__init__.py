@@ -1,3 +1,6 @@
 from .user import User
 from .book import Book
-from .transaction import Transaction
\ No newline at end of file
+from .transaction import Transaction
+from .loan import ActiveLoan
+from .stats import BookDailyStats, UserDailyStats
+from .outbox import OutboxEvent
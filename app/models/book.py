@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field, Relationship
+from datetime import datetime
 from typing import List, Optional
 
 class Book(SQLModel, table=True):
@@ -8,5 +9,8 @@ class Book(SQLModel, table=True):
     isbn: str = Field(unique=True, index=True, max_length=20)
     total_quantity: int = Field(gt=0)
     available_quantity: int 
+    # Bumped by every write in crud_book; drives ETag / Last-Modified.
+    version: int = Field(default=1)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
 
     transactions: List["Transaction"] = Relationship(back_populates="book")
\ No newline at end of file
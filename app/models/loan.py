@@ -0,0 +1,18 @@
+from sqlmodel import SQLModel, Field, Relationship
+from datetime import datetime
+from typing import Optional
+from .book import Book
+
+class ActiveLoan(SQLModel, table=True):
+    """
+    Copies of a book a user currently holds, kept in step with `transaction`
+    by crud_transaction. Rows are deleted when the last copy is returned.
+    """
+    __tablename__ = "active_loan"
+
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    book_id: int = Field(foreign_key="book.id", primary_key=True)
+    quantity: int = Field(default=1, gt=0)
+    since: datetime = Field(default_factory=datetime.utcnow)
+
+    book: Optional["Book"] = Relationship()
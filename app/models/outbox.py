@@ -0,0 +1,19 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+from typing import Optional
+
+class OutboxEvent(SQLModel, table=True):
+    """
+    One change to a book or a transaction, written by crud_outbox in the same
+    commit as the change. `id` is the change feed's sequence number.
+    """
+    __tablename__ = "outbox_event"
+    # Never reuse sequence numbers on SQLite, even after old events are deleted.
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    event_type: str = Field(max_length=32)
+    # No foreign key: deleting a book must not touch (or be blocked by) its events.
+    book_id: Optional[int] = Field(default=None, index=True)
+    payload: str
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
@@ -0,0 +1,20 @@
+from sqlmodel import SQLModel, Field
+from datetime import date
+
+class BookDailyStats(SQLModel, table=True):
+    """Lends and returns of one book on one (UTC) day, maintained by crud_stats."""
+    __tablename__ = "book_daily_stats"
+
+    book_id: int = Field(foreign_key="book.id", primary_key=True)
+    day: date = Field(primary_key=True, index=True)
+    lends: int = Field(default=0)
+    returns: int = Field(default=0)
+
+class UserDailyStats(SQLModel, table=True):
+    """Lends and returns by one user on one (UTC) day, maintained by crud_stats."""
+    __tablename__ = "user_daily_stats"
+
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    day: date = Field(primary_key=True, index=True)
+    lends: int = Field(default=0)
+    returns: int = Field(default=0)
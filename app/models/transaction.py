@@ -1,3 +1,4 @@
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field, Relationship
 from datetime import datetime
 from enum import Enum
@@ -10,12 +11,19 @@ class TransactionType(str, Enum):
     RETURN = "return"
 
 class Transaction(SQLModel, table=True):
+    # On PostgreSQL the table is range-partitioned by month on `timestamp` (migration 0007).
+    __table_args__ = (
+        Index("ix_transaction_timestamp_id", "timestamp", "id"),
+        Index("ix_transaction_user_id_timestamp", "user_id", "timestamp"),
+        Index("ix_transaction_book_id_timestamp", "book_id", "timestamp"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True, index=True)
     transaction_type: TransactionType
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     
-    book_id: int = Field(foreign_key="book.id", index=True)
-    user_id: int = Field(foreign_key="user.id", index=True)
+    book_id: int = Field(foreign_key="book.id")
+    user_id: int = Field(foreign_key="user.id")
 
     user: Optional["User"] = Relationship(back_populates="transactions")
     book: Optional["Book"] = Relationship(back_populates="transactions")
\ No newline at end of file
@@ -1,5 +1,14 @@
-from .book import BookCreate, BookRead, BookUpdate
+from .book import BookCreate, BookImportError, BookImportResult, BookRead, BookUpdate
+from .loan import LoanRead
 from .token import Token, TokenData
-from .transaction import TransactionCreateGive, TransactionCreateTake, TransactionRead
-from .user import UserCreate, UserRead
-from .msg import Msg
\ No newline at end of file
+from .transaction import (
+    TransactionBatchCreate,
+    TransactionBatchItem,
+    TransactionBatchItemResult,
+    TransactionCreateGive,
+    TransactionCreateTake,
+    TransactionRead,
+)
+from .user import UserCreate, UserRead, UserUpdate
+from .msg import Msg
+from .stats import BookStatsRead, DailyStatsRead
\ No newline at end of file
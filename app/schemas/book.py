@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
 class BookBase(BaseModel):
     title: str = Field(..., min_length=1, max_length=200)
@@ -19,4 +19,14 @@ class BookRead(BookBase):
 
 class BookUpdate(BaseModel):
     title: Optional[str] = Field(None, min_length=1, max_length=200)
-    author: Optional[str] = Field(None, min_length=1, max_length=100)
\ No newline at end of file
+    author: Optional[str] = Field(None, min_length=1, max_length=100)
+
+class BookImportError(BaseModel):
+    line: int
+    error: str
+
+class BookImportResult(BaseModel):
+    processed: int
+    imported: int
+    failed: int
+    errors: List[BookImportError]
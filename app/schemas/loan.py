@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from datetime import datetime
+from app.schemas.book import BookRead
+from typing import Optional
+
+
+class LoanRead(BaseModel):
+    book_id: int
+    quantity: int
+    since: datetime
+
+    book: Optional[BookRead] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from datetime import date
+
+
+class BookStatsRead(BaseModel):
+    book_id: int
+    title: str
+    author: str
+    lends: int
+    returns: int
+
+class DailyStatsRead(BaseModel):
+    day: date
+    lends: int
+    returns: int
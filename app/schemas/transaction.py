@@ -1,9 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from app.models.transaction import TransactionType
 from app.schemas.user import UserRead 
 from app.schemas.book import BookRead
-from typing import Optional
+from typing import List, Optional
 
 
 class TransactionBase(BaseModel):
@@ -26,4 +26,19 @@ class TransactionRead(BaseModel):
     user: Optional[UserRead] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class TransactionBatchItem(BaseModel):
+    book_id: int
+    type: TransactionType
+
+class TransactionBatchCreate(BaseModel):
+    items: List[TransactionBatchItem] = Field(..., min_length=1, max_length=100)
+    # All-or-nothing by default; with atomic=false each item succeeds or fails on its own.
+    atomic: bool = True
+
+class TransactionBatchItemResult(BaseModel):
+    book_id: int
+    type: TransactionType
+    transaction: Optional[TransactionRead] = None
+    error: Optional[str] = None
@@ -7,6 +7,12 @@ class UserCreate(BaseModel):
     password: str
     full_name: Optional[str] = None
 
+class UserUpdate(BaseModel):
+    email: Optional[EmailStr] = None
+    password: Optional[str] = None
+    full_name: Optional[str] = None
+    is_active: Optional[bool] = None
+
 class UserRead(BaseModel):
     id: int
     username: str
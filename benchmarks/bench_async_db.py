@@ -0,0 +1,93 @@
+"""
+Load-tests GET /books/{id} and GET /transactions/ with many concurrent clients,
+once through the sync Session stack and once through the AsyncSession stack.
+
+    python -m benchmarks.bench_async_db --clients 500 --requests 5000
+    python -m benchmarks.bench_async_db --sync-url postgresql://... --async-url postgresql+asyncpg://...
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.core.config import settings
+from app.db.session import get_db
+from app.main import app
+from app.models import Book, Transaction, User
+from app.models.transaction import TransactionType
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+
+def seed(engine) -> None:
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(id=1, username="bench", email="bench@example.com", hashed_password="x"))
+        session.add_all(
+            Book(id=i, title=f"Book {i}", author="Bench", isbn=f"{i:013d}", total_quantity=5, available_quantity=5)
+            for i in range(1, 101)
+        )
+        session.add_all(
+            Transaction(book_id=i % 100 + 1, user_id=1, transaction_type=TransactionType.LEND)
+            for i in range(1000)
+        )
+        session.commit()
+
+
+async def drive(clients: int, requests: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(
+            f"{settings.API_V1_STR}/books/{i % 100 + 1}" if i % 2 else f"{settings.API_V1_STR}/transactions/?limit=20"
+        )
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            while not queue.empty():
+                response = await client.get(queue.get_nowait())
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        return requests / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--sync-url")
+    parser.add_argument("--async-url")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        sync_engine = create_engine(args.sync_url or f"sqlite:///{db_path}", pool_size=50, max_overflow=50)
+        async_engine = create_async_engine(args.async_url or f"sqlite+aiosqlite:///{db_path}", pool_size=50, max_overflow=50)
+        seed(sync_engine)
+
+        def sync_db():
+            with Session(sync_engine) as session:
+                yield session
+
+        session_factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+        async def async_db():
+            async with session_factory() as session:
+                yield session
+
+        for name, dependency in (("sync", sync_db), ("async", async_db)):
+            app.dependency_overrides[get_db] = dependency
+            rate = asyncio.run(drive(args.clients, args.requests))
+            print(f"{name:>6}: {rate:8.0f} req/s with {args.clients} concurrent clients")
+        app.dependency_overrides.clear()
+        sync_engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
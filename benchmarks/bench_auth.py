@@ -0,0 +1,66 @@
+"""
+Cost per request of the auth dependency chain (deps.get_current_user) with a
+warm user cache: the previous chain (jwt.decode, TokenData, user lookup in the
+threadpool) against the verified-token cache with the user cache read on the
+event loop.
+
+    python -m benchmarks.bench_auth --calls 20000
+"""
+import argparse
+import asyncio
+import time
+
+from jose import jwt
+from sqlmodel import Session
+
+from app.api import deps
+from app.core import security
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.crud import crud_user
+from app.db.session import run_db
+from app.models import User
+from app.schemas.token import TokenData
+from benchmarks.common import memory_engine
+
+
+async def previous_chain(db: Session, token: str) -> User:
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    token_data = TokenData(username=payload.get("sub"))
+    return await run_db(db, crud_user.get_user_by_username_cached, username=token_data.username)
+
+
+async def per_call_us(chain, db: Session, token: str, calls: int) -> float:
+    for _ in range(100):
+        await chain(db, token)
+    started = time.perf_counter()
+    for _ in range(calls):
+        await chain(db, token)
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=20_000)
+    args = parser.parse_args()
+
+    engine = memory_engine()
+    with Session(engine) as session:
+        session.add(User(username="bench", email="bench@example.com", hashed_password="x"))
+        session.commit()
+    token = create_access_token(data={"sub": "bench"})
+
+    async def run():
+        with Session(engine) as db:
+            before = await per_call_us(previous_chain, db, token, args.calls)
+            after = await per_call_us(deps.get_current_user, db, token, args.calls)
+        return before, after
+
+    before, after = asyncio.run(run())
+    print(f"jwt.decode + threadpool lookup: {before:7.1f} us per request")
+    print(f"token cache + loop-side lookup: {after:7.1f} us per request  ({before / after:.1f}x)")
+    print(f"token cache {security.token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
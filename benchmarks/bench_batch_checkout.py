@@ -0,0 +1,69 @@
+"""
+Compares a 50-book checkout done as 50 POST /transactions/give calls with a
+single POST /transactions/batch, counting SQL statements for each.
+
+    python -m benchmarks.bench_batch_checkout --books 50 --rounds 20
+"""
+import argparse
+import time
+
+from sqlalchemy import event
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.models import Book, User
+from benchmarks.common import app_client, memory_engine
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--books", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = memory_engine()
+    with Session(engine) as session:
+        session.add(User(username="bench", email="bench@example.com", hashed_password="x"))
+        session.add_all(
+            Book(title=f"Book {i}", author="Author", isbn=f"{i:013d}", total_quantity=1, available_quantity=1)
+            for i in range(args.books)
+        )
+        session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'bench'})}"}
+    book_ids = range(1, args.books + 1)
+    url = f"{settings.API_V1_STR}/transactions"
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *_: statements.append(1))
+
+    def give_one_by_one(client) -> None:
+        for book_id in book_ids:
+            assert client.post(f"{url}/give", json={"book_id": book_id}, headers=headers).status_code == 201
+
+    def give_batch(client) -> None:
+        items = [{"book_id": book_id, "type": "lend"} for book_id in book_ids]
+        assert client.post(f"{url}/batch", json={"items": items}, headers=headers).status_code == 201
+
+    def return_all(client) -> None:
+        items = [{"book_id": book_id, "type": "return"} for book_id in book_ids]
+        client.post(f"{url}/batch", json={"items": items}, headers=headers)
+
+    with app_client(engine) as client:
+        for name, checkout in (("50 x /give", give_one_by_one), ("1 x /batch", give_batch)):
+            elapsed = 0.0
+            executed = 0
+            for _ in range(args.rounds):
+                statements.clear()
+                started = time.perf_counter()
+                checkout(client)
+                elapsed += time.perf_counter() - started
+                executed += len(statements)
+                return_all(client)
+            print(
+                f"{name:12} {elapsed / args.rounds * 1000:8.1f} ms/checkout "
+                f"{executed / args.rounds:6.0f} statements/checkout"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Measures requests/sec on the public book reads (GET /books/{id} and GET /books/)
+with and without the book cache, with an occasional lend invalidating a book.
+
+    python -m benchmarks.bench_book_cache --books 1000 --requests 4000
+"""
+import argparse
+import random
+import time
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.crud import crud_book
+from app.models import Book, User
+from benchmarks.common import app_client, memory_engine
+
+
+def run(client, headers: dict, books: int, requests: int, seed: int) -> float:
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    for i in range(requests):
+        book_id = rng.randint(1, books)
+        if i % 100 == 99:
+            client.post(f"{settings.API_V1_STR}/transactions/give", json={"book_id": book_id}, headers=headers)
+        elif i % 2:
+            client.get(f"{settings.API_V1_STR}/books/{book_id}")
+        else:
+            client.get(f"{settings.API_V1_STR}/books/?skip={rng.randrange(0, books, 50)}&limit=50")
+    return requests / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--books", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=4000)
+    args = parser.parse_args()
+
+    engine = memory_engine()
+    with Session(engine) as session:
+        session.add(User(username="bench", email="bench@example.com", hashed_password="x"))
+        session.add_all(
+            Book(title=f"Book {i}", author=f"Author {i % 50}", isbn=f"{i:013d}", total_quantity=1000, available_quantity=1000)
+            for i in range(args.books)
+        )
+        session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'bench'})}"}
+
+    with app_client(engine) as client:
+        maxsize = crud_book.book_cache.maxsize
+        crud_book.book_cache.maxsize = 0
+        uncached = run(client, headers, args.books, args.requests, seed=1)
+        crud_book.book_cache.maxsize = maxsize
+        crud_book.book_cache.clear()
+        cached = run(client, headers, args.books, args.requests, seed=1)
+
+    print(f"without cache: {uncached:8.0f} req/s")
+    print(f"with cache:    {cached:8.0f} req/s  {crud_book.book_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
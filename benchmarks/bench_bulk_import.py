@@ -0,0 +1,59 @@
+"""
+Measures rows/sec for POST /books/bulk against one-at-a-time POST /books/.
+
+    python -m benchmarks.bench_bulk_import --rows 200000
+"""
+import argparse
+import time
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.models import User
+from benchmarks.common import app_client, memory_engine
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--single-rows", type=int, default=500)
+    args = parser.parse_args()
+
+    engine = memory_engine()
+    with Session(engine) as session:
+        session.add(User(username="bench", email="bench@example.com", hashed_password="x"))
+        session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'bench'})}"}
+
+    with app_client(engine) as client:
+        started = time.perf_counter()
+        for i in range(args.single_rows):
+            client.post(
+                f"{settings.API_V1_STR}/books/",
+                json={"title": f"Single {i}", "author": "Bench", "isbn": f"9{i:012d}", "total_quantity": 1},
+                headers=headers,
+            )
+        single_rate = args.single_rows / (time.perf_counter() - started)
+
+        def body():
+            yield b"title,author,isbn,total_quantity\n"
+            for start in range(0, args.rows, 10_000):
+                yield "".join(
+                    f"Bulk Title {i},Bulk Author {i % 997},{i:013d},{i % 5 + 1}\n"
+                    for i in range(start, min(start + 10_000, args.rows))
+                ).encode()
+
+        started = time.perf_counter()
+        response = client.post(
+            f"{settings.API_V1_STR}/books/bulk", content=body(), headers={**headers, "Content-Type": "text/csv"}
+        )
+        bulk_rate = args.rows / (time.perf_counter() - started)
+        response.raise_for_status()
+
+    print(f"POST /books/      {single_rate:10.0f} rows/s ({args.single_rows} rows)")
+    print(f"POST /books/bulk  {bulk_rate:10.0f} rows/s ({args.rows} rows, {response.json()['failed']} failed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Change-feed fan-out: many subscribers on one event loop read the feed while a
+writer commits outbox events from a worker thread, one per commit. Reports the
+latency from each commit starting to every subscriber holding its event, and
+events delivered per second across all subscribers. Only the broker's tailer
+queries the database, whatever the number of subscribers.
+
+    python -m benchmarks.bench_events --subscribers 1000 --events 200
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.api.v1.endpoints.events import broker_for
+from app.crud import crud_outbox
+from benchmarks.common import percentile
+
+
+async def run(engine, subscribers: int, events: int, interval: float):
+    broker = broker_for(engine)
+    latencies: List[float] = []
+    # Parsed once per event rather than by every subscriber.
+    committing: Dict[int, float] = {}
+    delivered = 0
+
+    async def subscriber(ready: asyncio.Event) -> None:
+        nonlocal delivered
+        async with broker.subscribe():
+            after = broker.last_sequence
+            ready.set()
+            received = 0
+            while received < events:
+                batch, after = await broker.read(after, 5, 1000)
+                now = time.perf_counter()
+                for event in batch:
+                    if event.sequence not in committing:
+                        committing[event.sequence] = json.loads(event.data)["data"]["committing"]
+                    latencies.append(now - committing[event.sequence])
+                received += len(batch)
+                delivered += len(batch)
+
+    def write() -> None:
+        with Session(engine) as db:
+            crud_outbox.add_event(db, "bench", {"committing": time.perf_counter()}, book_id=1)
+            db.commit()
+
+    ready = [asyncio.Event() for _ in range(subscribers)]
+    tasks = [asyncio.create_task(subscriber(event)) for event in ready]
+    for event in ready:
+        await event.wait()
+    started = time.perf_counter()
+    for _ in range(events):
+        await asyncio.to_thread(write)
+        await asyncio.sleep(interval)
+    await asyncio.gather(*tasks)
+    return latencies, delivered / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.005, help="seconds between commits")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'events.db'}", connect_args={"check_same_thread": False})
+        SQLModel.metadata.create_all(engine)
+        latencies, rate = asyncio.run(run(engine, args.subscribers, args.events, args.interval))
+        engine.dispose()
+    latencies_ms = [latency * 1000 for latency in latencies]
+    print(f"{args.subscribers} subscribers, {args.events} events")
+    print(f"commit to delivery  p50 {percentile(latencies_ms, 50):7.2f} ms  p99 {percentile(latencies_ms, 99):7.2f} ms")
+    print(f"delivered           {rate:9.0f} events/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Concurrent lends of one book from a thread pool against a file SQLite
+database, before and after the single-statement lend path: the old
+read-modify-write (get the book, check and adjust stock in Python, commit,
+then insert the transaction and commit again) against
+`crud_transaction.create_transaction`. Reports lends per second with enough
+stock for every attempt, and how many copies each path hands out when
+`--stock` is smaller than the number of attempts. The current path also
+writes the loan, the daily rollups and the outbox event in its one commit,
+which the old path did not.
+
+    python -m benchmarks.bench_lend --lends 400 --workers 16 --stock 25
+"""
+import argparse
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, SQLModel, create_engine, func, select
+
+from app.crud import crud_transaction
+from app.models import Book, Transaction, User
+from app.models.transaction import TransactionType
+
+
+def legacy_lend(engine: Engine, book_id: int, user: User) -> bool:
+    """The pre-change path: three commits and a Python-side stock check."""
+    with Session(engine) as db:
+        book = db.get(Book, book_id)
+        if book.available_quantity <= 0:
+            return False
+        db_book = db.get(Book, book_id)
+        db_book.available_quantity = db_book.available_quantity - 1
+        db.add(db_book)
+        db.commit()
+        db.refresh(db_book)
+        db.refresh(book)
+        db_transaction = Transaction(book_id=book_id, user_id=user.id, transaction_type=TransactionType.LEND)
+        db.add(db_transaction)
+        db.commit()
+        db.refresh(db_transaction)
+        return True
+
+
+def atomic_lend(engine: Engine, book_id: int, user: User) -> bool:
+    with Session(engine) as db:
+        try:
+            crud_transaction.create_transaction(db, book_id=book_id, user=user, transaction_type=TransactionType.LEND)
+            return True
+        except ValueError:
+            return False
+
+
+def run(lend, lends: int, workers: int, stock: int):
+    """Lends per second and the number of lends recorded for `stock` copies."""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{Path(tmp) / 'lend.db'}", connect_args={"check_same_thread": False, "timeout": 60}
+        )
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as db:
+            user = User(username="bench", email="bench@example.com", hashed_password="x")
+            book = Book(title="Popular", author="Author", isbn="1000000000001", total_quantity=stock, available_quantity=stock)
+            db.add_all([user, book])
+            db.commit()
+            db.refresh(user)
+            book_id = book.id
+            db.expunge(user)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda _: lend(engine, book_id, user), range(lends)))
+        elapsed = time.perf_counter() - started
+        with Session(engine) as db:
+            recorded = db.exec(select(func.count()).select_from(Transaction)).one()
+        engine.dispose()
+    return lends / elapsed, recorded
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lends", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--stock", type=int, default=25)
+    args = parser.parse_args()
+
+    for name, lend in (("read-modify-write", legacy_lend), ("conditional UPDATE", atomic_lend)):
+        rate, _ = run(lend, args.lends, args.workers, args.lends)
+        _, recorded = run(lend, args.lends, args.workers, args.stock)
+        print(f"{name:18} {rate:7.0f} lends/s   {recorded:4d} lends recorded for {args.stock} copies")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Fires a burst of concurrent logins while other clients read GET /books/{id},
+and reports login and read latency percentiles plus how many logins got 429.
+
+    python -m benchmarks.bench_login_storm --logins 200 --readers 20
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.core.config import settings
+from app.core.security import get_password_hash
+from app.db.session import get_db, sync_session_dependency
+from app.main import app
+from app.models import Book, User
+from benchmarks.common import percentile
+
+
+async def storm(logins: int, readers: int) -> None:
+    transport = httpx.ASGITransport(app=app)
+    login_ms, read_ms, rejected = [], [], 0
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def login():
+            nonlocal rejected
+            started = time.perf_counter()
+            response = await client.post(
+                f"{settings.API_V1_STR}/auth/login/token", data={"username": "bench", "password": "password"}
+            )
+            if response.status_code == 429:
+                rejected += 1
+            else:
+                login_ms.append((time.perf_counter() - started) * 1000)
+
+        async def reader():
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get(f"{settings.API_V1_STR}/books/1")
+                read_ms.append((time.perf_counter() - started) * 1000)
+
+        reader_tasks = [asyncio.create_task(reader()) for _ in range(readers)]
+        await asyncio.gather(*(login() for _ in range(logins)))
+        done.set()
+        await asyncio.gather(*reader_tasks)
+
+    print(f"logins: {len(login_ms)} ok, {rejected} rejected with 429")
+    print(f"login p50 {percentile(login_ms, 50):8.1f} ms  p99 {percentile(login_ms, 99):8.1f} ms")
+    print(f"read  p50 {percentile(read_ms, 50):8.1f} ms  p99 {percentile(read_ms, 99):8.1f} ms  ({len(read_ms)} reads)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--readers", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'bench.db'}", connect_args={"check_same_thread": False})
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add(User(username="bench", email="bench@example.com", hashed_password=get_password_hash("password")))
+            session.add(Book(id=1, title="Bench", author="Bench", isbn="0000000000", total_quantity=1, available_quantity=1))
+            session.commit()
+
+        app.dependency_overrides[get_db] = sync_session_dependency(engine)
+        asyncio.run(storm(args.logins, args.readers))
+        app.dependency_overrides.clear()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
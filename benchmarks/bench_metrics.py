@@ -0,0 +1,117 @@
+"""
+Measures the per-request cost of the metrics middleware and SQL timing hooks
+on a cached read (GET /books/{id}) and a query-bound read (GET /books/).
+The in-process HTTP client adds far more jitter than the instrumentation costs,
+so the budget is checked against the middleware timed alone around a no-op ASGI
+app plus the SQL hooks timed per statement.
+
+    python -m benchmarks.bench_metrics --requests 3000 --budget-us 100
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from sqlmodel import Session
+from starlette.middleware import Middleware
+
+from app.core import metrics
+from app.core.config import settings
+from app.main import app
+from app.models import Book
+from benchmarks.common import app_client, memory_engine
+
+
+def set_middleware(enabled: bool) -> None:
+    app.user_middleware = [m for m in app.user_middleware if m.cls is not metrics.MetricsMiddleware]
+    if enabled:
+        app.user_middleware.insert(0, Middleware(metrics.MetricsMiddleware))
+    app.middleware_stack = None
+
+
+def per_request_us(client, url: str, requests: int) -> float:
+    for _ in range(50):
+        client.get(url)
+    started = time.perf_counter()
+    for _ in range(requests):
+        client.get(url)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def bare_overhead_us(calls: int) -> float:
+    """Middleware cost around a no-op ASGI app, without the HTTP client noise."""
+    async def endpoint(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        pass
+
+    async def drive(handler) -> float:
+        scope = {"type": "http", "method": "GET", "path": "/"}
+        started = time.perf_counter()
+        for _ in range(calls):
+            await handler(scope, None, send)
+        return time.perf_counter() - started
+
+    registry = metrics.MetricsRegistry()
+    wrapped = metrics.MetricsMiddleware(endpoint, registry=registry)
+    bare = min(asyncio.run(drive(endpoint)) for _ in range(3))
+    timed = min(asyncio.run(drive(wrapped)) for _ in range(3))
+    return (timed - bare) / calls * 1e6
+
+
+def hook_overhead_us(engine, statements: int) -> float:
+    """Extra cost of the SQL timing hooks per statement executed inside a request."""
+    def run() -> float:
+        with engine.connect() as conn:
+            started = time.perf_counter()
+            for _ in range(statements):
+                conn.exec_driver_sql("SELECT 1")
+            return time.perf_counter() - started
+
+    bare = min(run() for _ in range(3))
+    token = metrics._current.set(metrics.RequestTimings())
+    try:
+        timed = min(run() for _ in range(3))
+    finally:
+        metrics._current.reset(token)
+    return (timed - bare) / statements * 1e6
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--budget-us", type=float, default=100.0)
+    args = parser.parse_args()
+
+    engine = memory_engine()
+    with Session(engine) as session:
+        session.add_all(
+            Book(title=f"Book {i}", author=f"Author {i}", isbn=f"{i:013d}", total_quantity=1, available_quantity=1)
+            for i in range(100)
+        )
+        session.commit()
+
+    middleware = bare_overhead_us(100_000)
+    per_statement = hook_overhead_us(engine, 20_000)
+    # The heaviest endpoints (batch lend/return) run about 10 statements.
+    budgeted = middleware + 10 * per_statement
+    print(f"middleware alone: {middleware:6.1f} us per request")
+    print(f"SQL hooks:        {per_statement:6.1f} us per statement")
+    with app_client(engine) as client:
+        for name, url in (("GET /books/{id}", f"{settings.API_V1_STR}/books/1"), ("GET /books/", f"{settings.API_V1_STR}/books/?limit=20&title=Book")):
+            timings = {False: float("inf"), True: float("inf")}
+            for _ in range(args.rounds):
+                for enabled in (False, True):
+                    set_middleware(enabled)
+                    timings[enabled] = min(timings[enabled], per_request_us(client, url, args.requests))
+            overhead = timings[True] - timings[False]
+            print(f"{name:16} off {timings[False]:8.1f} us  on {timings[True]:8.1f} us  overhead {overhead:6.1f} us")
+    print(f"10-statement request: {budgeted:.1f} us, budget {args.budget_us:.0f} us: {'ok' if budgeted <= args.budget_us else 'EXCEEDED'}")
+    return 0 if budgeted <= args.budget_us else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
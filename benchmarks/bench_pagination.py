@@ -0,0 +1,70 @@
+"""
+Compares offset and keyset pagination of transactions at increasing page depths.
+
+    python -m benchmarks.bench_pagination --rows 200000 --limit 20
+"""
+import argparse
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlmodel import Session, SQLModel, create_engine, insert
+
+from app.crud import crud_transaction
+from app.models import Book, Transaction, User
+from app.models.transaction import TransactionType
+
+
+def seed(engine, rows: int) -> None:
+    SQLModel.metadata.create_all(engine)
+    start = datetime(2020, 1, 1)
+    with Session(engine) as session:
+        session.add(User(id=1, username="bench", email="bench@example.com", hashed_password="x"))
+        session.add(Book(id=1, title="Bench", author="Bench", isbn="0000000000", total_quantity=1, available_quantity=1))
+        session.commit()
+        session.exec(
+            insert(Transaction),
+            params=[
+                {"book_id": 1, "user_id": 1, "transaction_type": TransactionType.LEND, "timestamp": start + timedelta(seconds=i)}
+                for i in range(rows)
+            ],
+        )
+        session.commit()
+
+
+def timed(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        seed(engine, args.rows)
+        max_page = args.rows // args.limit - 1
+        print(f"{'page':>6} {'offset ms':>10} {'keyset ms':>10}")
+        for page in (1, 10, 100, 1000, max_page):
+            if page > max_page:
+                continue
+            skip = page * args.limit
+            with Session(engine) as db:
+                last = crud_transaction.get_transactions(db, skip=skip - 1, limit=1)[0]
+                before = (last.timestamp, last.id)
+                offset_ms = timed(lambda: crud_transaction.get_transactions(db, skip=skip, limit=args.limit))
+                keyset_ms = timed(lambda: crud_transaction.get_transactions(db, limit=args.limit, before=before))
+            print(f"{page:>6} {offset_ms:>10.2f} {keyset_ms:>10.2f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Per-request cost of the rate-limit middleware around a no-op ASGI app, with
+the app's real routes: a route without a limit, a limited route keyed by
+client IP, and a limited route keyed by a bearer token's user (warm token
+cache). Limits are set high enough that no request is rejected.
+
+    python -m benchmarks.bench_ratelimit --calls 100000
+"""
+import argparse
+import asyncio
+import time
+
+from app.core.config import settings
+from app.core.ratelimit import RateLimiter, RateLimitMiddleware, TokenBucketStore
+from app.core.security import create_access_token
+from app.main import app
+
+
+async def endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def send(message):
+    pass
+
+
+def per_call_us(handler, scope: dict, calls: int) -> float:
+    async def drive() -> float:
+        started = time.perf_counter()
+        for _ in range(calls):
+            await handler(scope, None, send)
+        return time.perf_counter() - started
+
+    return min(asyncio.run(drive()) for _ in range(3)) / calls * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=100_000)
+    args = parser.parse_args()
+
+    limiter = RateLimiter(
+        TokenBucketStore(),
+        {
+            f"POST {settings.API_V1_STR}/auth/login/token": "10/minute",
+            f"GET {settings.API_V1_STR}/books/": "1000000000/second",
+        },
+    )
+    wrapped = RateLimitMiddleware(endpoint, limiter=limiter, routes=app.routes)
+    token = create_access_token(data={"sub": "bench"}).encode()
+    base = {"type": "http", "client": ("127.0.0.1", 50000), "headers": []}
+    cases = (
+        ("unlimited route", {**base, "method": "GET", "path": f"{settings.API_V1_STR}/books/1"}),
+        ("limited, by IP", {**base, "method": "GET", "path": f"{settings.API_V1_STR}/books/"}),
+        (
+            "limited, by user",
+            {**base, "method": "GET", "path": f"{settings.API_V1_STR}/books/", "headers": [(b"authorization", b"Bearer " + token)]},
+        ),
+    )
+    for name, scope in cases:
+        bare = per_call_us(endpoint, scope, args.calls)
+        limited = per_call_us(wrapped, scope, args.calls)
+        print(f"{name:17} {limited - bare:6.2f} us per request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Compares the ILIKE scan with the in-process n-gram index over a synthetic catalogue.
+
+    python -m benchmarks.bench_search --rows 1000000
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from sqlmodel import Session, SQLModel, create_engine, func, insert, select
+
+from app.crud.search import NgramSearchBackend
+from app.models import Book
+
+WORDS = (
+    "night river garden silent empire shadow winter glass kingdom storm letters "
+    "ocean ember iron hollow summer paper crown forest distant machine harbor "
+    "stone orchard quiet fire north city dream last house secret road"
+).split()
+NAMES = "ada ben clara dmitri elena farid grace hiro ines jonas kofi lena mateo nora omar priya".split()
+
+
+def seed(engine, rows: int) -> None:
+    SQLModel.metadata.create_all(engine)
+    rng = random.Random(42)
+    with Session(engine) as session:
+        for start in range(0, rows, 50_000):
+            session.exec(
+                insert(Book),
+                params=[
+                    {
+                        "title": " ".join(rng.choices(WORDS, k=rng.randint(2, 5))).title(),
+                        "author": f"{rng.choice(NAMES).title()} {rng.choice(NAMES).title()}son",
+                        "isbn": f"{i:013d}",
+                        "total_quantity": 1,
+                        "available_quantity": 1,
+                    }
+                    for i in range(start, min(start + 50_000, rows))
+                ],
+            )
+        session.commit()
+
+
+def ilike_search(db: Session, title: str, limit: int, ranked: bool = False):
+    statement = select(Book).where(Book.title.ilike(f"%{title}%"))
+    if ranked:
+        statement = statement.order_by(func.length(Book.title))
+    return db.exec(statement.order_by(Book.id).limit(limit)).all()
+
+
+def timed(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        seed(engine, args.rows)
+        backend = NgramSearchBackend()
+        with Session(engine) as db:
+            started = time.perf_counter()
+            backend.search(db, title="warmup")
+            print(f"index build: {time.perf_counter() - started:.1f}s for {args.rows} books")
+            print(f"{'query':>20} {'ilike ms':>10} {'ranked ms':>10} {'ngram ms':>10}")
+            for query in ("garden", "ember", "silent empire", "harbor stone orch", "zzz"):
+                ilike_ms = timed(lambda: ilike_search(db, query, args.limit))
+                ranked_ms = timed(lambda: ilike_search(db, query, args.limit, ranked=True))
+                ngram_ms = timed(lambda: backend.search(db, title=query, limit=args.limit))
+                print(f"{query:>20} {ilike_ms:>10.2f} {ranked_ms:>10.2f} {ngram_ms:>10.2f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
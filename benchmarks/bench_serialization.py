@@ -0,0 +1,82 @@
+"""
+Serialisation cost of a 100-row GET /transactions/ page (each row with its
+nested book and user): FastAPI's response_model path (validate, jsonable_encoder,
+json.dumps), the TypeAdapter path used before, and the FAST_JSON path.
+
+    python -m benchmarks.bench_serialization --rows 100 --repeat 2000
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlmodel import Session
+
+from app.core import serialization
+from app.core.config import settings
+from app.core.serialization import AppJSONResponse, dump_json
+from app.crud import crud_transaction
+from app.models import Book, Transaction, User
+from app.models.transaction import TransactionType
+from app.schemas.transaction import TransactionRead
+from benchmarks.common import memory_engine
+
+
+def per_page_us(fn, repeat: int) -> float:
+    for _ in range(20):
+        fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    engine = memory_engine()
+    with Session(engine) as db:
+        db.add_all(User(username=f"user{i}", email=f"user{i}@example.com", hashed_password="x") for i in range(10))
+        db.add_all(
+            Book(title=f"Book {i}", author="Author", isbn=f"{i:013d}", total_quantity=5, available_quantity=5)
+            for i in range(20)
+        )
+        db.add_all(
+            Transaction(transaction_type=TransactionType.LEND, book_id=1 + i % 20, user_id=1 + i % 10)
+            for i in range(args.rows)
+        )
+        db.commit()
+        rows = crud_transaction.get_transactions(db, limit=args.rows)
+
+    field = create_response_field(name="response", type_=List[TransactionRead])
+    loop = asyncio.new_event_loop()
+
+    def response_model():
+        content = loop.run_until_complete(serialize_response(field=field, response_content=rows, is_coroutine=True))
+        return AppJSONResponse(content).body
+
+    def type_adapter():
+        return dump_json(TransactionRead, rows, many=True)
+
+    results = {}
+    settings.FAST_JSON = False
+    results["response_model"] = per_page_us(response_model, args.repeat)
+    results["TypeAdapter"] = per_page_us(type_adapter, args.repeat)
+    settings.FAST_JSON = True
+    assert serialization.fast_json_enabled(), "FAST_JSON needs the orjson package"
+    fast_body = type_adapter()
+    results["FAST_JSON"] = per_page_us(type_adapter, args.repeat)
+    settings.FAST_JSON = False
+    assert fast_body == type_adapter()
+
+    for name, us in results.items():
+        print(f"{name:15} {us:8.1f} us per {args.rows}-row page  ({results['response_model'] / us:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Compares circulation queries answered from the daily rollups with the same
+ad-hoc GROUP BY over raw transactions, on synthetic history in a SQLite file.
+
+    python -m benchmarks.bench_stats --rows 10000000 --books 1000 --users 1000 --days 365
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import func, text
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.crud import crud_stats
+from app.models import Book, Transaction, User
+from app.models.transaction import TransactionType
+
+
+def seed(engine, rows: int, books: int, users: int, days: int, start: date) -> None:
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?) "
+            "INSERT INTO book (id, title, author, isbn, total_quantity, available_quantity, version, updated_at) "
+            "SELECT i, 'Book ' || i, 'Author', printf('%013d', i), 10, 10, 1, CURRENT_TIMESTAMP FROM n",
+            (books,),
+        )
+        conn.exec_driver_sql(
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?) "
+            "INSERT INTO user (id, username, email, hashed_password, is_active) "
+            "SELECT i, 'user' || i, 'user' || i || '@example.com', 'x', 1 FROM n",
+            (users,),
+        )
+        # Skewed popularity: low book ids are lent far more often.
+        conn.exec_driver_sql(
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?) "
+            "INSERT INTO \"transaction\" (transaction_type, timestamp, book_id, user_id) "
+            "SELECT CASE WHEN i % 3 = 0 THEN 'RETURN' ELSE 'LEND' END, "
+            "datetime(?, '+' || (i * ? / ?) || ' seconds'), "
+            "1 + ((i * 7919) % ?) * ((i * 104729) % ?) / ?, 1 + (i * 31) % ? FROM n",
+            (rows, start.isoformat(), days * 86400, rows, books, books, books, users),
+        )
+
+
+def timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def raw_top_books(db: Session, since: date, until: date):
+    lends = func.sum(func.iif(Transaction.transaction_type == TransactionType.LEND, 1, 0)).label("lends")
+    return db.exec(
+        select(Transaction.book_id, lends)
+        .where(Transaction.timestamp >= since, Transaction.timestamp < until)
+        .group_by(Transaction.book_id)
+        .order_by(lends.desc())
+        .limit(10)
+    ).all()
+
+
+def raw_daily(db: Session, since: date, until: date):
+    day = func.date(Transaction.timestamp)
+    return db.exec(
+        select(day, func.count())
+        .where(Transaction.timestamp >= since, Transaction.timestamp < until)
+        .group_by(day)
+    ).all()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--books", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    start = date(2025, 1, 1)
+    end = start + timedelta(days=args.days)
+    month = end - timedelta(days=30)
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'stats.db')}")
+        SQLModel.metadata.create_all(engine)
+        started = time.perf_counter()
+        seed(engine, args.rows, args.books, args.users, args.days, start)
+        print(f"seeded {args.rows} transactions in {time.perf_counter() - started:.1f}s")
+
+        with Session(engine) as db:
+            started = time.perf_counter()
+            crud_stats.rebuild_rollups(db)
+            rollup_rows = db.exec(text("SELECT COUNT(*) FROM book_daily_stats")).scalar()
+            print(f"built rollups ({rollup_rows} book-day rows) in {time.perf_counter() - started:.1f}s")
+
+            cases = [
+                ("top 10 books, last 30 days", lambda: raw_top_books(db, month, end),
+                 lambda: crud_stats.get_top_books(db, since=month, until=end)),
+                ("top 10 books, whole range", lambda: raw_top_books(db, start, end),
+                 lambda: crud_stats.get_top_books(db, since=start, until=end)),
+                ("daily counts, whole range", lambda: raw_daily(db, start, end),
+                 lambda: crud_stats.get_daily_counts(db, since=start, until=end)),
+            ]
+            for name, raw, rollup in cases:
+                print(f"{name:28} raw {timed(raw):9.1f} ms   rollup {timed(rollup):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Measures authenticated requests/sec on GET /auth/users/me with and without the user cache.
+
+    python -m benchmarks.bench_user_cache --requests 2000
+"""
+import argparse
+import time
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.crud import crud_user
+from app.models import User
+from benchmarks.common import app_client, memory_engine
+
+
+def run(client, headers: dict, requests: int) -> float:
+    started = time.perf_counter()
+    for _ in range(requests):
+        client.get(f"{settings.API_V1_STR}/auth/users/me", headers=headers)
+    return requests / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    engine = memory_engine()
+    with Session(engine) as session:
+        session.add(User(username="bench", email="bench@example.com", hashed_password="x"))
+        session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': 'bench'})}"}
+
+    with app_client(engine) as client:
+        maxsize = crud_user.user_cache.maxsize
+        crud_user.user_cache.maxsize = 0
+        uncached = run(client, headers, args.requests)
+        crud_user.user_cache.maxsize = maxsize
+        crud_user.user_cache.clear()
+        cached = run(client, headers, args.requests)
+
+    print(f"without cache: {uncached:8.0f} req/s")
+    print(f"with cache:    {cached:8.0f} req/s  {crud_user.user_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
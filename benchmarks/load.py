@@ -0,0 +1,253 @@
+"""
+Load test of the main API paths. Seeds a database (benchmarks.seed), drives
+the real app with concurrent clients in-process (httpx ASGITransport) and/or
+over HTTP against uvicorn (benchmarks.serve in a subprocess), and writes
+p50/p95/p99 latency and req/s per endpoint scenario to a JSON file.
+
+    python -m benchmarks.load --target both --output results.json --baseline benchmarks/baseline.json
+
+With --baseline, exits 1 if any scenario's req/s dropped or p95 rose by more
+than --tolerance against the stored results. Compare runs from the same
+machine and the same dataset sizes only.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from sqlmodel import create_engine
+
+# Every simulated client shares one address; measure the app, not the limiter.
+# The uvicorn subprocess inherits this.
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.db.session import get_db, sync_session_dependency
+from app.main import app
+from benchmarks.common import percentile
+from benchmarks.seed import PASSWORD, _WORDS, seed_database
+
+API = settings.API_V1_STR
+
+
+class Client:
+    """One simulated API client, logged in as its own user."""
+
+    def __init__(self, index: int, users: int, books: int, seed: int):
+        self.rng = random.Random(seed * 1000 + index)
+        self.user_id = 1 + index % users
+        self.books = books
+        self.headers = {"Authorization": f"Bearer {create_access_token(data={'sub': f'user{self.user_id}'})}"}
+        self.held: Optional[int] = None
+
+
+async def login(http: httpx.AsyncClient, client: Client) -> httpx.Response:
+    return await http.post(f"{API}/auth/login/token", data={"username": f"user{client.user_id}", "password": PASSWORD})
+
+
+async def list_books(http: httpx.AsyncClient, client: Client) -> httpx.Response:
+    return await http.get(f"{API}/books/", params={"skip": client.rng.randrange(0, client.books, 50), "limit": 50})
+
+
+async def search_books(http: httpx.AsyncClient, client: Client) -> httpx.Response:
+    return await http.get(f"{API}/books/", params={"title": client.rng.choice(_WORDS), "limit": 20})
+
+
+async def give_take(http: httpx.AsyncClient, client: Client) -> httpx.Response:
+    """Alternates lending a random book and returning it."""
+    if client.held is None:
+        book_id = client.rng.randint(1, client.books)
+        response = await http.post(f"{API}/transactions/give", json={"book_id": book_id}, headers=client.headers)
+        if response.status_code == 201:
+            client.held = book_id
+        return response
+    response = await http.post(f"{API}/transactions/take", json={"book_id": client.held}, headers=client.headers)
+    client.held = None
+    return response
+
+
+async def list_transactions(http: httpx.AsyncClient, client: Client) -> httpx.Response:
+    return await http.get(f"{API}/transactions/", params={"user_id": client.user_id, "limit": 50})
+
+
+SCENARIOS: Dict[str, Callable[[httpx.AsyncClient, Client], Awaitable[httpx.Response]]] = {
+    "login": login,
+    "list_books": list_books,
+    "search_books": search_books,
+    "give_take": give_take,
+    "list_transactions": list_transactions,
+}
+
+
+async def run_scenario(http: httpx.AsyncClient, scenario, clients: List[Client], requests: int, warmup: int) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    remaining = warmup
+
+    async def drive(client: Client, record: bool) -> None:
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            response = await scenario(http, client)
+            if record:
+                latencies.append((time.perf_counter() - started) * 1000)
+                if response.status_code >= 400:
+                    errors += 1
+
+    await asyncio.gather(*(drive(client, False) for client in clients))
+    remaining = requests
+    started = time.perf_counter()
+    await asyncio.gather(*(drive(client, True) for client in clients))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+
+async def run_all(http: httpx.AsyncClient, args, scenarios: List[str]) -> Dict[str, dict]:
+    clients = [Client(i, args.users, args.books, args.seed) for i in range(args.concurrency)]
+    results = {}
+    for name in scenarios:
+        results[name] = await run_scenario(http, SCENARIOS[name], clients, args.requests, warmup=args.concurrency * 2)
+        print(f"  {name:18} {results[name]['rps']:8.1f} req/s  p50 {results[name]['p50_ms']:7.2f}  "
+              f"p95 {results[name]['p95_ms']:7.2f}  p99 {results[name]['p99_ms']:7.2f} ms  errors {results[name]['errors']}")
+    return results
+
+
+def in_process(url: str, args, scenarios: List[str]) -> Dict[str, dict]:
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    app.dependency_overrides[get_db] = sync_session_dependency(engine)
+    try:
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+                return await run_all(http, args, scenarios)
+
+        return asyncio.run(run())
+    finally:
+        app.dependency_overrides.clear()
+        engine.dispose()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def over_uvicorn(url: str, args, scenarios: List[str]) -> Dict[str, dict]:
+    port = _free_port()
+    # The server must verify the tokens minted here.
+    env = {**os.environ, "SECRET_KEY": settings.SECRET_KEY}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.serve", "--url", url, "--port", str(port)], env=env
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        for _ in range(100):
+            try:
+                httpx.get(base_url + "/")
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError("uvicorn did not start")
+
+        async def run():
+            limits = httpx.Limits(max_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=base_url, limits=limits) as http:
+                return await run_all(http, args, scenarios)
+
+        return asyncio.run(run())
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    regressions = []
+    for target, scenarios in baseline["results"].items():
+        for name, base in scenarios.items():
+            current = results["results"].get(target, {}).get(name)
+            if current is None:
+                continue
+            if current["rps"] < base["rps"] * (1 - tolerance):
+                regressions.append(f"{target}/{name}: {current['rps']} req/s vs baseline {base['rps']}")
+            if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{target}/{name}: p95 {current['p95_ms']} ms vs baseline {base['p95_ms']}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target", choices=["inprocess", "uvicorn", "both"], default="both")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Repeatable; default: all")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--books", type=int, default=10_000)
+    parser.add_argument("--transactions", type=int, default=200_000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=500, help="Timed requests per scenario")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", help="Results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+    scenarios = args.scenario or list(SCENARIOS)
+    targets = ["inprocess", "uvicorn"] if args.target == "both" else [args.target]
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "users": args.users,
+            "books": args.books,
+            "transactions": args.transactions,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+        },
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for target in targets:
+            # A fresh database per target, so one run's writes do not skew the next.
+            url = f"sqlite:///{Path(tmp) / f'{target}.db'}"
+            seeding = seed_database(
+                create_engine(url), users=args.users, books=args.books, transactions=args.transactions, seed=args.seed
+            )
+            print(f"{target} (seeded in {sum(seeding.values()):.1f} s)")
+            runner = in_process if target == "inprocess" else over_uvicorn
+            results["results"][target] = runner(url, args, scenarios)
+
+    Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+    print(f"wrote {args.output}")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if baseline["meta"] != results["meta"]:
+            print(f"warning: baseline was recorded with different settings: {baseline['meta']}")
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
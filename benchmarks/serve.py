@@ -0,0 +1,30 @@
+"""
+Serves the real app with uvicorn against a seeded database file, for load
+runs over HTTP. Without --url the app's own DATABASE_URL settings are used.
+
+    python -m benchmarks.serve --url sqlite:///bench.db --port 8765
+"""
+import argparse
+
+import uvicorn
+from sqlmodel import create_engine
+
+from app.db.session import get_db, sync_session_dependency
+from app.main import app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="SQLAlchemy URL overriding the app's database")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.url:
+        engine = create_engine(args.url, connect_args={"check_same_thread": False} if args.url.startswith("sqlite") else {})
+        app.dependency_overrides[get_db] = sync_session_dependency(engine)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
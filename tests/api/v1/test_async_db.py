@@ -0,0 +1,47 @@
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.db.session import get_db
+from app.main import app
+
+
+def test_endpoints_on_async_session(tmp_path, test_user_data: dict):
+    db_path = tmp_path / "async.db"
+    sync_engine = create_engine(f"sqlite:///{db_path}")
+    SQLModel.metadata.create_all(sync_engine)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    session_factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        with TestClient(app) as client:
+            response = client.post(f"{settings.API_V1_STR}/auth/users/", json=test_user_data)
+            assert response.status_code == 201, response.text
+            token = client.post(
+                f"{settings.API_V1_STR}/auth/login/token",
+                data={"username": test_user_data["username"], "password": test_user_data["password"]},
+            ).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+
+            book_data = {"title": "Async Book", "author": "Async Author", "isbn": "4444444444444", "total_quantity": 1}
+            book_id = client.post(f"{settings.API_V1_STR}/books/", json=book_data, headers=headers).json()["id"]
+
+            response = client.post(f"{settings.API_V1_STR}/transactions/give", json={"book_id": book_id}, headers=headers)
+            assert response.status_code == 201, response.text
+            assert response.json()["book"]["available_quantity"] == 0
+            response = client.post(f"{settings.API_V1_STR}/transactions/give", json={"book_id": book_id}, headers=headers)
+            assert response.status_code == 400
+
+            response = client.get(f"{settings.API_V1_STR}/transactions/?book_id={book_id}")
+            assert [t["transaction_type"] for t in response.json()] == ["lend"]
+            assert client.get(f"{settings.API_V1_STR}/books/?title=async").json()[0]["id"] == book_id
+    finally:
+        app.dependency_overrides.clear()
+        sync_engine.dispose()
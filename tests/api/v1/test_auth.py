@@ -1,7 +1,11 @@
 from fastapi.testclient import TestClient
+from passlib.context import CryptContext
 from sqlmodel import Session
+from app.core import security
 from app.core.config import settings
 from app.models.user import User
+from app.crud import crud_user
+from app.schemas.user import UserUpdate
 
 def test_create_user(client: TestClient, db: Session):
     user_data = {"username": "newuser", "email": "newuser@example.com", "password": "newpassword123"}
@@ -39,4 +43,66 @@ def test_read_current_user(client: TestClient, auth_token_headers: dict, test_us
     user = response.json()
     assert user["username"] == test_user_data["username"]
     assert user["email"] == test_user_data["email"]
-    assert "hashed_password" not in user
\ No newline at end of file
+    assert "hashed_password" not in user
+
+def test_current_user_is_cached_and_invalidated(client: TestClient, db: Session, auth_token_headers: dict, test_user: User):
+    crud_user.user_cache.clear()
+    for _ in range(3):
+        response = client.get(f"{settings.API_V1_STR}/auth/users/me", headers=auth_token_headers)
+        assert response.status_code == 200
+    assert crud_user.user_cache.stats()["misses"] == 1
+    assert crud_user.user_cache.stats()["hits"] == 2
+
+    crud_user.update_user(db, db_user=test_user, user_in=UserUpdate(is_active=False))
+    response = client.get(f"{settings.API_V1_STR}/auth/users/me", headers=auth_token_headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Inactive user"
+
+
+def test_verified_tokens_are_cached_until_revoked(client: TestClient, auth_token_headers: dict, test_user: User, monkeypatch):
+    url = f"{settings.API_V1_STR}/auth/users/me"
+    assert client.get(url, headers={"Authorization": "Bearer not-a-token"}).status_code == 401
+    assert client.get(url, headers=auth_token_headers).status_code == 200
+
+    def fail(*args, **kwargs):
+        raise AssertionError("token decoded again")
+
+    monkeypatch.setattr(security.jwt, "decode", fail)
+    assert client.get(url, headers=auth_token_headers).status_code == 200
+    assert security.token_cache.stats()["hits"] == 1
+
+    assert client.post(f"{settings.API_V1_STR}/auth/logout", headers=auth_token_headers).status_code == 200
+    assert client.get(url, headers=auth_token_headers).status_code == 401
+
+
+def test_expired_cached_token_is_rejected(test_user: User, monkeypatch):
+    token = security.create_access_token(data={"sub": test_user.username})
+    assert security.verify_access_token(token) == test_user.username
+    digest = security.token_digest(token)
+    subject, expires_at = security.token_cache.get(digest)
+    monkeypatch.setattr(security.time, "time", lambda: expires_at + 1)
+    assert security.verify_access_token(token) is None
+
+
+def test_login_rehashes_stale_password_hash(client: TestClient, db: Session, test_user_data: dict, test_user: User):
+    stale_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5).hash(test_user_data["password"])
+    crud_user.update_password_hash(db, db_user=test_user, hashed_password=stale_hash)
+
+    login_data = {"username": test_user_data["username"], "password": test_user_data["password"]}
+    response = client.post(f"{settings.API_V1_STR}/auth/login/token", data=login_data)
+    assert response.status_code == 200
+
+    db.refresh(test_user)
+    assert test_user.hashed_password != stale_hash
+    assert not security.pwd_context.needs_update(test_user.hashed_password)
+
+
+def test_login_returns_429_when_hashing_pool_is_full(client: TestClient, test_user_data: dict, test_user: User, monkeypatch):
+    busy_pool = security.PasswordHasherPool(workers=1, queue_size=0)
+    monkeypatch.setattr(security, "password_hasher", busy_pool)
+    busy_pool._slots.acquire()
+
+    login_data = {"username": test_user_data["username"], "password": test_user_data["password"]}
+    response = client.post(f"{settings.API_V1_STR}/auth/login/token", data=login_data)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
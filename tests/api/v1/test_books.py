@@ -1,6 +1,15 @@
+import asyncio
+import time
+
+import httpx
+import pytest
 from fastapi.testclient import TestClient
-from sqlmodel import Session
+from sqlalchemy import event
+from sqlmodel import Session, select
+from app.api.v1.endpoints import books as books_endpoints
 from app.core.config import settings
+from app.crud import crud_book, search
+from app.main import app
 from app.models.book import Book as ModelBook
 
 def test_create_book(client: TestClient, db: Session, auth_token_headers: dict):
@@ -69,4 +78,233 @@ def test_delete_book(client: TestClient, db: Session, auth_token_headers: dict):
     create_response_again = client.post(f"{settings.API_V1_STR}/books/", json=book_data, headers=auth_token_headers)
     book_id_again = create_response_again.json()["id"]
     delete_no_auth = client.delete(f"{settings.API_V1_STR}/books/{book_id_again}")
-    assert delete_no_auth.status_code == 401
\ No newline at end of file
+    assert delete_no_auth.status_code == 401
+
+def test_list_books_cursor_pagination(client: TestClient, db: Session, auth_token_headers: dict):
+    for i in range(5):
+        book_data = {"title": f"Paged Book {i}", "author": "Page Author", "isbn": f"900000000000{i}", "total_quantity": 1}
+        client.post(f"{settings.API_V1_STR}/books/", json=book_data, headers=auth_token_headers)
+
+    seen = []
+    response = client.get(f"{settings.API_V1_STR}/books/?limit=2")
+    while True:
+        assert response.status_code == 200
+        seen.extend(b["title"] for b in response.json())
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            break
+        response = client.get(f"{settings.API_V1_STR}/books/?limit=2&cursor={next_cursor}")
+    assert seen == [f"Paged Book {i}" for i in range(5)]
+
+    response_bad_cursor = client.get(f"{settings.API_V1_STR}/books/?cursor=not-a-cursor")
+    assert response_bad_cursor.status_code == 400
+
+
+def test_search_books_ranked(client: TestClient, db: Session, auth_token_headers: dict):
+    books = [
+        ("A History of Dune Fandom", "Critic", "3000000000001"),
+        ("Dune", "Frank Herbert", "3000000000002"),
+        ("Dune Messiah", "Frank Herbert", "3000000000003"),
+        ("Foundation", "Isaac Asimov", "3000000000004"),
+    ]
+    ids = {}
+    for title, author, isbn in books:
+        response = client.post(
+            f"{settings.API_V1_STR}/books/",
+            json={"title": title, "author": author, "isbn": isbn, "total_quantity": 1},
+            headers=auth_token_headers,
+        )
+        ids[title] = response.json()["id"]
+
+    response = client.get(f"{settings.API_V1_STR}/books/?title=dune")
+    assert response.status_code == 200
+    assert [b["title"] for b in response.json()] == ["Dune", "Dune Messiah", "A History of Dune Fandom"]
+    assert "X-Next-Cursor" not in response.headers
+
+    response = client.get(f"{settings.API_V1_STR}/books/?title=dune&author=herbert")
+    assert [b["title"] for b in response.json()] == ["Dune", "Dune Messiah"]
+
+    client.put(f"{settings.API_V1_STR}/books/{ids['Foundation']}", json={"title": "Dune Foundation"}, headers=auth_token_headers)
+    client.delete(f"{settings.API_V1_STR}/books/{ids['Dune Messiah']}", headers=auth_token_headers)
+    response = client.get(f"{settings.API_V1_STR}/books/?title=dune")
+    assert [b["title"] for b in response.json()] == ["Dune", "Dune Foundation", "A History of Dune Fandom"]
+
+    response = client.get(f"{settings.API_V1_STR}/books/?title=du")
+    assert len(response.json()) == 3
+
+
+def test_bulk_import_books(client: TestClient, db: Session, auth_token_headers: dict):
+    existing = {"title": "Old Title", "author": "Old Author", "isbn": "2000000000001", "total_quantity": 2}
+    client.post(f"{settings.API_V1_STR}/books/", json=existing, headers=auth_token_headers)
+    assert len(client.get(f"{settings.API_V1_STR}/books/?title=old title").json()) == 1
+    docs = search.ngram_backend._docs
+
+    csv_body = (
+        "title,author,isbn,total_quantity\n"
+        "New Title,Bulk Author,2000000000001,4\n"
+        '"Comma, Quoted",Bulk Author,2000000000002,1\n'
+        "Bad Quantity,Bulk Author,2000000000003,0\n"
+        "Short Row,Bulk Author\n"
+        "Bulk Book,Bulk Author,2000000000004,3\n"
+    )
+    response = client.post(
+        f"{settings.API_V1_STR}/books/bulk",
+        content=csv_body,
+        headers={**auth_token_headers, "Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert (result["processed"], result["imported"], result["failed"]) == (5, 3, 2)
+    assert [e["line"] for e in result["errors"]] == [4, 5]
+    assert "total_quantity" in result["errors"][0]["error"]
+
+    updated = db.exec(select(ModelBook).where(ModelBook.isbn == "2000000000001")).one()
+    assert (updated.title, updated.total_quantity, updated.available_quantity) == ("New Title", 4, 4)
+    # The search index built above is updated in place, not rebuilt.
+    assert search.ngram_backend._docs is docs
+    assert client.get(f"{settings.API_V1_STR}/books/?title=comma").json()[0]["title"] == "Comma, Quoted"
+    assert client.get(f"{settings.API_V1_STR}/books/?title=old title").json() == []
+
+    ndjson_body = '{"title": "Json Book", "author": "Bulk Author", "isbn": "2000000000005", "total_quantity": 2}\nnot json\n'
+    response = client.post(
+        f"{settings.API_V1_STR}/books/bulk",
+        content=ndjson_body,
+        headers={**auth_token_headers, "Content-Type": "application/x-ndjson"},
+    )
+    assert (response.json()["imported"], response.json()["failed"]) == (1, 1)
+
+    response = client.post(f"{settings.API_V1_STR}/books/bulk", content="x", headers={**auth_token_headers, "Content-Type": "text/plain"})
+    assert response.status_code == 415
+    response = client.post(f"{settings.API_V1_STR}/books/bulk", content=csv_body, headers={"Content-Type": "text/csv"})
+    assert response.status_code == 401
+
+
+
+# The first authenticated request also loads the user.
+@pytest.mark.query_budget({f"POST {settings.API_V1_STR}/books/bulk": 4})
+def test_bulk_import_skips_over_long_lines(client: TestClient, auth_token_headers: dict, monkeypatch):
+    monkeypatch.setattr(settings, "BOOK_IMPORT_MAX_LINE_BYTES", 200)
+    good = b'{"title": "Kept", "author": "Bulk Author", "isbn": "2000000000006", "total_quantity": 1}\n'
+
+    def body():
+        # The over-long line arrives across many chunks, none holding a newline.
+        yield good
+        for _ in range(50):
+            yield b"x" * 100
+        yield b"\n" + good.replace(b"Kept", b"Also kept").replace(b"06", b"07")
+
+    response = client.post(
+        f"{settings.API_V1_STR}/books/bulk",
+        content=body(),
+        headers={**auth_token_headers, "Content-Type": "application/x-ndjson"},
+    )
+    result = response.json()
+    assert (result["processed"], result["imported"], result["failed"]) == (3, 2, 1)
+    assert result["errors"][0]["line"] == 2
+
+def test_book_reads_are_cached_and_invalidated_by_writes(client: TestClient, auth_token_headers: dict, query_counter: list):
+    book_data = {"title": "Cached Book", "author": "Cache Author", "isbn": "4242424242424", "total_quantity": 3}
+    book_id = client.post(f"{settings.API_V1_STR}/books/", json=book_data, headers=auth_token_headers).json()["id"]
+
+    client.get(f"{settings.API_V1_STR}/books/{book_id}")
+    client.get(f"{settings.API_V1_STR}/books/")
+    query_counter.clear()
+    assert client.get(f"{settings.API_V1_STR}/books/{book_id}").json()["available_quantity"] == 3
+    assert [b["id"] for b in client.get(f"{settings.API_V1_STR}/books/").json()] == [book_id]
+    assert query_counter == []
+
+    client.post(f"{settings.API_V1_STR}/transactions/give", json={"book_id": book_id}, headers=auth_token_headers)
+    assert client.get(f"{settings.API_V1_STR}/books/{book_id}").json()["available_quantity"] == 2
+    assert client.get(f"{settings.API_V1_STR}/books/").json()[0]["available_quantity"] == 2
+
+    client.put(f"{settings.API_V1_STR}/books/{book_id}", json={"title": "Renamed Book"}, headers=auth_token_headers)
+    assert client.get(f"{settings.API_V1_STR}/books/?title=renamed").json()[0]["title"] == "Renamed Book"
+
+    other = {"title": "Second Book", "author": "Cache Author", "isbn": "4343434343434", "total_quantity": 1}
+    other_id = client.post(f"{settings.API_V1_STR}/books/", json=other, headers=auth_token_headers).json()["id"]
+    assert client.get(f"{settings.API_V1_STR}/books/{other_id}").status_code == 200
+    assert len(client.get(f"{settings.API_V1_STR}/books/").json()) == 2
+
+    client.delete(f"{settings.API_V1_STR}/books/{other_id}", headers=auth_token_headers)
+    assert client.get(f"{settings.API_V1_STR}/books/{other_id}").status_code == 404
+    assert len(client.get(f"{settings.API_V1_STR}/books/").json()) == 1
+
+    stats = client.get("/health/cache").json()["books"]
+    assert stats["hits"] > 0 and 0 < stats["hit_ratio"] < 1
+
+
+def test_conditional_book_reads_save_bytes(client: TestClient, auth_token_headers: dict):
+    for i in range(20):
+        book_data = {"title": f"Kiosk Book {i}", "author": "Kiosk Author", "isbn": f"81{i:011d}", "total_quantity": 2}
+        client.post(f"{settings.API_V1_STR}/books/", json=book_data, headers=auth_token_headers)
+    url = f"{settings.API_V1_STR}/books/?limit=20"
+
+    first = client.get(url)
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"].startswith("public")
+    polls = [client.get(url, headers={"If-None-Match": etag}) for _ in range(10)]
+    assert all(r.status_code == 304 and r.content == b"" for r in polls)
+    assert all(r.headers["ETag"] == etag for r in polls)
+    bytes_saved = len(first.content) * len(polls) - sum(len(r.content) for r in polls)
+    assert bytes_saved == 10 * len(first.content) > 10_000
+
+    book_id = first.json()[0]["id"]
+    client.post(f"{settings.API_V1_STR}/transactions/give", json={"book_id": book_id}, headers=auth_token_headers)
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+    book = client.get(f"{settings.API_V1_STR}/books/{book_id}")
+    assert client.get(
+        f"{settings.API_V1_STR}/books/{book_id}", headers={"If-None-Match": book.headers["ETag"]}
+    ).status_code == 304
+    assert client.get(
+        f"{settings.API_V1_STR}/books/{book_id}", headers={"If-Modified-Since": book.headers["Last-Modified"]}
+    ).status_code == 304
+    client.put(f"{settings.API_V1_STR}/books/{book_id}", json={"author": "New Author"}, headers=auth_token_headers)
+    assert client.get(
+        f"{settings.API_V1_STR}/books/{book_id}", headers={"If-None-Match": book.headers["ETag"]}
+    ).status_code == 200
+
+
+def test_read_racing_a_write_does_not_recache_the_old_row(client: TestClient, db: Session, auth_token_headers: dict):
+    book_data = {"title": "Racy", "author": "Author", "isbn": "5252525252525", "total_quantity": 3}
+    book_id = client.post(f"{settings.API_V1_STR}/books/", json=book_data, headers=auth_token_headers).json()["id"]
+    # A reader selects the row, then a write commits before the reader fills the cache.
+    stale = db.get(ModelBook, book_id)
+    db.expunge(stale)
+    client.put(f"{settings.API_V1_STR}/books/{book_id}", json={"title": "Racy, Revised"}, headers=auth_token_headers)
+    crud_book._cache_books(db, [stale])
+
+    response = client.get(f"{settings.API_V1_STR}/books/{book_id}")
+    assert response.json()["title"] == "Racy, Revised"
+    assert crud_book._cached_book(book_id).etag == response.headers["ETag"]
+
+
+def test_concurrent_identical_reads_share_one_query(client: TestClient, db: Session, auth_token_headers: dict, query_counter: list):
+    book_data = {"title": "Launch Day", "author": "Popular Author", "isbn": "5151515151515", "total_quantity": 9}
+    book_id = client.post(f"{settings.API_V1_STR}/books/", json=book_data, headers=auth_token_headers).json()["id"]
+    crud_book.book_cache.clear()
+    books_endpoints.read_book_flight.reset()
+
+    # A slow query keeps the first read in flight while the rest of the burst arrives.
+    def slow(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(0.2)
+
+    async def burst():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            return await asyncio.gather(*(ac.get(f"{settings.API_V1_STR}/books/{book_id}") for _ in range(20)))
+
+    query_counter.clear()
+    event.listen(db.get_bind(), "before_cursor_execute", slow)
+    try:
+        responses = asyncio.run(burst())
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", slow)
+
+    assert {response.status_code for response in responses} == {200}
+    assert {response.json()["title"] for response in responses} == {"Launch Day"}
+    assert len(query_counter) == 1
+    assert books_endpoints.read_book_flight.stats() == {"enabled": True, "executions": 1, "shared": 19}
+    assert 'singleflight_shared_total{method="GET",route="/api/v1/books/{book_id}"} 19' in client.get("/metrics").text
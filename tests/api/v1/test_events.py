@@ -0,0 +1,110 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import SQLModel, create_engine
+
+from app.api.v1.endpoints import events
+from app.core.config import settings
+from app.db.session import get_db, sync_session_dependency
+from app.main import app
+
+STREAM = f"{settings.API_V1_STR}/events/stream"
+
+
+@pytest.fixture
+def feed_client(tmp_path, test_user_data: dict):
+    # A file database: the feed's tailer must not share the in-memory test connection.
+    engine = create_engine(f"sqlite:///{tmp_path / 'feed.db'}", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+
+    async def get_test_broker():
+        return events.broker_for(engine)
+
+    app.dependency_overrides[get_db] = sync_session_dependency(engine)
+    app.dependency_overrides[events.get_broker] = get_test_broker
+    try:
+        with TestClient(app) as client:
+            client.post(f"{settings.API_V1_STR}/auth/users/", json=test_user_data)
+            token = client.post(
+                f"{settings.API_V1_STR}/auth/login/token",
+                data={"username": test_user_data["username"], "password": test_user_data["password"]},
+            ).json()["access_token"]
+            client.headers["Authorization"] = f"Bearer {token}"
+            yield client
+    finally:
+        app.dependency_overrides.clear()
+        engine.dispose()
+
+
+def test_writes_are_published_in_commit_order(feed_client: TestClient):
+    book = {"title": "Feed Book", "author": "Author", "isbn": "7070707070707", "total_quantity": 1}
+    book_id = feed_client.post(f"{settings.API_V1_STR}/books/", json=book).json()["id"]
+    feed_client.post(f"{settings.API_V1_STR}/transactions/give", json={"book_id": book_id})
+    # Out of stock: rolled back, so nothing is published.
+    assert feed_client.post(f"{settings.API_V1_STR}/transactions/give", json={"book_id": book_id}).status_code == 400
+
+    page = feed_client.get(STREAM, params={"after": 0, "wait": 0}).json()
+    assert [event["type"] for event in page["events"]] == ["book.created", "book.stock", "transaction.created"]
+    assert [event["book_id"] for event in page["events"]] == [book_id] * 3
+    assert page["events"][1]["data"]["available_quantity"] == 0
+    assert page["events"][2]["data"]["transaction_type"] == "lend"
+    assert page["next"] == page["events"][-1]["sequence"]
+
+    first = page["events"][0]["sequence"]
+    resumed = feed_client.get(STREAM, params={"after": first, "wait": 0}).json()
+    assert [event["sequence"] for event in resumed["events"]] == [event["sequence"] for event in page["events"][1:]]
+
+    # A waiting long-poll returns as soon as the next write commits.
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        started = time.perf_counter()
+        waiting = pool.submit(feed_client.get, STREAM, params={"after": page["next"], "wait": 10})
+        time.sleep(0.2)
+        feed_client.put(f"{settings.API_V1_STR}/books/{book_id}", json={"title": "Renamed"})
+        update = waiting.result().json()
+    assert time.perf_counter() - started < 5
+    assert [(event["type"], event["data"]["title"]) for event in update["events"]] == [("book.updated", "Renamed")]
+
+
+def test_event_stream_resumes_from_last_event_id(feed_client: TestClient):
+    book = {"title": "Streamed", "author": "Author", "isbn": "8080808080808", "total_quantity": 2}
+    book_id = feed_client.post(f"{settings.API_V1_STR}/books/", json=book).json()["id"]
+    feed_client.post(f"{settings.API_V1_STR}/transactions/give", json={"book_id": book_id})
+    first = feed_client.get(STREAM, params={"after": 0, "wait": 0}).json()["events"][0]["sequence"]
+
+    async def read_stream(frames: int) -> bytes:
+        received = asyncio.Queue()
+        received.put_nowait({"type": "http.request", "body": b"", "more_body": False})
+        body = bytearray()
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                assert message["status"] == 200
+            elif message["type"] == "http.response.body":
+                body.extend(message.get("body", b""))
+                if body.count(b"\nid: ") + body.startswith(b"id: ") >= frames:
+                    received.put_nowait({"type": "http.disconnect"})
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": STREAM, "raw_path": STREAM.encode(), "query_string": b"",
+            "root_path": "", "client": ("testclient", 50000), "server": ("testserver", 80),
+            "headers": [(b"accept", b"text/event-stream"), (b"last-event-id", str(first).encode())],
+        }
+        stream = asyncio.ensure_future(app(scope, received.get, send))
+        # Two backlog events, then one live event.
+        while body.count(b"\nid: ") < 2:
+            await asyncio.sleep(0.01)
+        await asyncio.to_thread(feed_client.put, f"{settings.API_V1_STR}/books/{book_id}", json={"title": "Live"})
+        await asyncio.wait_for(stream, 10)
+        return bytes(body)
+
+    body = asyncio.run(read_stream(3))
+    frames = [frame for frame in body.decode().split("\n\n") if frame.startswith("id: ")]
+    parsed = [dict(line.split(": ", 1) for line in frame.split("\n")) for frame in frames]
+    assert [frame["event"] for frame in parsed] == ["book.stock", "transaction.created", "book.updated"]
+    assert [int(frame["id"]) for frame in parsed] == [json.loads(frame["data"])["sequence"] for frame in parsed]
+    assert int(parsed[0]["id"]) > first
@@ -0,0 +1,73 @@
+import shutil
+
+from fastapi.testclient import TestClient
+from sqlmodel import SQLModel, create_engine
+
+from app.core.config import settings
+from app.crud import crud_book
+from app.db import session as db_session
+from app.db.session import get_db, get_replica_db, sync_session_dependency
+from app.main import app
+
+
+def test_public_reads_use_replica_except_right_after_a_write(tmp_path, monkeypatch, test_user_data: dict):
+    primary_path, replica_path = tmp_path / "primary.db", tmp_path / "replica.db"
+    primary = create_engine(f"sqlite:///{primary_path}", connect_args={"check_same_thread": False})
+    replica = create_engine(f"sqlite:///{replica_path}", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(primary)
+    monkeypatch.setattr(settings, "READ_DATABASE_URL", f"sqlite:///{replica_path}")
+
+    def replicate():
+        replica.dispose()
+        shutil.copyfile(primary_path, replica_path)
+
+    def let_window_pass():
+        db_session.recent_writers.clear()
+        crud_book.recently_written.clear()
+
+    primary_db = sync_session_dependency(primary)
+    primary_sessions = []
+
+    async def get_primary_db():
+        primary_sessions.append(1)
+        async for session in primary_db():
+            yield session
+
+    app.dependency_overrides[get_db] = get_primary_db
+    app.dependency_overrides[get_replica_db] = sync_session_dependency(replica, replica=True)
+    try:
+        with TestClient(app) as client:
+            client.post(f"{settings.API_V1_STR}/auth/users/", json=test_user_data)
+            token = client.post(
+                f"{settings.API_V1_STR}/auth/login/token",
+                data={"username": test_user_data["username"], "password": test_user_data["password"]},
+            ).json()["access_token"]
+            writer = {"Authorization": f"Bearer {token}"}
+            book = {"title": "Original", "author": "Author", "isbn": "6060606060606", "total_quantity": 2}
+            book_id = client.post(f"{settings.API_V1_STR}/books/", json=book, headers=writer).json()["id"]
+            replicate()
+            let_window_pass()
+            crud_book.book_cache.clear()
+
+            # The replica lags behind this write: others still see the old row, the writer sees theirs.
+            client.put(f"{settings.API_V1_STR}/books/{book_id}", json={"title": "Revised"}, headers=writer)
+            primary_sessions.clear()
+            assert client.get(f"{settings.API_V1_STR}/books/{book_id}").json()["title"] == "Original"
+            # Replica reads open no primary session (and take no primary pool slot).
+            assert primary_sessions == []
+            assert client.get(f"{settings.API_V1_STR}/books/{book_id}", headers=writer).json()["title"] == "Revised"
+            # The stale replica read was not cached; the writer's primary read was.
+            assert client.get(f"{settings.API_V1_STR}/books/{book_id}").json()["title"] == "Revised"
+
+            client.post(f"{settings.API_V1_STR}/transactions/give", json={"book_id": book_id}, headers=writer)
+            assert len(client.get(f"{settings.API_V1_STR}/transactions/", headers=writer).json()) == 1
+            assert client.get(f"{settings.API_V1_STR}/transactions/").json() == []
+
+            let_window_pass()
+            assert client.get(f"{settings.API_V1_STR}/transactions/", headers=writer).json() == []
+            replicate()
+            assert len(client.get(f"{settings.API_V1_STR}/transactions/").json()) == 1
+    finally:
+        app.dependency_overrides.clear()
+        primary.dispose()
+        replica.dispose()
@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+from app.core.config import settings
+from app.models.user import User
+
+
+def _create_book(client: TestClient, headers: dict, isbn: str, title: str) -> int:
+    book_data = {"title": title, "author": "Stats Author", "isbn": isbn, "total_quantity": 5}
+    return client.post(f"{settings.API_V1_STR}/books/", json=book_data, headers=headers).json()["id"]
+
+
+def test_circulation_stats(client: TestClient, db: Session, auth_token_headers: dict, test_user: User, query_counter: list):
+    popular = _create_book(client, auth_token_headers, "9090909090901", "Popular")
+    quiet = _create_book(client, auth_token_headers, "9090909090902", "Quiet")
+    items = [{"book_id": popular, "type": "lend"}] * 3 + [{"book_id": quiet, "type": "lend"}]
+    client.post(f"{settings.API_V1_STR}/transactions/batch", json={"items": items}, headers=auth_token_headers)
+    client.post(f"{settings.API_V1_STR}/transactions/take", json={"book_id": popular}, headers=auth_token_headers)
+
+    query_counter.clear()
+    top = client.get(f"{settings.API_V1_STR}/stats/books/top?limit=1").json()
+    assert top == [{"book_id": popular, "title": "Popular", "author": "Stats Author", "lends": 3, "returns": 1}]
+    assert len(query_counter) == 1
+    assert not any('"transaction"' in statement for statement in query_counter)
+
+    today = datetime.utcnow().date()
+    assert client.get(f"{settings.API_V1_STR}/stats/daily").json() == [{"day": today.isoformat(), "lends": 4, "returns": 1}]
+    by_user = client.get(f"{settings.API_V1_STR}/stats/daily?user_id={test_user.id}").json()
+    assert by_user == [{"day": today.isoformat(), "lends": 4, "returns": 1}]
+    by_book = client.get(f"{settings.API_V1_STR}/stats/daily?book_id={quiet}").json()
+    assert by_book == [{"day": today.isoformat(), "lends": 1, "returns": 0}]
+    tomorrow = (today + timedelta(days=1)).isoformat()
+    assert client.get(f"{settings.API_V1_STR}/stats/daily?since={tomorrow}").json() == []
+
+    response = client.get(f"{settings.API_V1_STR}/stats/daily?book_id={quiet}&user_id={test_user.id}")
+    assert response.status_code == 400
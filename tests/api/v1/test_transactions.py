@@ -1,9 +1,13 @@
+import json
+from datetime import date, datetime
 from fastapi.testclient import TestClient
 from sqlmodel import Session
 from app.core.config import settings
 from app.models.book import Book as ModelBook
 from app.crud import crud_book
 from app.models.user import User
+from app.models.transaction import Transaction, TransactionType
+from app.commands import archive_transactions
 
 def create_test_book_for_transaction(db: Session, client: TestClient, headers: dict) -> ModelBook:
     book_data = {"title": "Transaction Test Book", "author": "Trans Author", "isbn": "5555555555555", "total_quantity": 2}
@@ -71,7 +75,8 @@ def test_return_book(client: TestClient, db: Session, auth_token_headers: dict,
 
     return_fresh_data = {"book_id": fresh_book.id}
     response_return_fresh = client.post(f"{settings.API_V1_STR}/transactions/take", json=return_fresh_data, headers=auth_token_headers)
-    assert response_return_fresh.status_code == 201
+    assert response_return_fresh.status_code == 400
+    assert response_return_fresh.json()["detail"] == "Book is not on loan to this user"
     db.refresh(fresh_book)
     assert fresh_book.available_quantity == fresh_book.total_quantity
 
@@ -93,4 +98,190 @@ def test_list_transactions(client: TestClient, db: Session, auth_token_headers:
 
     response_book_filter = client.get(f"{settings.API_V1_STR}/transactions/?book_id={book.id}")
     assert response_book_filter.status_code == 200
-    assert all(t['book_id'] == book.id for t in response_book_filter.json())
\ No newline at end of file
+    assert all(t['book_id'] == book.id for t in response_book_filter.json())
+
+
+def test_list_transactions_query_count_is_constant(client: TestClient, db: Session, test_user: User, query_counter: list):
+    book = ModelBook(title="Busy Book", author="Busy Author", isbn="7777777777777", total_quantity=1, available_quantity=1)
+    db.add(book)
+    db.commit()
+    db.refresh(book)
+    book_id, user_id = book.id, test_user.id
+    db.add_all(
+        Transaction(book_id=book_id, user_id=user_id, transaction_type=TransactionType.LEND)
+        for _ in range(100)
+    )
+    db.commit()
+
+    query_counter.clear()
+    response = client.get(f"{settings.API_V1_STR}/transactions/?limit=10")
+    assert response.status_code == 200
+    small_page_queries = len(query_counter)
+
+    query_counter.clear()
+    response = client.get(f"{settings.API_V1_STR}/transactions/?limit=100")
+    assert response.status_code == 200
+    assert len(response.json()) == 100
+    assert all(t["book"]["id"] == book_id and t["user"]["id"] == user_id for t in response.json())
+    assert len(query_counter) == small_page_queries == 1
+
+
+def test_list_transactions_cursor_pagination(client: TestClient, db: Session, auth_token_headers: dict, test_user: User):
+    book = create_test_book_for_transaction(db, client, auth_token_headers)
+    for _ in range(3):
+        client.post(f"{settings.API_V1_STR}/transactions/give", json={"book_id": book.id}, headers=auth_token_headers)
+        client.post(f"{settings.API_V1_STR}/transactions/take", json={"book_id": book.id}, headers=auth_token_headers)
+
+    all_ids = [t["id"] for t in client.get(f"{settings.API_V1_STR}/transactions/?limit=100").json()]
+    assert len(all_ids) == 6
+
+    paged_ids = []
+    response = client.get(f"{settings.API_V1_STR}/transactions/?limit=4")
+    paged_ids.extend(t["id"] for t in response.json())
+    next_cursor = response.headers["X-Next-Cursor"]
+    response = client.get(f"{settings.API_V1_STR}/transactions/?limit=4&cursor={next_cursor}")
+    paged_ids.extend(t["id"] for t in response.json())
+    assert "X-Next-Cursor" not in response.headers
+    assert paged_ids == all_ids
+
+
+def test_export_transactions_streams_ndjson_and_csv(client: TestClient, db: Session, auth_token_headers: dict, test_user: User):
+    book = create_test_book_for_transaction(db, client, auth_token_headers)
+    client.post(f"{settings.API_V1_STR}/transactions/give", json={"book_id": book.id}, headers=auth_token_headers)
+    client.post(f"{settings.API_V1_STR}/transactions/take", json={"book_id": book.id}, headers=auth_token_headers)
+
+    assert client.get(f"{settings.API_V1_STR}/transactions/export").status_code == 401
+
+    response = client.get(f"{settings.API_V1_STR}/transactions/export?book_id={book.id}", headers=auth_token_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["transaction_type"] for row in rows] == ["lend", "return"]
+    assert all(row["book_id"] == book.id and row["user_id"] == test_user.id for row in rows)
+
+    response = client.get(f"{settings.API_V1_STR}/transactions/export?format=csv", headers=auth_token_headers)
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0] == "id,transaction_type,timestamp,book_id,user_id"
+    assert [line.split(",")[1] for line in lines[1:]] == ["lend", "return"]
+
+    until = datetime.fromisoformat(rows[0]["timestamp"]).isoformat()
+    response = client.get(f"{settings.API_V1_STR}/transactions/export", params={"until": until}, headers=auth_token_headers)
+    assert response.text == ""
+
+
+def test_export_includes_archived_months(
+    client: TestClient, db: Session, auth_token_headers: dict, test_user: User, tmp_path, monkeypatch
+):
+    book = create_test_book_for_transaction(db, client, auth_token_headers)
+    db.add_all([
+        Transaction(book_id=book.id, user_id=test_user.id, transaction_type=TransactionType.LEND, timestamp=datetime(2023, 1, 5)),
+        Transaction(book_id=book.id, user_id=test_user.id, transaction_type=TransactionType.RETURN, timestamp=datetime(2023, 2, 7)),
+    ])
+    db.commit()
+    client.post(f"{settings.API_V1_STR}/transactions/give", json={"book_id": book.id}, headers=auth_token_headers)
+
+    archived = archive_transactions.archive_before(db.get_bind(), date(2023, 3, 1), str(tmp_path))
+    assert archived == [(date(2023, 1, 1), 1), (date(2023, 2, 1), 1)]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["transactions-2023-01.ndjson.gz", "transactions-2023-02.ndjson.gz"]
+    assert len(client.get(f"{settings.API_V1_STR}/transactions/").json()) == 1
+
+    monkeypatch.setattr(settings, "TRANSACTION_ARCHIVE_DIR", str(tmp_path))
+    response = client.get(f"{settings.API_V1_STR}/transactions/export", headers=auth_token_headers)
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["transaction_type"] for row in rows] == ["lend", "return", "lend"]
+    assert rows[0]["timestamp"] == "2023-01-05T00:00:00"
+
+    response = client.get(
+        f"{settings.API_V1_STR}/transactions/export",
+        params={"since": "2023-02-01T00:00:00", "until": "2023-03-01T00:00:00"},
+        headers=auth_token_headers,
+    )
+    assert [json.loads(line)["transaction_type"] for line in response.text.splitlines()] == ["return"]
+
+    # Timezone-aware bounds mean the same instant for archived and live rows.
+    db.add_all(
+        Transaction(book_id=book.id, user_id=test_user.id, transaction_type=TransactionType.RETURN, timestamp=datetime(2023, 3, 10, hour))
+        for hour in (1, 2)
+    )
+    db.commit()
+    response = client.get(
+        f"{settings.API_V1_STR}/transactions/export",
+        params={"since": "2023-02-07T02:00:00+02:00", "until": "2023-03-10T03:30:00+02:00"},
+        headers=auth_token_headers,
+    )
+    assert [json.loads(line)["timestamp"] for line in response.text.splitlines()] == ["2023-02-07T00:00:00", "2023-03-10T01:00:00"]
+
+
+def test_list_transactions_etag(client: TestClient, db: Session, auth_token_headers: dict):
+    book = create_test_book_for_transaction(db, client, auth_token_headers)
+    client.post(f"{settings.API_V1_STR}/transactions/give", json={"book_id": book.id}, headers=auth_token_headers)
+
+    response = client.get(f"{settings.API_V1_STR}/transactions/")
+    etag = response.headers["ETag"]
+    assert client.get(f"{settings.API_V1_STR}/transactions/", headers={"If-None-Match": etag}).status_code == 304
+
+    client.post(f"{settings.API_V1_STR}/transactions/take", json={"book_id": book.id}, headers=auth_token_headers)
+    response = client.get(f"{settings.API_V1_STR}/transactions/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+
+
+def test_batch_lend_and_return(client: TestClient, db: Session, auth_token_headers: dict, test_user: User):
+    book = create_test_book_for_transaction(db, client, auth_token_headers)
+    other = client.post(
+        f"{settings.API_V1_STR}/books/",
+        json={"title": "Batch Book", "author": "Batch Author", "isbn": "5656565656565", "total_quantity": 1},
+        headers=auth_token_headers,
+    ).json()
+    url = f"{settings.API_V1_STR}/transactions/batch"
+
+    items = [
+        {"book_id": book.id, "type": "lend"},
+        {"book_id": other["id"], "type": "lend"},
+        {"book_id": other["id"], "type": "lend"},
+    ]
+    response = client.post(url, json={"items": items}, headers=auth_token_headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == [{"index": 2, "book_id": other["id"], "error": "Book is not available for lending"}]
+    db.refresh(book)
+    assert book.available_quantity == 2
+    assert client.get(f"{settings.API_V1_STR}/transactions/").json() == []
+
+    response = client.post(url, json={"items": items, "atomic": False}, headers=auth_token_headers)
+    assert response.status_code == 201
+    results = response.json()
+    assert [r["error"] for r in results] == [None, None, "Book is not available for lending"]
+    assert results[0]["transaction"]["book"]["available_quantity"] == 1
+    assert results[1]["transaction"]["user_id"] == test_user.id
+
+    items = [{"book_id": other["id"], "type": "return"}, {"book_id": other["id"], "type": "lend"}, {"book_id": 999999, "type": "return"}]
+    response = client.post(url, json={"items": items[:2]}, headers=auth_token_headers)
+    assert response.status_code == 201
+    assert [r["transaction"]["transaction_type"] for r in response.json()] == ["return", "lend"]
+    response = client.post(url, json={"items": items}, headers=auth_token_headers)
+    assert response.json()["detail"] == [{"index": 2, "book_id": 999999, "error": "Book not found"}]
+    assert client.get(f"{settings.API_V1_STR}/books/{other['id']}").json()["available_quantity"] == 0
+
+
+def test_active_loans_follow_lends_and_returns(client: TestClient, db: Session, auth_token_headers: dict, query_counter: list):
+    book = create_test_book_for_transaction(db, client, auth_token_headers)
+    loans_url = f"{settings.API_V1_STR}/auth/users/me/loans"
+    assert client.get(loans_url, headers=auth_token_headers).json() == []
+
+    client.post(f"{settings.API_V1_STR}/transactions/give", json={"book_id": book.id}, headers=auth_token_headers)
+    client.post(f"{settings.API_V1_STR}/transactions/give", json={"book_id": book.id}, headers=auth_token_headers)
+    query_counter.clear()
+    loans = client.get(loans_url, headers=auth_token_headers).json()
+    assert [(loan["book_id"], loan["quantity"]) for loan in loans] == [(book.id, 2)]
+    assert loans[0]["book"]["available_quantity"] == 0
+    assert len(query_counter) == 1
+
+    items = [{"book_id": book.id, "type": "return"}] * 3
+    response = client.post(f"{settings.API_V1_STR}/transactions/batch", json={"items": items}, headers=auth_token_headers)
+    assert response.json()["detail"] == [{"index": 2, "book_id": book.id, "error": "Book is not on loan to this user"}]
+    client.post(f"{settings.API_V1_STR}/transactions/take", json={"book_id": book.id}, headers=auth_token_headers)
+    assert client.get(loans_url, headers=auth_token_headers).json()[0]["quantity"] == 1
+    response = client.post(f"{settings.API_V1_STR}/transactions/batch", json={"items": items[:1]}, headers=auth_token_headers)
+    assert response.status_code == 201
+    assert client.get(loans_url, headers=auth_token_headers).json() == []
@@ -1,15 +1,24 @@
+import os
+
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("DB_PROFILE", "true")
+
 import pytest
 from typing import Generator, Any
 from fastapi.testclient import TestClient
 from fastapi import Depends
+from sqlalchemy import event
 from sqlmodel import Session, SQLModel, create_engine, select
 from sqlalchemy.pool import StaticPool
-from app.main import app
+from app.main import app, rate_limiter
 from app.api.deps import get_current_active_user, get_current_user
+from app.db import session as db_session
 from app.db.session import get_db
 from app.core.config import settings
 from app.models.user import User
+from app.core import security
 from app.core.security import create_access_token
+from app.crud import crud_book, crud_user, search
 from app.schemas.user import UserCreate
 from app.crud.crud_user import create_user as crud_create_user 
 
@@ -21,6 +30,68 @@ engine = create_engine(
     poolclass=StaticPool,
 )
 
+db_session.profiler.attach(engine)
+
+# SQL statements allowed per request, by "METHOD route"; writes include their
+# outbox INSERT. A test can override entries with
+# @pytest.mark.query_budget({"GET /api/v1/books/": 3}).
+QUERY_BUDGETS = {
+    f"GET {settings.API_V1_STR}/books/": 2,
+    f"GET {settings.API_V1_STR}/books/{{book_id}}": 1,
+    f"POST {settings.API_V1_STR}/books/": 4,
+    f"PUT {settings.API_V1_STR}/books/{{book_id}}": 4,
+    f"DELETE {settings.API_V1_STR}/books/{{book_id}}": 4,
+    f"POST {settings.API_V1_STR}/books/bulk": 3,
+    f"GET {settings.API_V1_STR}/transactions/": 1,
+    f"GET {settings.API_V1_STR}/transactions/export": 1,
+    f"POST {settings.API_V1_STR}/transactions/give": 8,
+    f"POST {settings.API_V1_STR}/transactions/take": 9,
+    f"POST {settings.API_V1_STR}/transactions/batch": 9,
+    f"POST {settings.API_V1_STR}/auth/login/token": 3,
+    f"POST {settings.API_V1_STR}/auth/users/": 4,
+    f"GET {settings.API_V1_STR}/auth/users/me": 1,
+    f"GET {settings.API_V1_STR}/auth/users/me/loans": 1,
+    f"POST {settings.API_V1_STR}/auth/logout": 0,
+    f"GET {settings.API_V1_STR}/stats/books/top": 1,
+    f"GET {settings.API_V1_STR}/stats/daily": 1,
+}
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "query_budget(budgets): per-endpoint statement budgets for this test")
+
+
+@pytest.fixture(autouse=True)
+def query_budget(request) -> Generator[list, None, None]:
+    """
+    Fails the test if any request ran more statements than its endpoint's
+    budget, or repeated one statement shape often enough to look like N+1.
+    """
+    budgets = dict(QUERY_BUDGETS)
+    marker = request.node.get_closest_marker("query_budget")
+    if marker is not None:
+        budgets.update(marker.args[0])
+    profiles: list = []
+
+    def collect(profile):
+        profiles.append(profile)
+
+    db_session.profiler.listeners.append(collect)
+    yield profiles
+    db_session.profiler.listeners.remove(collect)
+
+    problems = []
+    for profile in profiles:
+        budget = budgets.get(profile.label)
+        if budget is not None and len(profile.statements) > budget:
+            statements = "\n    ".join(statement for statement, _ in profile.statements)
+            problems.append(f"{profile.label} ran {len(profile.statements)} statements (budget {budget}):\n    {statements}")
+        for statement, count in profile.repeated(db_session.profiler.repeat_threshold):
+            problems.append(f"{profile.label} ran the same statement {count} times (N+1?):\n    {statement}")
+    if problems:
+        pytest.fail("\n".join(problems), pytrace=False)
+
+
 def override_get_db() -> Generator[Session, None, None]:
     with Session(engine) as session:
         yield session
@@ -28,6 +99,14 @@ def override_get_db() -> Generator[Session, None, None]:
 @pytest.fixture(scope="function", autouse=True)
 def db_setup_session():
     SQLModel.metadata.create_all(engine)
+    search.ngram_backend.reset()
+    crud_user.user_cache.clear()
+    crud_book.book_cache.clear()
+    crud_book.written_versions.clear()
+    security.token_cache.clear()
+    security.token_deny_list.clear()
+    if rate_limiter is not None:
+        rate_limiter.store.clear()
     yield
     SQLModel.metadata.drop_all(engine)
 
@@ -46,6 +125,18 @@ def client(db_setup_session) -> Generator[TestClient, None, None]:
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(scope="function")
+def query_counter(db_setup_session) -> Generator[list[str], None, None]:
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
 @pytest.fixture(scope="function")
 def test_user_data() -> dict:
     return {"username": "testuser", "email": "test@example.com", "password": "testpassword"}
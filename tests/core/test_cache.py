@@ -0,0 +1,53 @@
+import fnmatch
+import time
+
+from app.core.cache import SharedCache, TTLCache
+
+
+class LocalRedis:
+    """Stand-in for the subset of the Redis client that SharedCache uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, name):
+        entry = self.data.get(name)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, name, value, ex):
+        self.data[name] = (time.monotonic() + ex, value.encode())
+
+    def delete(self, name):
+        self.data.pop(name, None)
+
+    def scan_iter(self, match):
+        return [name for name in list(self.data) if fnmatch.fnmatch(name, match)]
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_ratio": 0.5, "size": 2}
+
+
+def test_shared_cache_round_trips_json_between_instances():
+    client = LocalRedis()
+    writer = SharedCache(client, ttl=60, prefix="book:")
+    reader = SharedCache(client, ttl=60, prefix="book:")
+    writer.set(("page", "g1", 0, 10, None), [1, 2, 3])
+    assert reader.get(("page", "g1", 0, 10, None)) == [1, 2, 3]
+
+    writer.delete(("page", "g1", 0, 10, None))
+    assert reader.get(("page", "g1", 0, 10, None)) is None
+    assert reader.stats() == {"hits": 1, "misses": 1, "hit_ratio": 0.5}
+
+    client.set("other:key", "1", ex=60)
+    writer.set("a", 1)
+    writer.clear()
+    assert list(client.data) == ["other:key"]
@@ -0,0 +1,31 @@
+from fastapi.testclient import TestClient
+
+from app.core import metrics
+from app.core.config import settings
+
+
+def test_requests_are_timed_per_route(client: TestClient, auth_token_headers: dict):
+    metrics.registry.reset()
+    book = client.post(
+        f"{settings.API_V1_STR}/books/",
+        json={"title": "Metered", "author": "Author", "isbn": "7777777777777", "total_quantity": 1},
+        headers=auth_token_headers,
+    ).json()
+
+    response = client.get(f"{settings.API_V1_STR}/books/{book['id']}")
+    timing = dict(part.strip().split(";", 1) for part in response.headers["Server-Timing"].split(","))
+    assert set(timing) == {"app", "db", "serialize"}
+    assert 'desc="statements: 1"' in timing["db"]
+    client.get(f"{settings.API_V1_STR}/books/{book['id']}")
+    client.get("/no/such/path")
+
+    stats = metrics.registry._routes
+    route = stats[("GET", f"{settings.API_V1_STR}/books/{{book_id}}")]
+    assert route.count == 2 and route.statements == 1
+    created = stats[("POST", f"{settings.API_V1_STR}/books/")]
+    assert created.statements > 0 and created.serialize_seconds > 0
+    assert stats[("GET", metrics.UNMATCHED_ROUTE)].statuses == {404: 1}
+
+    body = client.get("/metrics").text
+    assert f'http_request_duration_seconds_count{{method="GET",route="{settings.API_V1_STR}/books/{{book_id}}"}} 2' in body
+    assert f'http_requests_total{{method="POST",route="{settings.API_V1_STR}/books/",status="201"}} 1' in body
@@ -0,0 +1,41 @@
+import asyncio
+from datetime import datetime
+
+from app.core.events import OutboxBroker, render_event
+
+
+def test_tailer_waits_for_a_gap_to_fill_before_skipping_it():
+    table = {}
+
+    def commit(sequence: int) -> None:
+        table[sequence] = render_event(sequence, "book.updated", 1, datetime(2024, 1, 1), "{}")
+
+    def fetch(after, limit, until):
+        found = sorted(s for s in table if s > after and (until is None or s <= until))
+        return [table[s] for s in found[:limit]]
+
+    broker = OutboxBroker(lambda: 0, fetch, poll_interval=0.01, buffer_size=100, gap_seconds=0.3)
+
+    async def scenario():
+        async with broker.subscribe():
+            # 2 is still committing when 1 and 3 are visible: 3 waits for it.
+            commit(1)
+            commit(3)
+            first, cursor = await broker.read(0, 1, 10)
+            held, _ = await broker.read(cursor, 0.1, 10)
+            commit(2)
+            filled, cursor = await broker.read(cursor, 1, 10)
+            # 5 never commits (rolled back): 6 is published once the gap has been seen for gap_seconds.
+            commit(4)
+            commit(6)
+            before_skip, cursor = await broker.read(cursor, 1, 10)
+            after_skip, _ = await broker.read(cursor, 1, 10)
+            return first, held, filled, before_skip, after_skip
+
+    first, held, filled, before_skip, after_skip = asyncio.run(scenario())
+    sequences = lambda events: [event.sequence for event in events]
+    assert sequences(first) == [1]
+    assert held == []
+    assert sequences(filled) == [2, 3]
+    assert sequences(before_skip) == [4]
+    assert sequences(after_skip) == [6]
@@ -0,0 +1,56 @@
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.ratelimit import RateLimit, RateLimiter, RateLimitMiddleware, TokenBucketStore
+from app.main import app
+
+
+def test_token_bucket_allows_bursts_then_refills():
+    store = TokenBucketStore()
+    limit = RateLimit.parse("3/minute")
+    assert [store.take("k", limit, now=0.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert store.take("k", limit, now=0.0) == 20.0
+    assert store.take("k", limit, now=20.0) == 0.0
+    assert store.take("other", limit, now=20.0) == 0.0
+
+    # A bucket that has refilled completely is the first to go when the store is full.
+    store = TokenBucketStore(max_keys=2)
+    store.take("idle", limit, now=0.0)
+    store.take("busy", limit, now=50.0)
+    store.take("new", limit, now=60.0)
+    assert len(store) == 2 and store.take("busy", limit, now=60.0) == 0.0
+
+
+def test_over_limit_requests_get_429_per_client(client: TestClient, auth_token_headers: dict):
+    book = client.post(
+        f"{settings.API_V1_STR}/books/",
+        json={"title": "Limited", "author": "Author", "isbn": "4444444444444", "total_quantity": 1},
+        headers=auth_token_headers,
+    ).json()
+    limiter = RateLimiter(TokenBucketStore(), {f"GET {settings.API_V1_STR}/books/{{book_id}}": "2/minute"})
+    limited = TestClient(RateLimitMiddleware(app, limiter=limiter, routes=app.routes))
+    url = f"{settings.API_V1_STR}/books/{book['id']}"
+
+    assert [limited.get(url).status_code for _ in range(2)] == [200, 200]
+    rejected = limited.get(url)
+    assert rejected.status_code == 429
+    assert rejected.headers["Retry-After"] == "30"
+
+    # The authenticated user has their own bucket, and other routes are not limited.
+    assert limited.get(url, headers=auth_token_headers).status_code == 200
+    assert limited.get(f"{settings.API_V1_STR}/books/").status_code == 200
+
+
+def test_clients_behind_a_proxy_are_keyed_by_the_forwarded_address():
+    limiter = RateLimiter(TokenBucketStore(), {}, forwarded_header="X-Forwarded-For")
+    scope = {"client": ("10.0.0.1", 443), "headers": [(b"x-forwarded-for", b"203.0.113.9, 198.51.100.7")]}
+    assert limiter.client_key(scope) == "ip:198.51.100.7"
+    assert limiter.client_key({"client": ("10.0.0.1", 443), "headers": []}) == "ip:10.0.0.1"
+    # Untrusted unless configured.
+    assert RateLimiter(TokenBucketStore(), {}).client_key(scope) == "ip:10.0.0.1"
+
+
+def test_route_defaults_follow_the_api_prefix():
+    prefixed = type(settings)(API_V1_STR="/v2")
+    assert "GET /v2/books/" in prefixed.RATE_LIMITS
+    assert prefixed.SINGLE_FLIGHT_ROUTES == ["GET /v2/books/", "GET /v2/books/{book_id}"]
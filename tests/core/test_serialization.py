@@ -0,0 +1,37 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import serialization
+from app.core.config import settings
+
+
+def test_fast_json_matches_response_model_output(client: TestClient, auth_token_headers: dict, monkeypatch):
+    # FAST_JSON is opt-in and orjson is not in requirements.txt.
+    pytest.importorskip("orjson")
+    book = client.post(
+        f"{settings.API_V1_STR}/books/",
+        json={"title": "Fast Book", "author": "Author", "isbn": "8888888888888", "total_quantity": 2},
+        headers=auth_token_headers,
+    ).json()
+    client.post(f"{settings.API_V1_STR}/transactions/give", json={"book_id": book["id"]}, headers=auth_token_headers)
+    urls = [
+        f"{settings.API_V1_STR}/transactions/",
+        f"{settings.API_V1_STR}/auth/users/me",
+        f"{settings.API_V1_STR}/auth/users/me/loans",
+    ]
+
+    standard = [client.get(url, headers=auth_token_headers).content for url in urls]
+    monkeypatch.setattr(settings, "FAST_JSON", True)
+    assert serialization.fast_json_enabled()
+    assert [client.get(url, headers=auth_token_headers).content for url in urls] == standard
+
+    response = client.post(
+        f"{settings.API_V1_STR}/transactions/batch",
+        json={"items": [{"book_id": book["id"], "type": "lend"}, {"book_id": 999, "type": "lend"}], "atomic": False},
+        headers=auth_token_headers,
+    )
+    assert response.status_code == 201
+    first, missing = response.json()
+    assert first["transaction"]["book"]["id"] == book["id"]
+    assert first["transaction"]["user"]["username"] == "testuser"
+    assert missing == {"book_id": 999, "type": "lend", "transaction": None, "error": "Book not found"}
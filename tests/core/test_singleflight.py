@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+def test_waiters_survive_a_cancelled_first_call():
+    flight = SingleFlight("GET /test")
+    runs = []
+
+    async def read():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return len(runs)
+
+    async def scenario():
+        first = asyncio.ensure_future(flight.do("key", read))
+        await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(flight.do("key", read)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await asyncio.gather(*waiters)
+
+    # One waiter takes over the read and the other two share its result.
+    assert asyncio.run(scenario()) == [2, 2, 2]
+    assert flight.stats() == {"enabled": True, "executions": 2, "shared": 2}
+
+
+def test_errors_are_shared_and_not_cached():
+    flight = SingleFlight("GET /test")
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("database unavailable")
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("key", failing) for _ in range(3)), return_exceptions=True)
+
+    assert [str(result) for result in asyncio.run(scenario())] == ["database unavailable"] * 3
+    assert asyncio.run(flight.do("key", lambda: asyncio.sleep(0, result="ok"))) == "ok"
+    assert flight.stats() == {"enabled": True, "executions": 2, "shared": 2}
+
+
+def test_calls_do_not_join_a_flight_started_before_not_before():
+    flight = SingleFlight("GET /test")
+    reads = []
+
+    async def read():
+        reads.append(len(reads) + 1)
+        result = reads[-1]
+        await asyncio.sleep(0.05)
+        return result
+
+    async def scenario():
+        before_write = asyncio.ensure_future(flight.do("key", read))
+        await asyncio.sleep(0.01)
+        # A write commits while the first read is in flight.
+        written_at = time.monotonic()
+        after_write = asyncio.ensure_future(flight.do("key", read, not_before=written_at))
+        await asyncio.sleep(0)
+        later = asyncio.ensure_future(flight.do("key", read, not_before=written_at))
+        results = await asyncio.gather(before_write, after_write, later)
+        return results, flight._in_flight
+
+    results, in_flight = asyncio.run(scenario())
+    assert results == [1, 2, 2]
+    assert in_flight == {}
+    assert flight.stats() == {"enabled": True, "executions": 2, "shared": 1}
@@ -0,0 +1,56 @@
+from datetime import date, datetime, timedelta
+
+from sqlmodel import Session, delete, select
+
+from app.crud import crud_stats, crud_transaction
+from app.models.book import Book
+from app.models.stats import BookDailyStats
+from app.models.transaction import Transaction, TransactionType
+from app.models.user import User
+
+
+def test_consistency_checker_finds_and_repairs_drift(db: Session):
+    user = User(username="stats", email="stats@example.com", hashed_password="x")
+    book = Book(title="Rollup", author="Author", isbn="3131313131313", total_quantity=3, available_quantity=3)
+    db.add_all([user, book])
+    db.commit()
+    for transaction_type in (TransactionType.LEND, TransactionType.LEND, TransactionType.RETURN):
+        crud_transaction.create_transaction(db, book_id=book.id, user=user, transaction_type=transaction_type)
+    assert crud_stats.find_rollup_mismatches(db) == []
+
+    # History written behind the rollups' back, e.g. by an old deployment.
+    yesterday = datetime.utcnow() - timedelta(days=1)
+    db.add(Transaction(book_id=book.id, user_id=user.id, transaction_type=TransactionType.LEND, timestamp=yesterday))
+    rollup = db.exec(select(BookDailyStats)).one()
+    rollup.lends = 7
+    db.commit()
+
+    mismatches = crud_stats.find_rollup_mismatches(db)
+    assert {(m["table"], m["day"], m["expected"], m["actual"]) for m in mismatches} == {
+        ("book_daily_stats", yesterday.date(), (1, 0), (0, 0)),
+        ("user_daily_stats", yesterday.date(), (1, 0), (0, 0)),
+        ("book_daily_stats", rollup.day, (2, 1), (7, 1)),
+    }
+
+    crud_stats.rebuild_rollups(db)
+    assert crud_stats.find_rollup_mismatches(db) == []
+    assert crud_stats.get_top_books(db)[0]["lends"] == 3
+
+
+def test_repair_keeps_rollups_of_archived_days(db: Session):
+    user = User(username="archived", email="archived@example.com", hashed_password="x")
+    book = Book(title="Archived", author="Author", isbn="3232323232323", total_quantity=3, available_quantity=3)
+    db.add_all([user, book])
+    db.commit()
+    old, recent = datetime(2023, 1, 15), datetime(2023, 3, 15)
+    for timestamp in (old, recent):
+        db.add(Transaction(book_id=book.id, user_id=user.id, transaction_type=TransactionType.LEND, timestamp=timestamp))
+        crud_stats.record_transactions(db, [(book.id, user.id, TransactionType.LEND, timestamp)])
+    db.commit()
+    # January archived: its rows leave the database, its rollups stay.
+    db.exec(delete(Transaction).where(Transaction.timestamp < datetime(2023, 2, 1)))
+    db.commit()
+
+    assert crud_stats.find_rollup_mismatches(db, since=date(2023, 1, 1)) == []
+    crud_stats.rebuild_rollups(db, since=date(2023, 1, 1))
+    assert [(row["day"], row["lends"]) for row in crud_stats.get_daily_counts(db)] == [(old.date(), 1), (recent.date(), 1)]
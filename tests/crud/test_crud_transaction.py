@@ -0,0 +1,125 @@
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.core.export import iter_ndjson
+from app.crud import crud_transaction
+from app.models.book import Book
+from app.models.loan import ActiveLoan
+from app.models.transaction import Transaction, TransactionType
+from app.models.user import User
+
+
+def test_concurrent_lends_never_oversell(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'stress.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = User(username="stress", email="stress@example.com", hashed_password="x")
+        book = Book(title="Popular", author="Author", isbn="1000000000001", total_quantity=25, available_quantity=25)
+        session.add(user)
+        session.add(book)
+        session.commit()
+        session.refresh(user)
+        session.refresh(book)
+        book_id = book.id
+
+    attempts = 200
+
+    def lend(_: int) -> bool:
+        with Session(engine) as session:
+            try:
+                crud_transaction.create_transaction(
+                    db=session, book_id=book_id, user=user, transaction_type=TransactionType.LEND
+                )
+                return True
+            except ValueError:
+                return False
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(lend, range(attempts)))
+
+    with Session(engine) as session:
+        book = session.get(Book, book_id)
+        lends = session.exec(select(Transaction).where(Transaction.book_id == book_id)).all()
+    assert sum(results) == 25
+    assert len(lends) == 25
+    assert book.available_quantity == 0
+    engine.dispose()
+
+
+def test_concurrent_batch_and_single_lends_never_oversell(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'batch.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        users = [User(username=f"racer{i}", email=f"racer{i}@example.com", hashed_password="x") for i in range(32)]
+        book = Book(title="Scarce", author="Author", isbn="1000000000002", total_quantity=5, available_quantity=5)
+        session.add_all([*users, book])
+        session.commit()
+        user_ids = [user.id for user in users]
+        book_id = book.id
+
+    def lend(i: int) -> bool:
+        with Session(engine) as session:
+            user = session.get(User, user_ids[i])
+            if i % 2:
+                try:
+                    crud_transaction.create_transaction(
+                        db=session, book_id=book_id, user=user, transaction_type=TransactionType.LEND
+                    )
+                    return True
+                except ValueError:
+                    return False
+            (transaction, error), = crud_transaction.create_transactions_batch(
+                session, items=[(book_id, TransactionType.LEND)], user=user
+            )
+            return transaction is not None
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(lend, range(len(user_ids))))
+
+    with Session(engine) as session:
+        book = session.get(Book, book_id)
+        lends = session.exec(select(Transaction).where(Transaction.book_id == book_id)).all()
+        loans = session.exec(select(ActiveLoan).where(ActiveLoan.book_id == book_id)).all()
+    assert sum(results) == 5
+    assert len(lends) == 5
+    assert sum(loan.quantity for loan in loans) == 5
+    assert book.available_quantity == 0
+    engine.dispose()
+
+def test_export_memory_is_bounded(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'export.db'}")
+    SQLModel.metadata.create_all(engine)
+    rows = 1_000_000
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?) "
+            "INSERT INTO \"transaction\" (transaction_type, timestamp, book_id, user_id) "
+            "SELECT CASE i % 2 WHEN 1 THEN 'LEND' ELSE 'RETURN' END, "
+            "datetime('2024-01-01', '+' || i || ' seconds'), 1 + i % 100, 1 + i % 10 FROM n",
+            (rows,),
+        )
+
+    # Peak Python allocations during the export alone, unlike the process-wide ru_maxrss.
+    exported = 0
+    tracemalloc.start()
+    try:
+        with Session(engine) as session:
+            batches = crud_transaction.iter_transaction_batches(session, batch_size=1000)
+            for chunk in iter_ndjson(crud_transaction.EXPORT_COLUMNS, batches):
+                exported += chunk.count("\n")
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    engine.dispose()
+
+    assert exported == rows
+    # Materialising a million rows would take several hundred megabytes.
+    assert peak < 32 * 1024 * 1024
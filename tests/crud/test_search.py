@@ -0,0 +1,59 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.crud.search import NgramSearchBackend
+from app.models.book import Book
+
+
+def test_ngram_search_is_safe_during_concurrent_writes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'search.db'}", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add_all(
+            Book(title=f"Seed {i}", author="Author", isbn=f"{i:013d}", total_quantity=1, available_quantity=1)
+            for i in range(2000)
+        )
+        db.commit()
+    backend = NgramSearchBackend()
+    # Switch threads often so searches overlap the writers' updates.
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    def write(worker: int) -> None:
+        for i in range(3000):
+            backend.index_book(Book(id=10_000 + worker * 10_000 + i, title=f"Book {i}", author="Writer", isbn="x"))
+            if i % 1000 == 999:
+                backend.reset()
+
+    def search(_: int) -> None:
+        with Session(engine) as db:
+            for _ in range(50):
+                # Too short for a 3-gram, so every document is a candidate.
+                backend.search_ids(db, title="b")
+                backend.search_ids(db, author="auth")
+
+    try:
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            futures = [pool.submit(write, worker) for worker in range(2)]
+            futures += [pool.submit(search, reader) for reader in range(4)]
+            for future in futures:
+                future.result()
+    finally:
+        sys.setswitchinterval(interval)
+        engine.dispose()
+
+
+def test_ngram_postings_do_not_grow_on_reindex_or_remove(db: Session):
+    backend = NgramSearchBackend()
+    assert backend.search_ids(db) == []
+    for i in range(100):
+        backend.index_book(Book(id=1, title=f"Title {i}", author="Author", isbn="x"))
+    assert backend.search_ids(db, title="title 99") == [1]
+    assert backend.search_ids(db, title="title 42") == []
+    assert max(len(ids) for ids in backend._postings.values()) == 1
+    assert len(backend._postings) == len(backend._doc_grams(("title 99", "author")))
+
+    backend.remove_book(1)
+    assert not backend._postings
@@ -0,0 +1,41 @@
+import logging
+
+from sqlalchemy import create_engine, text
+
+from app.db.profiler import QueryProfiler
+
+
+def test_slow_queries_are_logged_with_their_plan(tmp_path, caplog):
+    engine = create_engine(f"sqlite:///{tmp_path / 'profile.db'}")
+    profiler = QueryProfiler(slow_ms=0)
+    profiler.attach(engine)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT)"))
+        conn.execute(text("INSERT INTO item (name) VALUES ('a'), ('b')"))
+        with caplog.at_level(logging.WARNING, logger="app.db.profiler"):
+            rows = conn.execute(text("SELECT name FROM item WHERE name = :name"), {"name": "b"}).all()
+    assert rows == [("b",)]
+    assert "slow query" in caplog.text
+    assert "SCAN item" in caplog.text
+
+
+def test_repeated_statements_are_flagged(tmp_path, caplog):
+    engine = create_engine(f"sqlite:///{tmp_path / 'profile.db'}")
+    profiler = QueryProfiler(repeat_threshold=3)
+    profiler.attach(engine)
+    finished = []
+    profiler.listeners.append(finished.append)
+    with caplog.at_level(logging.WARNING, logger="app.db.profiler"):
+        with engine.connect() as conn, profiler.request("GET /things") as profile:
+            for i in range(3):
+                conn.execute(text("SELECT :i"), {"i": i})
+            conn.execute(text("SELECT 'other'"))
+    assert finished == [profile]
+    assert len(profile.statements) == 4
+    assert profile.repeated(3) == [("SELECT ?", 3)]
+    assert "possible N+1 in GET /things: statement ran 3 times" in caplog.text
+
+    profiler.detach(engine)
+    with engine.connect() as conn, profiler.request("GET /things") as profile:
+        conn.execute(text("SELECT 1"))
+    assert profile.statements == []